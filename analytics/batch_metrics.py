@@ -0,0 +1,190 @@
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from analytics.match_store import MatchStore
+from analytics.performance import PerformanceCalculator
+from analytics.scoring_rules import get_scoring_rules
+from analytics.vectorized_performance import VectorizedPerformanceCalculator
+
+# Set once per worker process by _init_worker
+_worker_store = None
+_worker_backend = None
+
+
+def _init_worker(store_path: str, backend: str):
+    global _worker_store, _worker_backend
+    # Memory-mapped, every worker reads the same pages of the store file
+    _worker_store = MatchStore(store_path)
+    _worker_backend = backend
+
+
+def _compute_chunk(units: list, year: int | None, keep_history: bool) -> list:
+    return [
+        _compute_unit(_worker_store, _worker_backend, unit, year, keep_history)
+        for unit in units
+    ]
+
+
+def _compute_unit(store, backend: str, unit: tuple, year, keep_history: bool):
+    event_key, team_number = unit
+    rows = store.matches(event_key=event_key, team_number=team_number, year=year)
+    team_numbers = None if team_number == None else [team_number]
+    # Without a year the matches are scored with the rules of the latest stored season
+    if year == None and len(rows) > 0:
+        year = int(rows["year"].max())
+    scoring_rules = get_scoring_rules(year)
+
+    if backend == "numpy":
+        if rows["played"].any():
+            performances = VectorizedPerformanceCalculator(
+                scoring_rules
+            ).compute_columns(store.to_columns(rows, team_numbers))
+        elif team_number != None:
+            performances = {
+                team_number: PerformanceCalculator(scoring_rules).new_performance(
+                    team_number
+                )
+            }
+        else:
+            performances = {}
+    else:
+        performances = PerformanceCalculator(scoring_rules).compute(
+            store.to_tba_matches(rows), team_numbers, keep_history=keep_history
+        )
+
+    if not keep_history:
+        # Only the aggregates cross the process boundary
+        for performance in performances.values():
+            performance["match_history"] = []
+            performance["overall_metrics"]["contribution_percentages"] = []
+    if team_number != None:
+        return performances[team_number]
+    return performances
+
+
+class BatchMetricsRunner:
+    """
+    Computes the performance metrics of many (event, team) work units on a process pool.
+
+    Units are read from a MatchStore file, which every worker process opens once
+    with mmap, so the match data is shared through the page cache instead of being
+    pickled to each worker: only the unit keys go out and the performance dicts
+    come back. Units are grouped by event before being split into chunks, so a
+    chunk mostly reads one slice of the store, and results are returned in the
+    order of the units whatever the order the chunks complete in.
+    """
+
+    def __init__(
+        self,
+        store_path: str = "cache/season_matches.npy",
+        workers: int | None = None,
+        chunk_size: int | None = None,
+        backend: str = "numpy",
+    ):
+        """
+        Args
+        -----
+        store_path : str, optional
+            Path of the MatchStore file the matches are read from.
+        workers : int | None, optional
+            Number of worker processes, the number of CPUs by default. 1 computes in this process.
+        chunk_size : int | None, optional
+            Units per task, by default enough for about four tasks per worker so the
+            load stays balanced without paying the task overhead per unit.
+        backend : str, optional
+            "numpy" reads the store's columns directly, "python" rebuilds match dicts for the pure Python engine.
+        """
+        if backend not in ("python", "numpy"):
+            raise ValueError(f"Unknown metrics backend: {backend}")
+        self.store_path = store_path
+        self.workers = workers if workers != None else os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.backend = backend
+
+    def compute(
+        self, units: list, year: int | None = None, keep_history: bool = False
+    ) -> dict:
+        """
+        Computes the metrics of every unit.
+
+        Args
+        -----
+        units : list
+            (event_key, team_number) tuples. (event_key, None) computes every team at the
+            event, (None, team_number) computes a team over every stored match, e.g. its
+            season, and (event_key, team_number) a single team at an event.
+        year : int | None, optional
+            Only use matches from this season, and score them with its rules. Give it
+            when the store holds several seasons.
+        keep_history : bool, optional
+            Keep match_history and contribution_percentages, they are most of the
+            size of the results sent back by the workers.
+
+        Returns
+        -------
+        dict
+            unit -> performance dict, or for event units a dict of performance dicts keyed
+            by team number. Keys are in the order of units, duplicates are computed once.
+        """
+        units = list(dict.fromkeys(tuple(unit) for unit in units))
+        if len(units) == 0:
+            return {}
+
+        # Units of the same event next to each other, event-less units last
+        ordered_units = sorted(
+            units,
+            key=lambda unit: (
+                unit[0] == None,
+                unit[0] or "",
+                unit[1] == None,
+                str(unit[1]),
+            ),
+        )
+
+        if self.workers <= 1:
+            _init_worker(self.store_path, self.backend)
+            results = _compute_chunk(ordered_units, year, keep_history)
+        else:
+            chunk_size = self.chunk_size or max(
+                math.ceil(len(ordered_units) / (self.workers * 4)), 1
+            )
+            chunks = [
+                ordered_units[start : start + chunk_size]
+                for start in range(0, len(ordered_units), chunk_size)
+            ]
+            with ProcessPoolExecutor(
+                max_workers=min(self.workers, len(chunks)),
+                initializer=_init_worker,
+                initargs=(self.store_path, self.backend),
+            ) as executor:
+                results = []
+                # map yields in submission order, which keeps the merge deterministic
+                for chunk_results in executor.map(
+                    _compute_chunk,
+                    chunks,
+                    [year] * len(chunks),
+                    [keep_history] * len(chunks),
+                ):
+                    results.extend(chunk_results)
+
+        results_by_unit = dict(zip(ordered_units, results))
+        return {unit: results_by_unit[unit] for unit in units}
+
+    def season_units(self, year: int | None = None) -> list:
+        """Every event of the store and every team's whole season, the units of a full recomputation"""
+        store = MatchStore(self.store_path)
+        rows = store.matches(year=year)
+        team_codes = set(rows[rows["played"]]["teams"].ravel().tolist()) - {0}
+        team_numbers = sorted(
+            (
+                PerformanceCalculator.team_number_from_key(
+                    MatchStore.decode_team_key(team_code)
+                )
+                for team_code in team_codes
+            ),
+            key=str,
+        )
+        return [(event_key, None) for event_key in store.events(year)] + [
+            (None, team_number) for team_number in team_numbers
+        ]
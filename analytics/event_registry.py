@@ -0,0 +1,146 @@
+import re
+import threading
+from collections import OrderedDict
+
+from analytics.incremental_performance import IncrementalPerformanceAggregator
+from analytics.scoring_rules import get_event_scoring_rules
+
+# Season followed by the event's short name, e.g. 2025incmp or 2025inmis
+EVENT_CODE_PATTERN = re.compile(r"^\d{4}[a-z0-9]+$")
+
+
+class EventRegistry:
+    """
+    The live state of every event a deployment serves, partitioned by event.
+
+    Each event has its own running metrics, scored with the rules of its season,
+    so one process can serve all of a weekend's events side by side. Configured
+    events are kept for the life of the process. Other events get their state
+    when a request first asks for them, and past max_loaded_events the least
+    recently used of those are dropped, so browsing old events can't grow memory
+    without bound.
+    """
+
+    def __init__(
+        self,
+        event_codes: list | tuple = (),
+        default_event: str | None = None,
+        max_loaded_events: int = 8,
+    ):
+        """
+        Args
+        -----
+        event_codes : list | tuple, optional
+            Events served by the deployment, listed first and never evicted.
+        default_event : str | None, optional
+            Event of the routes without an event code, the first configured event by default.
+        max_loaded_events : int, optional
+            Maximum number of events outside event_codes kept in memory at once.
+
+        Raises
+        ------
+        ValueError
+            If an event code is not valid.
+        """
+        self.__configured_events = list(dict.fromkeys(event_codes))
+        if default_event == None and len(self.__configured_events) > 0:
+            default_event = self.__configured_events[0]
+        for event_code in self.__configured_events + [default_event]:
+            if event_code != None and not self.is_valid_event_code(event_code):
+                raise ValueError(f"Invalid event code: {event_code}")
+        self.default_event = default_event
+        self.max_loaded_events = max_loaded_events
+        self.__lock = threading.Lock()
+        # event code -> running metrics, least recently used first
+        self.__aggregators = OrderedDict()
+
+    @staticmethod
+    def is_valid_event_code(event_code: str) -> bool:
+        """Whether an event code is well formed and of a season with known scoring rules"""
+        if not isinstance(event_code, str) or not EVENT_CODE_PATTERN.match(event_code):
+            return False
+        try:
+            get_event_scoring_rules(event_code)
+        except ValueError:
+            return False
+        return True
+
+    def configured_events(self) -> list:
+        """Events served by the deployment, with the default event first"""
+        if self.default_event == None:
+            return list(self.__configured_events)
+        return [self.default_event] + [
+            event_code
+            for event_code in self.__configured_events
+            if event_code != self.default_event
+        ]
+
+    def loaded_events(self) -> list:
+        """Events whose running metrics are in memory"""
+        with self.__lock:
+            return list(self.__aggregators)
+
+    def served_events(self) -> list:
+        """Configured events followed by the events loaded on demand"""
+        configured_events = self.configured_events()
+        return configured_events + [
+            event_code
+            for event_code in self.loaded_events()
+            if event_code not in configured_events
+        ]
+
+    def is_loaded(self, event_code: str) -> bool:
+        with self.__lock:
+            return event_code in self.__aggregators
+
+    def aggregator(
+        self, event_code: str, create: bool = True
+    ) -> IncrementalPerformanceAggregator | None:
+        """
+        Returns an event's running metrics.
+
+        Args
+        -----
+        event_code : str
+            The event.
+        create : bool, optional
+            Create empty running metrics if the event is not loaded, None is returned otherwise.
+        """
+        with self.__lock:
+            aggregator = self.__aggregators.get(event_code)
+            if aggregator != None:
+                self.__aggregators.move_to_end(event_code)
+                return aggregator
+            if not create:
+                return None
+            aggregator = IncrementalPerformanceAggregator(
+                scoring_rules=get_event_scoring_rules(event_code)
+            )
+            self.__store(event_code, aggregator)
+            return aggregator
+
+    def replace_aggregator(
+        self, event_code: str, aggregator: IncrementalPerformanceAggregator
+    ):
+        """Swaps in rebuilt running metrics for an event"""
+        with self.__lock:
+            self.__store(event_code, aggregator)
+
+    def unload(self, event_code: str):
+        """Drops an event's running metrics, they are rebuilt from its match list when next asked for"""
+        with self.__lock:
+            self.__aggregators.pop(event_code, None)
+
+    def __store(self, event_code: str, aggregator: IncrementalPerformanceAggregator):
+        self.__aggregators[event_code] = aggregator
+        self.__aggregators.move_to_end(event_code)
+        on_demand_events = [
+            loaded_event
+            for loaded_event in self.__aggregators
+            if loaded_event not in self.__configured_events
+            and loaded_event != self.default_event
+        ]
+        for evicted_event in on_demand_events[
+            : max(len(on_demand_events) - self.max_loaded_events, 0)
+        ]:
+            del self.__aggregators[evicted_event]
@@ -0,0 +1,134 @@
+import copy
+import threading
+
+from analytics.performance import PerformanceCalculator
+from analytics.scoring_rules import ScoringRules
+
+
+class IncrementalPerformanceAggregator:
+    """
+    Keeps running performance totals per team and folds in only newly completed matches.
+
+    Counts and point sums live in the performance dicts themselves, the mean and
+    variance of the contribution percentages are tracked with Welford's algorithm,
+    so applying a match is O(1) per robot. Reading a team's metrics copies its
+    match history, O(matches played by the team), and never rescans the matches.
+    """
+
+    def __init__(
+        self,
+        team_numbers: list | None = None,
+        scoring_rules: ScoringRules | None = None,
+    ):
+        """
+        Args
+        -----
+        team_numbers : list | None, optional
+            The teams to track. If not provided every team found in the matches is tracked.
+        scoring_rules : ScoringRules | None, optional
+            Scoring rules of the season of the matches, the latest season's by default.
+        """
+        self.__calculator = PerformanceCalculator(scoring_rules)
+        self.__lock = threading.Lock()
+        self.__applied_match_keys = set()
+        self.__wanted_teams = (
+            None
+            if team_numbers == None
+            else {f"frc{team_number}": team_number for team_number in team_numbers}
+        )
+        # team key -> [performance, contribution_percentages, count, mean, m2]
+        self.__teams = {}
+
+    def apply_matches(self, matches: list) -> set:
+        """
+        Folds the completed matches that were not applied yet into the running totals.
+
+        Args
+        -----
+        matches : list
+            Matches as returned by TheBlueAlliance API, already applied and unplayed matches are ignored.
+
+        Returns
+        -------
+        set
+            Team numbers whose metrics changed.
+        """
+        updated_teams = set()
+        with self.__lock:
+            for match in matches:
+                if match.get("score_breakdown") == None:
+                    continue
+                if match["key"] in self.__applied_match_keys:
+                    continue
+                self.__applied_match_keys.add(match["key"])
+
+                for alliance_color in ("red", "blue"):
+                    team_keys = match["alliances"][alliance_color]["team_keys"]
+                    for robot_index, team_key in enumerate(team_keys):
+                        state = self.__team_state(team_key)
+                        if state == None:
+                            continue
+
+                        contribution = self.__calculator.add_match(
+                            state[0], match, alliance_color, robot_index + 1
+                        )
+                        state[1].append(contribution)
+
+                        # Welford's running mean / sum of squared deviations
+                        state[2] += 1
+                        delta = contribution - state[3]
+                        state[3] += delta / state[2]
+                        state[4] += delta * (contribution - state[3])
+
+                        updated_teams.add(state[0]["team_number"])
+        return updated_teams
+
+    def __team_state(self, team_key: str) -> list | None:
+        state = self.__teams.get(team_key)
+        if state != None:
+            return state
+
+        if self.__wanted_teams == None:
+            team_number = PerformanceCalculator.team_number_from_key(team_key)
+        elif team_key in self.__wanted_teams:
+            team_number = self.__wanted_teams[team_key]
+        else:
+            return None
+
+        state = [self.__calculator.new_performance(team_number), [], 0, 0.0, 0.0]
+        self.__teams[team_key] = state
+        return state
+
+    def get_performance(self, team_number) -> dict:
+        """
+        Returns the team's performance dict, same layout as PerformanceCalculator.
+
+        The dict is a finalized snapshot taken under the lock, matches applied
+        afterwards, e.g. by the event poller's thread, don't change it while the
+        caller reads, hashes or serializes it.
+        Teams without any applied match get an empty performance dict.
+        """
+        with self.__lock:
+            state = self.__teams.get(f"frc{team_number}")
+            if state == None:
+                return self.__calculator.new_performance(team_number)
+
+            performance, contribution_percentages, count, mean, m2 = state
+            performance = copy.deepcopy(performance)
+            self.__calculator.finalize(
+                performance,
+                list(contribution_percentages),
+                contribution_stats=(mean, m2 / count) if count else None,
+            )
+            return performance
+
+    def team_numbers(self) -> list:
+        """Returns the team numbers that have at least one applied match"""
+        with self.__lock:
+            return [state[0]["team_number"] for state in self.__teams.values()]
+
+    def reset(self):
+        """Forgets every applied match, e.g. after TBA corrected a score"""
+        with self.__lock:
+            self.__applied_match_keys.clear()
+            self.__teams.clear()
@@ -0,0 +1,368 @@
+import os
+
+import numpy as np
+
+from analytics.performance import PerformanceCalculator
+from analytics.scoring_rules import get_scoring_rules
+
+COMP_LEVEL_CODES = {"qm": 0, "ef": 1, "qf": 2, "sf": 3, "f": 4}
+COMP_LEVELS = {code: comp_level for comp_level, code in COMP_LEVEL_CODES.items()}
+WINNER_CODES = {"red": 1, "blue": 2}
+WINNERS = {0: "", 1: "red", 2: "blue"}
+ALLIANCE_COLORS = ("red", "blue")
+
+# Per-alliance point fields, (column name, scoring rules field role). The column
+# names are those of the 2025 fields, other seasons store their equivalents.
+POINT_FIELDS = (
+    ("auto_coral_points", "auto_piece_points"),
+    ("auto_coral_count", "auto_piece_count"),
+    ("auto_points", "auto_points"),
+    ("teleop_points", "teleop_points"),
+    ("teleop_coral_count", "teleop_piece_count"),
+    ("endgame_barge_points", "endgame_points"),
+    ("foul_points", "foul_points"),
+    ("total_points", "total_points"),
+    ("rp", "ranking_points"),
+)
+# Columns of the season's placement counts, in the order of its scoring rules
+PLACEMENT_COLUMNS = ("top_row", "mid_row", "bot_row", "trough")
+
+# One fixed-size record per match, alliance fields are indexed [red, blue]
+MATCH_DTYPE = np.dtype(
+    [
+        ("match_key", "S32"),
+        ("event_key", "S16"),
+        ("year", np.int16),
+        ("comp_level", np.int8),
+        ("set_number", np.int16),
+        ("match_number", np.int16),
+        ("time", np.int64),
+        ("played", np.bool_),
+        ("winner", np.int8),
+        ("teams", np.int32, (2, 3)),
+        ("auto_line", np.int8, (2, 3)),
+        ("endgame", np.int8, (2, 3)),
+        ("auto_bonus", np.bool_, (2,)),
+    ]
+    + [(name, np.int16, (2,)) for name, _ in POINT_FIELDS]
+    + [(name, np.int16, (2,)) for name in PLACEMENT_COLUMNS]
+)
+
+
+class MatchStore:
+    """
+    Compact columnar store of TBA matches persisted as a memory-mapped file.
+
+    Matches are normalized into fixed-size records (team keys as integers, robot
+    auto line / endgame states as the codes of the season's scoring rules, point
+    fields as small integers) and saved as a NumPy structured array. The file is opened with mmap, so several
+    worker processes reading the same store share its pages without copying.
+    Records are kept sorted by event and match order, which makes event queries
+    zero-copy slices.
+    """
+
+    def __init__(self, store_path: str = "cache/matches.npy"):
+        """
+        Args
+        -----
+        store_path : str, optional
+            Path of the .npy file backing the store. Parent directories are created as needed.
+        """
+        self.__store_path = store_path
+        self.__rows = None
+        self.reload()
+
+    def reload(self):
+        """Re-opens the backing file, picking up matches written by other processes"""
+        if os.path.exists(self.__store_path):
+            self.__rows = np.load(self.__store_path, mmap_mode="r")
+        else:
+            self.__rows = np.zeros(0, dtype=MATCH_DTYPE)
+
+    def __len__(self):
+        return len(self.__rows)
+
+    @staticmethod
+    def encode_team_key(team_key: str) -> int:
+        """Encodes a TBA team key as an integer, frc254 -> 254 and frc254B -> 200254"""
+        team_number = team_key[3:]
+        if team_number.isdigit():
+            return int(team_number)
+        return int(team_number[:-1]) + 100000 * (ord(team_number[-1].upper()) - 64)
+
+    @staticmethod
+    def decode_team_key(team_code: int) -> str:
+        """Inverse of encode_team_key"""
+        suffix_index, team_number = divmod(int(team_code), 100000)
+        if suffix_index == 0:
+            return f"frc{team_number}"
+        return f"frc{team_number}{chr(64 + suffix_index)}"
+
+    def add_matches(self, matches: list) -> int:
+        """
+        Inserts or replaces matches and persists the store.
+
+        Args
+        -----
+        matches : list
+            Matches as returned by TheBlueAlliance API, played or not.
+
+        Returns
+        -------
+        int
+            The number of records written.
+        """
+        if len(matches) == 0:
+            return 0
+
+        new_rows = np.zeros(len(matches), dtype=MATCH_DTYPE)
+        for row, match in zip(new_rows, matches):
+            self.__encode_match(row, match)
+
+        existing = self.__rows[
+            ~np.isin(self.__rows["match_key"], new_rows["match_key"])
+        ]
+        rows = np.concatenate([existing, new_rows])
+        rows = rows[
+            np.lexsort(
+                (
+                    rows["match_number"],
+                    rows["set_number"],
+                    rows["comp_level"],
+                    rows["event_key"],
+                )
+            )
+        ]
+
+        store_dir = os.path.dirname(self.__store_path)
+        if store_dir and not os.path.exists(store_dir):
+            os.makedirs(store_dir)
+        # Write next to the store and swap it in, other readers keep their mapping of the old file.
+        # Our own mapping is released first since Windows refuses to replace a mapped file.
+        temp_path = f"{self.__store_path}.{os.getpid()}.tmp"
+        with open(temp_path, "wb") as temp_file:
+            np.save(temp_file, rows)
+        self.__rows = rows
+        os.replace(temp_path, self.__store_path)
+        self.reload()
+        return len(new_rows)
+
+    def __encode_match(self, row, match: dict):
+        event_key = match["event_key"]
+        row["match_key"] = match["key"].encode("ascii")
+        row["event_key"] = event_key.encode("ascii")
+        year = int(event_key[:4])
+        row["year"] = year
+        row["comp_level"] = COMP_LEVEL_CODES.get(match.get("comp_level"), 0)
+        row["set_number"] = match.get("set_number") or 0
+        row["match_number"] = match.get("match_number") or 0
+        row["time"] = match.get("actual_time") or match.get("time") or 0
+        row["winner"] = WINNER_CODES.get(match.get("winning_alliance"), 0)
+
+        for side, alliance_color in enumerate(ALLIANCE_COLORS):
+            team_keys = match["alliances"][alliance_color]["team_keys"][:3]
+            for robot_index, team_key in enumerate(team_keys):
+                row["teams"][side, robot_index] = self.encode_team_key(team_key)
+
+        score_breakdown = match.get("score_breakdown")
+        if score_breakdown == None:
+            return
+        row["played"] = True
+
+        rules = get_scoring_rules(year)
+        for side, alliance_color in enumerate(ALLIANCE_COLORS):
+            alliance_data = score_breakdown[alliance_color]
+            for robot_index in range(3):
+                row["auto_line"][side, robot_index] = rules.mobility_code(
+                    alliance_data.get(rules.mobility_keys[robot_index])
+                )
+                row["endgame"][side, robot_index] = rules.endgame_code(
+                    alliance_data.get(rules.endgame_keys[robot_index])
+                )
+            row["auto_bonus"][side] = rules.auto_bonus(alliance_data)
+            for name, role in POINT_FIELDS:
+                row[name][side] = rules.fields[role](alliance_data)
+            for name, field in zip(PLACEMENT_COLUMNS, rules.placement_fields):
+                row[name][side] = field(alliance_data)
+
+    def matches(
+        self,
+        event_key: str | None = None,
+        team_number: int | str | None = None,
+        year: int | None = None,
+    ) -> np.ndarray:
+        """
+        Queries the stored match records.
+
+        Args
+        -----
+        event_key : str | None, optional
+            Only return matches of this event. Without other filters the result is a zero-copy view.
+        team_number : int | str | None, optional
+            Only return matches this team played in.
+        year : int | None, optional
+            Only return matches from this season.
+
+        Returns
+        -------
+        np.ndarray
+            Structured array of MATCH_DTYPE records in event and match order.
+        """
+        rows = self.__rows
+        if event_key != None:
+            encoded_key = event_key.encode("ascii")
+            start = np.searchsorted(rows["event_key"], encoded_key, side="left")
+            end = np.searchsorted(rows["event_key"], encoded_key, side="right")
+            rows = rows[start:end]
+        if year != None:
+            rows = rows[rows["year"] == year]
+        if team_number != None:
+            team_code = self.encode_team_key(f"frc{team_number}")
+            rows = rows[(rows["teams"] == team_code).any(axis=(1, 2))]
+        return rows
+
+    def events(self, year: int | None = None) -> list:
+        """Returns the keys of the stored events"""
+        rows = self.__rows if year == None else self.__rows[self.__rows["year"] == year]
+        return [event_key.decode("ascii") for event_key in np.unique(rows["event_key"])]
+
+    def to_tba_matches(self, rows: np.ndarray) -> list:
+        """Rebuilds TBA shaped match dicts (only the stored fields) from records"""
+        matches = []
+        for row in rows:
+            played = bool(row["played"])
+            rules = get_scoring_rules(int(row["year"])) if played else None
+            alliances = {}
+            score_breakdown = {} if played else None
+            for side, alliance_color in enumerate(ALLIANCE_COLORS):
+                alliances[alliance_color] = {
+                    "team_keys": [
+                        self.decode_team_key(team_code)
+                        for team_code in row["teams"][side]
+                        if team_code != 0
+                    ],
+                    "score": int(row["total_points"][side]) if played else -1,
+                }
+                if not played:
+                    continue
+
+                score_breakdown[alliance_color] = rules.build_alliance_breakdown(
+                    row["auto_line"][side],
+                    row["endgame"][side],
+                    row["auto_bonus"][side],
+                    {role: int(row[name][side]) for name, role in POINT_FIELDS},
+                    [int(row[name][side]) for name in PLACEMENT_COLUMNS],
+                )
+
+            time = int(row["time"])
+            matches.append(
+                {
+                    "key": row["match_key"].decode("ascii"),
+                    "event_key": row["event_key"].decode("ascii"),
+                    "comp_level": COMP_LEVELS[int(row["comp_level"])],
+                    "set_number": int(row["set_number"]),
+                    "match_number": int(row["match_number"]),
+                    "time": time or None,
+                    "actual_time": time if played and time else None,
+                    "winning_alliance": WINNERS[int(row["winner"])],
+                    "alliances": alliances,
+                    "score_breakdown": score_breakdown,
+                }
+            )
+        return matches
+
+    def to_columns(self, rows: np.ndarray, team_numbers: list | None = None) -> dict:
+        """
+        Builds the input of VectorizedPerformanceCalculator.compute_columns directly from records,
+        without going through match dicts.
+
+        The codes and points are computed with the calculator's scoring rules, so the
+        records should be of the season it was created for.
+        """
+        played = rows[rows["played"]]
+        alliance_count = len(played) * 2
+
+        team_codes = played["teams"].reshape(alliance_count, 3)
+        if team_numbers != None:
+            team_numbers_out = []
+            wanted_codes = []
+            for team_number in team_numbers:
+                team_code = self.encode_team_key(f"frc{team_number}")
+                if team_code not in wanted_codes:
+                    wanted_codes.append(team_code)
+                    team_numbers_out.append(team_number)
+        else:
+            present = team_codes[team_codes != 0]
+            unique_codes, first_seen = np.unique(present, return_index=True)
+            wanted_codes = unique_codes[np.argsort(first_seen)].tolist()
+            team_numbers_out = [
+                PerformanceCalculator.team_number_from_key(
+                    self.decode_team_key(team_code)
+                )
+                for team_code in wanted_codes
+            ]
+
+        code_lookup = np.array(wanted_codes, dtype=np.int64)
+        slot_mask = np.isin(team_codes, code_lookup) & (team_codes != 0)
+        alliance_index, position = np.nonzero(slot_mask)
+        sorter = np.argsort(code_lookup)
+        team_index = sorter[
+            np.searchsorted(
+                code_lookup, team_codes[alliance_index, position], sorter=sorter
+            )
+        ]
+
+        auto_line = played["auto_line"].reshape(alliance_count, 3)
+        rules_by_year = {
+            year: get_scoring_rules(year) for year in np.unique(played["year"]).tolist()
+        }
+        alliance_rules = [
+            rules_by_year[year]
+            for year in played["year"].tolist()
+            for _ in ALLIANCE_COLORS
+        ]
+        endgame = played["endgame"].reshape(alliance_count, 3)
+        winners = np.repeat(played["winner"], 2)
+        sides = np.tile(
+            np.array([WINNER_CODES["red"], WINNER_CODES["blue"]]), len(played)
+        )
+
+        columns = {
+            "auto_line": auto_line,
+            "endgame": endgame,
+            "auto_bonus": played["auto_bonus"].reshape(alliance_count),
+            "won": winners == sides,
+            "team_index": team_index.astype(np.int64),
+            "alliance_index": alliance_index.astype(np.int64),
+            "position": position.astype(np.int64),
+            "team_numbers": team_numbers_out,
+            "match_keys": [
+                match_key.decode("ascii")
+                for match_key in np.repeat(played["match_key"], 2)
+            ],
+            "alliance_colors": list(ALLIANCE_COLORS) * len(played),
+            "auto_line_labels": [
+                tuple(rules.mobility_labels[code] for code in robots)
+                for rules, robots in zip(alliance_rules, auto_line.tolist())
+            ],
+            "endgame_labels": [
+                tuple(rules.endgame_labels[code] for code in robots)
+                for rules, robots in zip(alliance_rules, endgame.tolist())
+            ],
+            "placements": np.stack(
+                [
+                    played[name].reshape(alliance_count).astype(np.float64)
+                    for name in PLACEMENT_COLUMNS
+                ],
+                axis=1,
+            ),
+        }
+        for name, column in (
+            ("auto_piece_points", "auto_coral_points"),
+            ("auto_piece_count", "auto_coral_count"),
+            ("teleop_points", "teleop_points"),
+            ("teleop_piece_count", "teleop_coral_count"),
+            ("total_points", "total_points"),
+        ):
+            columns[name] = played[column].reshape(alliance_count).astype(np.float64)
+        return columns
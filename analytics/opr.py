@@ -0,0 +1,289 @@
+import math
+
+import numpy as np
+
+from analytics.performance import PerformanceCalculator
+from analytics.scoring_rules import ScoringRules, get_event_scoring_rules
+
+# Components that get their own OPR, by the alliance field role they are read from
+COMPONENT_ROLES = {
+    "auto": "auto_points",
+    "teleop": "teleop_points",
+    "endgame": "endgame_points",
+    "foul": "foul_points",
+}
+
+
+class OprPredictor:
+    """
+    Statistical match predictor based on Offensive Power Ratings.
+
+    Every played alliance gives one equation: the sum of its three teams' ratings
+    equals the alliance score. The system is solved with least squares through the
+    normal equations, A^T A is only teams x teams and is accumulated straight from
+    the team indexes, so the (sparse) match matrix is never built. A small ridge
+    term pulls teams with few matches towards the average, which keeps the solve
+    stable early in an event.
+
+    OPR, DPR (same system with the opponent's score), CCWM (the margin) and one
+    OPR per score breakdown component are solved at once. Predicted scores are the
+    sums of the alliances' OPRs and the win probability assumes a normally
+    distributed margin with the residual spread of the fitted matches. The residual
+    spread of single alliance scores is kept in score_sigma.
+    """
+
+    def __init__(self, ridge: float = 1.0, scoring_rules: ScoringRules | None = None):
+        """
+        Args
+        -----
+        ridge : float, optional
+            Regularization strength, the number of "average" matches added to every team.
+        scoring_rules : ScoringRules | None, optional
+            Rules the component fields are read with. By default each match's season's,
+            found from its event key.
+        """
+        self.ridge = ridge
+        self.scoring_rules = scoring_rules
+        self.__team_indexes = {}
+        self.__ratings = np.zeros((0, 3 + len(COMPONENT_ROLES)))
+        self.__baseline = np.zeros(3 + len(COMPONENT_ROLES))
+        self.__margin_sigma = None
+        self.matches_fitted = 0
+        self.score_sigma = 0.0
+
+    def fit(self, matches: list) -> "OprPredictor":
+        """
+        Solves the ratings from the played matches.
+
+        Args
+        -----
+        matches : list
+            Matches as returned by TheBlueAlliance API. Matches without a score breakdown are skipped.
+
+        Returns
+        -------
+        OprPredictor
+            self, so the call can be chained.
+
+        Raises
+        ------
+        ValueError
+            If a played match's season has no scoring rules, before anything is fitted.
+        """
+        played_matches = [
+            match for match in matches if match.get("score_breakdown") != None
+        ]
+        # The component fields of each event's season, resolved once per event
+        event_component_fields = {}
+        for match in played_matches:
+            event_key = match.get("event_key")
+            if event_key in event_component_fields:
+                continue
+            rules = (
+                self.scoring_rules
+                if self.scoring_rules != None
+                else get_event_scoring_rules(event_key)
+            )
+            event_component_fields[event_key] = [
+                rules.fields[role] for role in COMPONENT_ROLES.values()
+            ]
+
+        team_indexes = {}
+        alliance_teams = []
+        targets = []
+        for match in played_matches:
+            score_breakdown = match["score_breakdown"]
+            component_fields = event_component_fields[match.get("event_key")]
+            for alliance_color, opponent_color in (("red", "blue"), ("blue", "red")):
+                team_keys = match["alliances"][alliance_color]["team_keys"]
+                if len(team_keys) != 3:
+                    continue
+                for team_key in team_keys:
+                    team_indexes.setdefault(team_key, len(team_indexes))
+                alliance_teams.append([team_indexes[key] for key in team_keys])
+
+                score = match["alliances"][alliance_color]["score"]
+                opponent_score = match["alliances"][opponent_color]["score"]
+                alliance_data = score_breakdown[alliance_color]
+                targets.append(
+                    [score, opponent_score, score - opponent_score]
+                    + [field(alliance_data) for field in component_fields]
+                )
+
+        team_count = len(team_indexes)
+        self.__team_indexes = team_indexes
+        self.matches_fitted = len(targets) // 2
+        if not targets:
+            self.__ratings = np.zeros((0, 3 + len(COMPONENT_ROLES)))
+            self.__baseline = np.zeros(3 + len(COMPONENT_ROLES))
+            self.__margin_sigma = None
+            self.score_sigma = 0.0
+            return self
+
+        alliance_teams = np.array(alliance_teams, dtype=np.int64)
+        targets = np.array(targets, dtype=np.float64)
+
+        # Solve for deviations from the average alliance, so the ridge shrinks towards it
+        self.__baseline = targets.mean(axis=0) / 3
+        deviations = targets - targets.mean(axis=0)
+
+        # A^T A[i, j] counts the alliances i and j played in together
+        pair_indexes = (
+            alliance_teams[:, :, None] * team_count + alliance_teams[:, None, :]
+        ).ravel()
+        normal_matrix = (
+            np.bincount(pair_indexes, minlength=team_count * team_count)
+            .reshape(team_count, team_count)
+            .astype(np.float64)
+        )
+        normal_matrix[np.diag_indices(team_count)] += self.ridge
+
+        # A^T b sums the targets of every alliance a team played in
+        rhs = np.zeros((team_count, targets.shape[1]))
+        np.add.at(rhs, alliance_teams, deviations[:, None, :])
+
+        # lstsq instead of solve so an unregularized, rank deficient system still gets the minimum norm solution
+        self.__ratings = np.linalg.lstsq(normal_matrix, rhs, rcond=None)[0]
+
+        # Spread of the scores and margin the ratings could not explain
+        predicted = self.__ratings[alliance_teams].sum(axis=1)
+        self.score_sigma = float(
+            np.sqrt(np.mean((deviations[:, 0] - predicted[:, 0]) ** 2))
+        )
+        margin_residuals = deviations[:, 2] - predicted[:, 2]
+        self.__margin_sigma = (
+            float(np.sqrt(np.mean(margin_residuals**2)))
+            if len(margin_residuals) > 2
+            else None
+        )
+        if not self.__margin_sigma:
+            self.__margin_sigma = float(targets[:, 0].std() * math.sqrt(2)) or 1.0
+        return self
+
+    def ratings(self) -> dict:
+        """
+        Returns the ratings of every fitted team.
+
+        Returns
+        -------
+        dict
+            team number -> {"opr", "dpr", "ccwm", "auto_opr", "teleop_opr", "endgame_opr", "foul_opr"}
+        """
+        return {
+            PerformanceCalculator.team_number_from_key(team_key): self.__rating_dict(
+                index
+            )
+            for team_key, index in self.__team_indexes.items()
+        }
+
+    def team_rating(self, team_number) -> dict:
+        """Returns a team's ratings, teams without matches get the average ratings"""
+        index = self.__team_indexes.get(f"frc{team_number}")
+        return self.__rating_dict(index)
+
+    def predict(self, red_team_numbers: list, blue_team_numbers: list) -> dict:
+        """
+        Predicts the outcome of a match between two alliances.
+
+        Args
+        -----
+        red_team_numbers : list
+            Team numbers of the red alliance.
+        blue_team_numbers : list
+            Team numbers of the blue alliance.
+
+        Returns
+        -------
+        dict
+            Predicted "red_score", "blue_score", "red_win_probability" and "blue_win_probability".
+        """
+        return self.predict_many([(red_team_numbers, blue_team_numbers)])[0]
+
+    def predict_many(self, alliances: list) -> list:
+        """
+        Predicts several matches at once.
+
+        Args
+        -----
+        alliances : list
+            (red team numbers, blue team numbers) pairs.
+
+        Returns
+        -------
+        list
+            One prediction dict per pair, see predict.
+        """
+        if not alliances:
+            return []
+
+        # Unknown teams and padding point at an appended row of zero deviations (an average team)
+        ratings = np.append(self.__ratings[:, 0], 0.0)
+        red_indexes = self.__alliance_indexes([red for red, _ in alliances])
+        blue_indexes = self.__alliance_indexes([blue for _, blue in alliances])
+        red_scores = ratings[red_indexes].sum(axis=1) + self.__baseline[0] * np.array(
+            [len(red) for red, _ in alliances]
+        )
+        blue_scores = ratings[blue_indexes].sum(axis=1) + self.__baseline[0] * np.array(
+            [len(blue) for _, blue in alliances]
+        )
+
+        sigma = self.__margin_sigma or 1.0
+        z_scores = (red_scores - blue_scores) / (sigma * math.sqrt(2))
+        red_win_probabilities = [0.5 * (1 + math.erf(z)) for z in z_scores.tolist()]
+        return [
+            {
+                "red_score": red_score,
+                "blue_score": blue_score,
+                "red_win_probability": red_win_probability,
+                "blue_win_probability": 1 - red_win_probability,
+            }
+            for red_score, blue_score, red_win_probability in zip(
+                red_scores.tolist(), blue_scores.tolist(), red_win_probabilities
+            )
+        ]
+
+    def predict_matches(self, matches: list) -> list:
+        """
+        Predicts TBA matches, e.g. a whole qualification schedule.
+
+        Returns
+        -------
+        list
+            One prediction dict per match, see predict, with the match "key" added.
+        """
+        alliances = [
+            (
+                [
+                    PerformanceCalculator.team_number_from_key(team_key)
+                    for team_key in match["alliances"]["red"]["team_keys"]
+                ],
+                [
+                    PerformanceCalculator.team_number_from_key(team_key)
+                    for team_key in match["alliances"]["blue"]["team_keys"]
+                ],
+            )
+            for match in matches
+        ]
+        predictions = self.predict_many(alliances)
+        for match, prediction in zip(matches, predictions):
+            prediction["key"] = match["key"]
+        return predictions
+
+    def __alliance_indexes(self, alliances: list) -> np.ndarray:
+        width = max(len(teams) for teams in alliances)
+        indexes = np.full((len(alliances), width), len(self.__ratings), dtype=np.int64)
+        for row, teams in enumerate(alliances):
+            for column, team_number in enumerate(teams):
+                indexes[row, column] = self.__team_indexes.get(
+                    f"frc{team_number}", len(self.__ratings)
+                )
+        return indexes
+
+    def __rating_dict(self, index) -> dict:
+        values = self.__baseline.copy()
+        if index != None:
+            values += self.__ratings[index]
+        rating = {"opr": values[0], "dpr": values[1], "ccwm": values[2]}
+        for offset, component in enumerate(COMPONENT_ROLES):
+            rating[f"{component}_opr"] = values[3 + offset]
+        return {name: float(value) for name, value in rating.items()}
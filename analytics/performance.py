@@ -0,0 +1,450 @@
+from analytics.scoring_rules import (
+    MOBILITY_NO,
+    MOBILITY_OTHER,
+    MOBILITY_YES,
+    ScoringRules,
+    get_scoring_rules,
+)
+
+# The contribution mean and consistency are rounded to this many decimals. The two-pass,
+# running (Welford) and vectorized computations differ in the last bits, rounded they
+# are equal, so every engine and the streamed path serialize and hash the same
+STATISTIC_DECIMALS = 9
+
+
+class PerformanceCalculator:
+    """Computes per-team performance metrics from TBA match data"""
+
+    def __init__(self, scoring_rules: ScoringRules | None = None):
+        """
+        Args
+        -----
+        scoring_rules : ScoringRules | None, optional
+            Scoring rules of the season of the matches, the latest season's by default.
+        """
+        self.scoring_rules = (
+            scoring_rules if scoring_rules != None else get_scoring_rules()
+        )
+
+    def compute(
+        self, matches, team_numbers: list | None = None, keep_history: bool = True
+    ) -> dict:
+        """
+        Computes the performance metrics of several teams in a single pass over the matches.
+
+        Args
+        -----
+        matches : iterable
+            Matches as returned by TheBlueAlliance API, a list or any iterable such as a
+            generator parsing a response as it arrives. Matches without a score breakdown
+            (not played yet) are skipped.
+        team_numbers : list | None, optional
+            The teams to compute metrics for. If not provided every team found in the matches is included.
+        keep_history : bool, optional
+            Keep the per match lists, match_history and contribution_percentages. Without
+            them memory doesn't grow with the number of matches, the aggregates are the same
+            and iter_match_history produces the history on demand.
+
+        Returns
+        -------
+        dict
+            Performance dict of each team, keyed by team number.
+        """
+        wanted_teams = None
+        performances = {}
+        # team key -> list of contribution percentages, or [count, mean, m2] without history
+        contribution_percentages = {}
+        if team_numbers != None:
+            wanted_teams = {
+                f"frc{team_number}": team_number for team_number in team_numbers
+            }
+            for team_key, team_number in wanted_teams.items():
+                performances[team_key] = self.new_performance(team_number)
+                contribution_percentages[team_key] = (
+                    [] if keep_history else [0, 0.0, 0.0]
+                )
+
+        for match in matches:
+            if match.get("score_breakdown") == None:
+                continue
+
+            for alliance_color in ("red", "blue"):
+                team_keys = match["alliances"][alliance_color]["team_keys"]
+                for robot_index, team_key in enumerate(team_keys):
+                    if team_key not in performances:
+                        if wanted_teams != None:
+                            continue
+                        performances[team_key] = self.new_performance(
+                            self.team_number_from_key(team_key)
+                        )
+                        contribution_percentages[team_key] = (
+                            [] if keep_history else [0, 0.0, 0.0]
+                        )
+
+                    contribution = self.add_match(
+                        performances[team_key],
+                        match,
+                        alliance_color,
+                        robot_index + 1,
+                        keep_history,
+                    )
+                    if keep_history:
+                        contribution_percentages[team_key].append(contribution)
+                    else:
+                        # Welford's running mean / sum of squared deviations
+                        stats = contribution_percentages[team_key]
+                        stats[0] += 1
+                        delta = contribution - stats[1]
+                        stats[1] += delta / stats[0]
+                        stats[2] += delta * (contribution - stats[1])
+
+        results = {}
+        for team_key, performance in performances.items():
+            if keep_history:
+                self.finalize(performance, contribution_percentages[team_key])
+            else:
+                count, mean, m2 = contribution_percentages[team_key]
+                self.finalize(
+                    performance,
+                    [],
+                    contribution_stats=(mean, m2 / count) if count else None,
+                )
+            results[performance["team_number"]] = performance
+        return results
+
+    def iter_match_history(self, matches, team_number):
+        """
+        Yields a team's match history records one at a time, for performances computed without history.
+
+        Args
+        -----
+        matches : iterable
+            Matches as returned by TheBlueAlliance API, a list or any iterable.
+        team_number : int | str
+            The team whose records are produced, matches it didn't play are skipped.
+        """
+        team_key = f"frc{team_number}"
+        scratch_performance = self.new_performance(team_number)
+        for match in matches:
+            if match.get("score_breakdown") == None:
+                continue
+            for alliance_color in ("red", "blue"):
+                team_keys = match["alliances"][alliance_color]["team_keys"]
+                if team_key in team_keys:
+                    self.add_match(
+                        scratch_performance,
+                        match,
+                        alliance_color,
+                        team_keys.index(team_key) + 1,
+                    )
+                    yield scratch_performance["match_history"].pop()
+
+    @staticmethod
+    def team_number_from_key(team_key: str):
+        """Converts a TBA team key (frc254) to a team number, keeping the suffix of B teams (frc254B)"""
+        team_number = team_key[3:]
+        return int(team_number) if team_number.isdigit() else team_number
+
+    def new_performance(self, team_number) -> dict:
+        """Returns an empty performance dict for a team"""
+        rules = self.scoring_rules
+        endgame_performance = {}
+        for count_key, rate_key in zip(
+            rules.endgame_count_keys, rules.endgame_rate_keys
+        ):
+            endgame_performance[count_key] = 0
+            endgame_performance[rate_key] = 0.0
+        endgame_performance["total_endgame_points"] = 0
+        endgame_performance["avg_endgame_points"] = 0.0
+        return {
+            "team_number": team_number,
+            "matches_played": 0,
+            "wins": 0,
+            "losses": 0,
+            "auto_performance": {
+                "auto_line_crosses": 0,
+                "line_cross_success_rate": 0.0,
+                "avg_auto_contribution": 0.0,
+                "total_auto_points": 0,
+                "auto_coral_count": 0,
+            },
+            "teleop_performance": {
+                "avg_teleop_contribution": 0.0,
+                "total_teleop_points": 0,
+                "estimated_coral_per_match": 0.0,
+                "total_coral_count": 0,
+                rules.placement_group: {name: 0 for name in rules.placement_names},
+            },
+            "endgame_performance": endgame_performance,
+            "overall_metrics": {
+                "total_estimated_points": 0,
+                "avg_points_per_match": 0.0,
+                "contribution_percentages": [],
+                "avg_contribution_percentage": 0.0,
+                "consistency_rating": 0.0,
+            },
+            "match_history": [],
+        }
+
+    def add_match(
+        self,
+        performance: dict,
+        match: dict,
+        alliance_color: str,
+        robot_position: int,
+        keep_history: bool = True,
+    ) -> float:
+        """
+        Adds a single played match to a team's performance dict.
+
+        The match's record is appended to the match_history unless keep_history is False.
+
+        Returns
+        -------
+        float
+            The team's estimated contribution to its alliance score for this match.
+        """
+        performance["matches_played"] += 1
+        if match["winning_alliance"] == alliance_color:
+            performance["wins"] += 1
+        else:
+            performance["losses"] += 1
+
+        rules = self.scoring_rules
+        robot_index = robot_position - 1
+        alliance_data = match["score_breakdown"][alliance_color]
+        match_points = {"auto": 0, "teleop": 0, "endgame": 0, "total": 0}
+        alliance_total = rules.fields["total_points"](alliance_data)
+        mobility = [
+            rules.mobility_codes.get(alliance_data.get(key), MOBILITY_OTHER)
+            for key in rules.mobility_keys
+        ]
+
+        # Initialize match record to be added to match_history
+        match_record = {
+            "match_key": match["key"],
+            "alliance": alliance_color,
+            "result": "win" if match["winning_alliance"] == alliance_color else "loss",
+            "robot_position": robot_position,
+            "auto_line": alliance_data.get(rules.mobility_keys[robot_index]),
+            "endgame": alliance_data.get(rules.endgame_keys[robot_index]),
+            "estimated_points": {"auto": 0, "teleop": 0, "endgame": 0, "total": 0},
+            "alliance_total": alliance_total,
+            "contribution_percentage": 0.0,
+        }
+
+        self.__calculate_auto_performance(
+            performance,
+            match_points,
+            match_record,
+            alliance_data,
+            mobility,
+            robot_index,
+        )
+        self.__calculate_teleop_performance(
+            performance,
+            match_points,
+            match_record,
+            alliance_data,
+            mobility,
+            robot_index,
+        )
+        self.__calculate_endgame_performance(
+            performance, match_points, match_record, alliance_data, robot_index
+        )
+
+        # Calculate total contribution for this match
+        match_points["total"] = (
+            match_points["auto"] + match_points["teleop"] + match_points["endgame"]
+        )
+        match_record["estimated_points"]["total"] = match_points["total"]
+
+        # Calculate contribution percentage
+        contribution_percentage = (
+            match_points["total"] / alliance_total if alliance_total > 0 else 0
+        )
+        match_record["contribution_percentage"] = contribution_percentage
+
+        # Add match record to history
+        performance["overall_metrics"]["total_estimated_points"] += match_points[
+            "total"
+        ]
+        if keep_history:
+            performance["match_history"].append(match_record)
+
+        return contribution_percentage
+
+    def finalize(
+        self,
+        performance: dict,
+        contribution_percentages: list,
+        contribution_stats: tuple[float, float] | None = None,
+    ):
+        """
+        Derives the rates, averages and consistency metrics once every match was added.
+
+        Args
+        -----
+        performance : dict
+            The team's performance dict.
+        contribution_percentages : list
+            The team's contribution percentage of every match.
+        contribution_stats : tuple[float, float] | None, optional
+            (mean, population variance) of the contribution percentages when they are already
+            known, e.g. from a running accumulator. Skips the passes over contribution_percentages.
+        """
+        if performance["matches_played"] > 0:
+            # Auto performance rates
+            performance["auto_performance"]["line_cross_success_rate"] = (
+                performance["auto_performance"]["auto_line_crosses"]
+                / performance["matches_played"]
+            )
+            performance["auto_performance"]["avg_auto_contribution"] = (
+                performance["auto_performance"]["total_auto_points"]
+                / performance["matches_played"]
+            )
+
+            # Teleop performance rates
+            performance["teleop_performance"]["avg_teleop_contribution"] = (
+                performance["teleop_performance"]["total_teleop_points"]
+                / performance["matches_played"]
+            )
+            performance["teleop_performance"]["estimated_coral_per_match"] = (
+                performance["teleop_performance"]["total_coral_count"]
+                / performance["matches_played"]
+            )
+
+            # Endgame performance rates
+            endgame_performance = performance["endgame_performance"]
+            for count_key, rate_key in zip(
+                self.scoring_rules.endgame_count_keys,
+                self.scoring_rules.endgame_rate_keys,
+            ):
+                endgame_performance[rate_key] = (
+                    endgame_performance[count_key] / performance["matches_played"]
+                )
+            performance["endgame_performance"]["avg_endgame_points"] = (
+                performance["endgame_performance"]["total_endgame_points"]
+                / performance["matches_played"]
+            )
+
+            # Overall performance metrics
+            performance["overall_metrics"]["avg_points_per_match"] = (
+                performance["overall_metrics"]["total_estimated_points"]
+                / performance["matches_played"]
+            )
+
+            # Calculate consistency metrics
+            if contribution_percentages or contribution_stats != None:
+                performance["overall_metrics"][
+                    "contribution_percentages"
+                ] = contribution_percentages
+                if contribution_stats != None:
+                    mean, variance = contribution_stats
+                else:
+                    mean = sum(contribution_percentages) / len(contribution_percentages)
+                    variance = sum(
+                        (x - mean) ** 2 for x in contribution_percentages
+                    ) / len(contribution_percentages)
+                performance["overall_metrics"]["avg_contribution_percentage"] = round(
+                    mean, STATISTIC_DECIMALS
+                )
+
+                # Calculate standard deviation
+                std_dev = variance**0.5
+
+                # Higher consistency means lower standard deviation relative to the mean
+                performance["overall_metrics"]["consistency_rating"] = round(
+                    1 - (std_dev / mean if mean > 0 else 0), STATISTIC_DECIMALS
+                )
+
+    def __calculate_auto_performance(
+        self,
+        performance,
+        match_points,
+        match_record,
+        alliance_data,
+        mobility,
+        robot_index,
+    ):
+        rules = self.scoring_rules
+        if mobility[robot_index] == MOBILITY_YES:
+            performance["auto_performance"]["auto_line_crosses"] += 1
+            estimated_auto_points = rules.mobility_points
+
+            # If auto bonus achieved, attribute partial credit for game pieces as the data doesn't track who scored them
+            if rules.auto_bonus(alliance_data):
+                robots_crossed = mobility.count(MOBILITY_YES)
+                auto_piece_points = rules.fields["auto_piece_points"](alliance_data)
+                estimated_auto_points += auto_piece_points / robots_crossed
+
+                # Track auto game piece count (approximately)
+                auto_piece_count = (
+                    rules.fields["auto_piece_count"](alliance_data) / robots_crossed
+                )
+                performance["auto_performance"]["auto_coral_count"] += auto_piece_count
+        else:
+            estimated_auto_points = 0
+
+        performance["auto_performance"]["total_auto_points"] += estimated_auto_points
+        match_points["auto"] = estimated_auto_points
+        match_record["estimated_points"]["auto"] = estimated_auto_points
+
+    def __calculate_endgame_performance(
+        self, performance, match_points, match_record, alliance_data, robot_index
+    ):
+        rules = self.scoring_rules
+        endgame_code = rules.endgame_code(
+            alliance_data.get(rules.endgame_keys[robot_index])
+        )
+        performance["endgame_performance"][
+            rules.endgame_code_count_keys[endgame_code]
+        ] += 1
+        estimated_endgame_points = rules.endgame_points[endgame_code]
+
+        performance["endgame_performance"][
+            "total_endgame_points"
+        ] += estimated_endgame_points
+        match_points["endgame"] = estimated_endgame_points
+        match_record["estimated_points"]["endgame"] = estimated_endgame_points
+
+    def __calculate_teleop_performance(
+        self,
+        performance,
+        match_points,
+        match_record,
+        alliance_data,
+        mobility,
+        robot_index,
+    ):
+        rules = self.scoring_rules
+        # Adjust based on activity levels (if a robot didn't move in auto, might be less active)
+        activity_adjustments = [
+            0.7 if code == MOBILITY_NO else 1.0 for code in mobility
+        ]
+        total_activity = (
+            activity_adjustments[0] + activity_adjustments[1] + activity_adjustments[2]
+        )
+        share = activity_adjustments[robot_index]
+
+        # Calculate adjusted teleop estimate
+        adjusted_teleop_estimate = (
+            rules.fields["teleop_points"](alliance_data) * share / total_activity
+        )
+
+        # Track game piece counts
+        total_pieces = rules.fields["teleop_piece_count"](alliance_data)
+        performance["teleop_performance"]["total_coral_count"] += (
+            total_pieces * share / total_activity
+        )
+
+        # Attribute placements based on activity adjustment
+        placements = performance["teleop_performance"][rules.placement_group]
+        for name, field in zip(rules.placement_names, rules.placement_fields):
+            placements[name] += field(alliance_data) * share / total_activity
+
+        performance["teleop_performance"][
+            "total_teleop_points"
+        ] += adjusted_teleop_estimate
+        match_points["teleop"] = adjusted_teleop_estimate
+        match_record["estimated_points"]["teleop"] = adjusted_teleop_estimate
@@ -0,0 +1,294 @@
+import numpy as np
+
+from analytics.opr import OprPredictor
+from analytics.performance import PerformanceCalculator
+from analytics.scoring_rules import get_event_scoring_rules
+
+
+class RankingSimulator:
+    """
+    Monte Carlo simulation of the remaining qualification schedule.
+
+    Played qualification matches give every team its current ranking points. Each
+    unplayed match is simulated as two normally distributed alliance scores, centered
+    on the alliances' OPR sums with the OPR fit's residual spread, and every bonus
+    ranking point is drawn with the alliance's average rate of earning it so far.
+
+    All iterations of a batch are simulated at once: the ranking points and scores
+    of the alliances are matrices of iterations x alliances, which are multiplied
+    with an alliances x teams incidence matrix to get every team's totals. Teams are
+    ranked by ranking score (average ranking points), then by average match score.
+    """
+
+    def __init__(
+        self,
+        iterations: int = 10000,
+        batch_size: int = 2500,
+        win_points: int | None = None,
+        tie_points: int | None = None,
+        bonus_fields: tuple | None = None,
+        opr_ridge: float = 1.0,
+        seed: int | None = None,
+    ):
+        """
+        Args
+        -----
+        iterations : int, optional
+            Number of simulated schedules.
+        batch_size : int, optional
+            Number of schedules simulated at once, bounds the memory used.
+        win_points : int | None, optional
+            Ranking points for a win, the event's season's by default.
+        tie_points : int | None, optional
+            Ranking points for a tie, the event's season's by default.
+        bonus_fields : tuple | None, optional
+            Score breakdown flags that are worth one ranking point each, the event's season's by default.
+        opr_ridge : float, optional
+            Regularization of the OPR solve the simulated scores are based on, see OprPredictor.
+        seed : int | None, optional
+            Seed of the random generator, for reproducible results.
+        """
+        self.iterations = iterations
+        self.batch_size = batch_size
+        self.win_points = win_points
+        self.tie_points = tie_points
+        self.bonus_fields = bonus_fields
+        self.opr_ridge = opr_ridge
+        self.seed = seed
+
+    def simulate(self, matches: list) -> dict:
+        """
+        Simulates the unplayed qualification matches of an event.
+
+        Args
+        -----
+        matches : list
+            The event's matches as returned by TheBlueAlliance API. Only qualification matches are used,
+            matches without a score breakdown are the ones simulated.
+
+        Returns
+        -------
+        dict
+            team number -> {"current_ranking_points", "matches_remaining", "mean_ranking_score", "mean_rank",
+            "best_rank", "worst_rank", "top_8_probability", "rank_probabilities"}, where rank_probabilities[i]
+            is the probability of finishing at rank i + 1.
+        """
+        qualification_matches = [
+            match for match in matches if match.get("comp_level", "qm") == "qm"
+        ]
+        played_matches = [
+            match
+            for match in qualification_matches
+            if match.get("score_breakdown") != None
+        ]
+        unplayed_matches = [
+            match
+            for match in qualification_matches
+            if match.get("score_breakdown") == None
+        ]
+
+        team_indexes = {}
+        for match in qualification_matches:
+            for alliance_color in ("red", "blue"):
+                for team_key in match["alliances"][alliance_color]["team_keys"]:
+                    team_indexes.setdefault(team_key, len(team_indexes))
+        team_count = len(team_indexes)
+        if team_count == 0:
+            return {}
+
+        # The ranking rules of the event's season, unless they were given
+        scoring_rules = get_event_scoring_rules(
+            qualification_matches[0].get("event_key")
+        )
+        win_points = (
+            self.win_points
+            if self.win_points != None
+            else scoring_rules.win_ranking_points
+        )
+        tie_points = (
+            self.tie_points
+            if self.tie_points != None
+            else scoring_rules.tie_ranking_points
+        )
+        bonus_fields = (
+            self.bonus_fields
+            if self.bonus_fields != None
+            else scoring_rules.bonus_ranking_point_keys
+        )
+
+        current_points, current_scores, match_counts, bonus_rates = (
+            self.__played_totals(
+                played_matches, team_indexes, win_points, tie_points, bonus_fields
+            )
+        )
+
+        # Alliances of the unplayed matches: rows 2i (red) and 2i + 1 (blue) of match i
+        incidence = np.zeros((2 * len(unplayed_matches), team_count))
+        alliance_bonus_probabilities = np.zeros(
+            (2 * len(unplayed_matches), len(bonus_fields))
+        )
+        alliances = []
+        for match_index, match in enumerate(unplayed_matches):
+            team_numbers = []
+            for offset, alliance_color in enumerate(("red", "blue")):
+                team_keys = match["alliances"][alliance_color]["team_keys"]
+                row = 2 * match_index + offset
+                indexes = [team_indexes[team_key] for team_key in team_keys]
+                incidence[row, indexes] = 1
+                alliance_bonus_probabilities[row] = bonus_rates[indexes].mean(axis=0)
+                team_numbers.append(
+                    [
+                        PerformanceCalculator.team_number_from_key(team_key)
+                        for team_key in team_keys
+                    ]
+                )
+            alliances.append(tuple(team_numbers))
+        final_match_counts = np.maximum(match_counts + incidence.sum(axis=0), 1)
+
+        opr_model = OprPredictor(self.opr_ridge, scoring_rules).fit(played_matches)
+        predictions = opr_model.predict_many(alliances)
+        mean_scores = np.array(
+            [
+                value
+                for prediction in predictions
+                for value in (prediction["red_score"], prediction["blue_score"])
+            ]
+        )
+        score_sigma = opr_model.score_sigma
+
+        generator = np.random.default_rng(self.seed)
+        rank_counts = np.zeros((team_count, team_count), dtype=np.int64)
+        ranking_score_sums = np.zeros(team_count)
+        simulated = 0
+        while simulated < self.iterations:
+            batch = min(self.batch_size, self.iterations - simulated)
+            simulated += batch
+
+            points = np.broadcast_to(current_points, (batch, team_count)).copy()
+            scores = np.broadcast_to(current_scores, (batch, team_count)).copy()
+            if len(unplayed_matches):
+                alliance_scores = np.rint(
+                    np.maximum(
+                        mean_scores
+                        + score_sigma
+                        * generator.standard_normal((batch, len(mean_scores))),
+                        0,
+                    )
+                )
+                red_scores = alliance_scores[:, 0::2]
+                blue_scores = alliance_scores[:, 1::2]
+
+                alliance_points = np.empty_like(alliance_scores)
+                alliance_points[:, 0::2] = np.where(
+                    red_scores > blue_scores,
+                    win_points,
+                    np.where(red_scores == blue_scores, tie_points, 0),
+                )
+                alliance_points[:, 1::2] = np.where(
+                    blue_scores > red_scores,
+                    win_points,
+                    np.where(red_scores == blue_scores, tie_points, 0),
+                )
+                alliance_points += (
+                    generator.random((batch,) + alliance_bonus_probabilities.shape)
+                    < alliance_bonus_probabilities
+                ).sum(axis=2)
+
+                points += alliance_points @ incidence
+                scores += alliance_scores @ incidence
+
+            ranking_scores = points / final_match_counts
+            ranking_score_sums += ranking_scores.sum(axis=0)
+
+            # Sort by ranking score, then average score, remaining ties are broken randomly
+            order = np.lexsort(
+                (
+                    generator.random((batch, team_count)),
+                    -scores / final_match_counts,
+                    -ranking_scores,
+                ),
+                axis=1,
+            )
+            ranks = np.empty_like(order)
+            np.put_along_axis(
+                ranks,
+                order,
+                np.broadcast_to(np.arange(team_count), order.shape),
+                axis=1,
+            )
+            rank_counts += np.bincount(
+                (np.arange(team_count) * team_count + ranks).ravel(),
+                minlength=team_count * team_count,
+            ).reshape(team_count, team_count)
+
+        rank_probabilities = rank_counts / self.iterations
+        positions = np.arange(1, team_count + 1)
+        results = {}
+        for team_key, index in team_indexes.items():
+            observed_ranks = np.nonzero(rank_counts[index])[0]
+            results[PerformanceCalculator.team_number_from_key(team_key)] = {
+                "current_ranking_points": float(current_points[index]),
+                "matches_remaining": int(incidence[:, index].sum()),
+                "mean_ranking_score": float(
+                    ranking_score_sums[index] / self.iterations
+                ),
+                "mean_rank": float(rank_probabilities[index] @ positions),
+                "best_rank": int(observed_ranks[0] + 1),
+                "worst_rank": int(observed_ranks[-1] + 1),
+                "top_8_probability": float(rank_probabilities[index, :8].sum()),
+                "rank_probabilities": rank_probabilities[index].tolist(),
+            }
+        return results
+
+    def __played_totals(
+        self,
+        played_matches: list,
+        team_indexes: dict,
+        win_points: int,
+        tie_points: int,
+        bonus_fields: tuple,
+    ) -> tuple:
+        team_count = len(team_indexes)
+        current_points = np.zeros(team_count)
+        current_scores = np.zeros(team_count)
+        match_counts = np.zeros(team_count)
+        bonus_counts = np.zeros((team_count, len(bonus_fields)))
+
+        for match in played_matches:
+            for alliance_color, opponent_color in (("red", "blue"), ("blue", "red")):
+                alliance_data = match["score_breakdown"][alliance_color]
+                score = match["alliances"][alliance_color]["score"]
+                opponent_score = match["alliances"][opponent_color]["score"]
+                bonuses = [bool(alliance_data.get(field)) for field in bonus_fields]
+
+                # TBA reports the ranking points, they are only rebuilt from the rules when missing
+                ranking_points = alliance_data.get("rp")
+                if ranking_points == None:
+                    if score > opponent_score:
+                        ranking_points = win_points
+                    elif score == opponent_score:
+                        ranking_points = tie_points
+                    else:
+                        ranking_points = 0
+                    ranking_points += sum(bonuses)
+
+                for team_key in match["alliances"][alliance_color]["team_keys"]:
+                    index = team_indexes[team_key]
+                    current_points[index] += ranking_points
+                    current_scores[index] += score
+                    match_counts[index] += 1
+                    bonus_counts[index] += bonuses
+
+        # Teams without a played match get the event's average bonus rates
+        total_matches = match_counts.sum()
+        event_rates = (
+            bonus_counts.sum(axis=0) / total_matches
+            if total_matches
+            else np.zeros(len(bonus_fields))
+        )
+        bonus_rates = np.where(
+            match_counts[:, None] > 0,
+            bonus_counts / np.maximum(match_counts, 1)[:, None],
+            event_rates,
+        )
+        return current_points, current_scores, match_counts, bonus_rates
@@ -0,0 +1,461 @@
+import numpy as np
+
+# Integer codes of a robot's auto mobility (left the starting line / taxi / mobility)
+MOBILITY_OTHER = 0
+MOBILITY_YES = 1
+MOBILITY_NO = 2
+
+# Alliance level values the metrics engines and the match store read, by role
+ALLIANCE_FIELD_ROLES = (
+    "auto_points",
+    "teleop_points",
+    "endgame_points",
+    "foul_points",
+    "total_points",
+    "ranking_points",
+    "auto_piece_points",
+    "auto_piece_count",
+    "teleop_piece_count",
+)
+# The match store has room for this many placement counts per alliance, see PLACEMENT_COLUMNS
+MAX_PLACEMENTS = 4
+
+# Declarative scoring rules of each season's TBA score breakdown.
+#
+# "mobility" and "endgame" are per robot fields, "{robot}" is replaced by 1 to 3.
+# Endgame states map a label to (bucket, points), the "other" label and bucket
+# stand for anything else, worth no points. Several labels may share a bucket.
+# Alliance fields are breakdown keys, dotted keys read nested dicts and a list
+# of keys is summed. Auto game pieces are credited to the robots that left the
+# starting line, only when "auto_bonus" was achieved if the season has one.
+# "ranking" holds the qualification ranking points of a win and a tie, and the
+# breakdown flags worth one bonus ranking point each.
+SEASON_SCORING_RULES = {
+    2022: {
+        "game": "Rapid React",
+        "mobility": {
+            "field": "taxiRobot{robot}",
+            "yes": "Yes",
+            "no": "No",
+            "points": 2,
+        },
+        "endgame": {
+            "field": "endgameRobot{robot}",
+            "states": {
+                "Low": ("low_rung", 4),
+                "Mid": ("mid_rung", 6),
+                "High": ("high_rung", 10),
+                "Traversal": ("traversal_rung", 15),
+            },
+            "other": ("None", "none"),
+        },
+        "auto_bonus": None,
+        "ranking": {
+            "win": 2,
+            "tie": 1,
+            "bonuses": ("cargoBonusRankingPoint", "hangarBonusRankingPoint"),
+        },
+        "alliance": {
+            "auto_points": "autoPoints",
+            "teleop_points": "teleopPoints",
+            "endgame_points": "endgamePoints",
+            "foul_points": "foulPoints",
+            "total_points": "totalPoints",
+            "ranking_points": "rp",
+            "auto_piece_points": "autoCargoPoints",
+            "auto_piece_count": "autoCargoTotal",
+            "teleop_piece_count": "teleopCargoTotal",
+        },
+        "placements": (
+            "hub_placements",
+            {
+                "upper": [
+                    "teleopCargoUpperNear",
+                    "teleopCargoUpperFar",
+                    "teleopCargoUpperBlue",
+                    "teleopCargoUpperRed",
+                ],
+                "lower": [
+                    "teleopCargoLowerNear",
+                    "teleopCargoLowerFar",
+                    "teleopCargoLowerBlue",
+                    "teleopCargoLowerRed",
+                ],
+            },
+        ),
+    },
+    2023: {
+        "game": "Charged Up",
+        "mobility": {
+            "field": "mobilityRobot{robot}",
+            "yes": "Yes",
+            "no": "No",
+            "points": 3,
+        },
+        "endgame": {
+            "field": "endGameChargeStationRobot{robot}",
+            # Engaged is an alliance state, docked robots are counted at the docked value
+            "states": {"Park": ("parked", 2), "Docked": ("docked", 6)},
+            "other": ("None", "none"),
+        },
+        "auto_bonus": None,
+        "ranking": {
+            "win": 2,
+            "tie": 1,
+            "bonuses": ("sustainabilityBonusAchieved", "activationBonusAchieved"),
+        },
+        "alliance": {
+            "auto_points": "autoPoints",
+            "teleop_points": "teleopPoints",
+            "endgame_points": ["endGameChargeStationPoints", "endGameParkPoints"],
+            "foul_points": "foulPoints",
+            "total_points": "totalPoints",
+            "ranking_points": "rp",
+            "auto_piece_points": "autoGamePiecePoints",
+            "auto_piece_count": "autoGamePieceCount",
+            "teleop_piece_count": "teleopGamePieceCount",
+        },
+        "placements": ("grid_placements", {}),
+    },
+    2024: {
+        "game": "Crescendo",
+        "mobility": {
+            "field": "autoLineRobot{robot}",
+            "yes": "Yes",
+            "no": "No",
+            "points": 2,
+        },
+        "endgame": {
+            "field": "endGameRobot{robot}",
+            "states": {
+                "Parked": ("parked", 1),
+                "StageLeft": ("onstage", 3),
+                "CenterStage": ("onstage", 3),
+                "StageRight": ("onstage", 3),
+            },
+            "other": ("None", "none"),
+        },
+        "auto_bonus": None,
+        "ranking": {
+            "win": 2,
+            "tie": 1,
+            "bonuses": ("melodyBonusAchieved", "ensembleBonusAchieved"),
+        },
+        "alliance": {
+            "auto_points": "autoPoints",
+            "teleop_points": "teleopPoints",
+            "endgame_points": "endGameTotalStagePoints",
+            "foul_points": "foulPoints",
+            "total_points": "totalPoints",
+            "ranking_points": "rp",
+            "auto_piece_points": ["autoSpeakerNotePoints", "autoAmpNotePoints"],
+            "auto_piece_count": ["autoSpeakerNoteCount", "autoAmpNoteCount"],
+            "teleop_piece_count": [
+                "teleopSpeakerNoteCount",
+                "teleopSpeakerNoteAmplifiedCount",
+                "teleopAmpNoteCount",
+            ],
+        },
+        "placements": (
+            "note_placements",
+            {
+                "speaker": "teleopSpeakerNoteCount",
+                "amplified_speaker": "teleopSpeakerNoteAmplifiedCount",
+                "amp": "teleopAmpNoteCount",
+            },
+        ),
+    },
+    2025: {
+        "game": "Reefscape",
+        "mobility": {
+            "field": "autoLineRobot{robot}",
+            "yes": "Yes",
+            "no": "No",
+            "points": 3,
+        },
+        "endgame": {
+            "field": "endGameRobot{robot}",
+            "states": {
+                "Parked": ("parked", 2),
+                "DeepCage": ("deep_cage", 12),
+                "ShallowCage": ("shallow_cage", 6),
+            },
+            "other": ("None", "none"),
+        },
+        "auto_bonus": "autoBonusAchieved",
+        "ranking": {
+            "win": 3,
+            "tie": 1,
+            "bonuses": (
+                "autoBonusAchieved",
+                "coralBonusAchieved",
+                "bargeBonusAchieved",
+            ),
+        },
+        "alliance": {
+            "auto_points": "autoPoints",
+            "teleop_points": "teleopPoints",
+            "endgame_points": "endGameBargePoints",
+            "foul_points": "foulPoints",
+            "total_points": "totalPoints",
+            "ranking_points": "rp",
+            "auto_piece_points": "autoCoralPoints",
+            "auto_piece_count": "autoCoralCount",
+            "teleop_piece_count": "teleopCoralCount",
+        },
+        "placements": (
+            "reef_placements",
+            {
+                "top_row": "teleopReef.tba_topRowCount",
+                "mid_row": "teleopReef.tba_midRowCount",
+                "bot_row": "teleopReef.tba_botRowCount",
+                "trough": "teleopReef.trough",
+            },
+        ),
+    },
+}
+
+
+def compile_field(path):
+    """
+    Compiles a breakdown field path into a function reading it from an alliance's score breakdown.
+
+    Args
+    -----
+    path : str | list | None
+        A key, a dotted key reading nested dicts, a list of those to sum, or None for a field
+        the season doesn't have.
+
+    Returns
+    -------
+    callable
+        getter(alliance_data), missing or null values read as 0.
+    """
+    if path == None:
+        return lambda alliance_data: 0
+    if isinstance(path, (list, tuple)):
+        getters = [compile_field(part) for part in path]
+        return lambda alliance_data: sum(getter(alliance_data) for getter in getters)
+
+    keys = path.split(".")
+    if len(keys) == 1:
+        key = keys[0]
+        return lambda alliance_data: alliance_data.get(key) or 0
+    if len(keys) == 2:
+        outer_key, inner_key = keys
+        return (
+            lambda alliance_data: (alliance_data.get(outer_key) or {}).get(inner_key)
+            or 0
+        )
+
+    def get_nested(alliance_data):
+        value = alliance_data
+        for key in keys:
+            value = value.get(key) if isinstance(value, dict) else None
+        return value or 0
+
+    return get_nested
+
+
+def _first_path(path):
+    # Where a value is written back, the first key of a summed field
+    if isinstance(path, (list, tuple)):
+        return _first_path(path[0]) if path else None
+    return path
+
+
+def _set_path(alliance_data: dict, path, value):
+    path = _first_path(path)
+    if path == None:
+        return
+    keys = path.split(".")
+    for key in keys[:-1]:
+        alliance_data = alliance_data.setdefault(key, {})
+    alliance_data[keys[-1]] = value
+
+
+class ScoringRules:
+    """
+    A season's scoring rules compiled into the lookups the metrics engines use.
+
+    The per robot breakdown keys are formatted once, the robot states are mapped
+    to integer codes with their points and performance buckets in tables indexed
+    by code, and the alliance fields are compiled into getter functions, so
+    reading a match takes no string formatting or label comparisons.
+    """
+
+    def __init__(self, year: int, definition: dict):
+        """
+        Args
+        -----
+        year : int
+            The season.
+        definition : dict
+            The season's entry of SEASON_SCORING_RULES.
+        """
+        self.year = year
+        self.game = definition["game"]
+
+        mobility = definition["mobility"]
+        self.mobility_keys = tuple(
+            mobility["field"].format(robot=robot) for robot in (1, 2, 3)
+        )
+        self.mobility_codes = {
+            mobility["yes"]: MOBILITY_YES,
+            mobility["no"]: MOBILITY_NO,
+        }
+        # code -> label, None for the states that aren't a yes or a no
+        self.mobility_labels = (None, mobility["yes"], mobility["no"])
+        self.mobility_points = mobility["points"]
+
+        endgame = definition["endgame"]
+        other_label, other_bucket = endgame["other"]
+        self.endgame_keys = tuple(
+            endgame["field"].format(robot=robot) for robot in (1, 2, 3)
+        )
+        # Code 0 is the "other" state, the season's states follow in definition order
+        self.endgame_labels = (other_label,) + tuple(endgame["states"])
+        self.endgame_codes = {
+            label: code for code, label in enumerate(self.endgame_labels) if code > 0
+        }
+        self.endgame_points = (0,) + tuple(
+            points for _, points in endgame["states"].values()
+        )
+        buckets = list(
+            dict.fromkeys(bucket for bucket, _ in endgame["states"].values())
+        )
+        if other_bucket not in buckets:
+            buckets.append(other_bucket)
+        self.endgame_buckets = tuple(buckets)
+        self.endgame_bucket_index = (buckets.index(other_bucket),) + tuple(
+            buckets.index(bucket) for bucket, _ in endgame["states"].values()
+        )
+        # Performance dict keys, by bucket index and by code
+        self.endgame_count_keys = tuple(f"{bucket}_count" for bucket in buckets)
+        self.endgame_rate_keys = tuple(f"{bucket}_rate" for bucket in buckets)
+        self.endgame_code_count_keys = tuple(
+            self.endgame_count_keys[bucket_index]
+            for bucket_index in self.endgame_bucket_index
+        )
+
+        self.auto_bonus_key = definition["auto_bonus"]
+        ranking = definition["ranking"]
+        self.win_ranking_points = ranking["win"]
+        self.tie_ranking_points = ranking["tie"]
+        self.bonus_ranking_point_keys = tuple(ranking["bonuses"])
+        self.__alliance_paths = definition["alliance"]
+        missing_roles = set(ALLIANCE_FIELD_ROLES) - set(self.__alliance_paths)
+        if missing_roles:
+            raise ValueError(
+                f"Scoring rules of {year} miss the fields {sorted(missing_roles)}"
+            )
+        self.fields = {
+            role: compile_field(path) for role, path in self.__alliance_paths.items()
+        }
+
+        self.placement_group, placements = definition["placements"]
+        if len(placements) > MAX_PLACEMENTS:
+            raise ValueError(
+                f"Scoring rules of {year} have more than {MAX_PLACEMENTS} placements"
+            )
+        self.__placement_paths = tuple(placements.values())
+        self.placement_names = tuple(placements)
+        self.placement_fields = tuple(
+            compile_field(path) for path in self.__placement_paths
+        )
+
+    def mobility_code(self, label) -> int:
+        return self.mobility_codes.get(label, MOBILITY_OTHER)
+
+    def endgame_code(self, label) -> int:
+        return self.endgame_codes.get(label, 0)
+
+    def endgame_point_table(self) -> np.ndarray:
+        """Points of each endgame code, for indexing with an array of codes"""
+        return np.array(self.endgame_points)
+
+    def auto_bonus(self, alliance_data: dict) -> bool:
+        """Whether the alliance's auto game pieces are credited, always for seasons without a bonus"""
+        if self.auto_bonus_key == None:
+            return True
+        return bool(alliance_data.get(self.auto_bonus_key))
+
+    def build_alliance_breakdown(
+        self,
+        mobility_codes,
+        endgame_codes,
+        auto_bonus: bool,
+        field_values: dict,
+        placement_values,
+    ) -> dict:
+        """
+        Rebuilds an alliance's score breakdown in the season's TBA format from coded values.
+
+        Summed fields are written whole to their first key, so reading the breakdown back
+        gives the same values.
+
+        Args
+        -----
+        mobility_codes : sequence of int
+            Mobility code of each robot.
+        endgame_codes : sequence of int
+            Endgame code of each robot.
+        auto_bonus : bool
+            Whether the auto bonus was achieved, ignored for seasons without one.
+        field_values : dict
+            Alliance field values by role.
+        placement_values : sequence
+            Placement counts in the order of placement_names.
+        """
+        alliance_data = {}
+        for robot_index in range(3):
+            alliance_data[self.mobility_keys[robot_index]] = self.mobility_labels[
+                int(mobility_codes[robot_index])
+            ]
+            alliance_data[self.endgame_keys[robot_index]] = self.endgame_labels[
+                int(endgame_codes[robot_index])
+            ]
+        if self.auto_bonus_key != None:
+            alliance_data[self.auto_bonus_key] = bool(auto_bonus)
+        for role, value in field_values.items():
+            _set_path(alliance_data, self.__alliance_paths[role], value)
+        for path, value in zip(self.__placement_paths, placement_values):
+            _set_path(alliance_data, path, value)
+        return alliance_data
+
+
+# Compiled once when the module is first imported
+COMPILED_SCORING_RULES = {
+    year: ScoringRules(year, definition)
+    for year, definition in SEASON_SCORING_RULES.items()
+}
+LATEST_SEASON = max(COMPILED_SCORING_RULES)
+
+
+def get_scoring_rules(year: int | None = None) -> ScoringRules:
+    """
+    Returns a season's compiled scoring rules.
+
+    Args
+    -----
+    year : int | None, optional
+        The season, the latest defined one by default.
+
+    Raises
+    ------
+    ValueError
+        If the season has no definition in SEASON_SCORING_RULES. A new season's
+        score breakdown is never read with another season's field names.
+    """
+    if year == None:
+        return COMPILED_SCORING_RULES[LATEST_SEASON]
+    rules = COMPILED_SCORING_RULES.get(int(year))
+    if rules == None:
+        raise ValueError(f"No scoring rules for the {year} season")
+    return rules
+
+
+def get_event_scoring_rules(event_key: str | None) -> ScoringRules:
+    """Scoring rules of an event's season, read from its key (2025incmp), the latest season's without a key"""
+    year = event_key[:4] if event_key else ""
+    return get_scoring_rules(int(year) if year.isdigit() else None)
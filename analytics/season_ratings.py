@@ -0,0 +1,278 @@
+import numpy as np
+
+from analytics.match_store import MatchStore
+from analytics.performance import PerformanceCalculator
+
+# Matches without a recorded time sort after every timed match of the season
+UNKNOWN_TIME = np.iinfo(np.int64).max
+
+
+class SeasonRatingCalculator:
+    """
+    Elo and EPA ratings of every team over a season, from MatchStore records.
+
+    The played matches are replayed once in chronological order (events by their
+    first match, matches in schedule order within an event) and both ratings are
+    updated after every match, so a rating only ever reflects the matches played
+    before it. Along the way every team's ratings and average score at the end of
+    each of its events are kept, which gives its trend over the season.
+
+    Elo rates winning: alliances are compared by the sum of their teams' Elos and the
+    winner takes points from the loser. EPA (expected points added) rates scoring: a
+    team's EPA is its share of its alliance's score, the alliance's prediction is the
+    sum of its teams' EPAs and every team absorbs a third of the prediction error.
+    Foul points are left out of the scores EPA learns from, since they are earned by
+    the opponents.
+    """
+
+    def __init__(
+        self,
+        elo_start: float = 1500,
+        elo_k: float = 12,
+        elo_playoff_k: float = 3,
+        epa_weight_start: float = 0.5,
+        epa_weight_end: float = 0.1,
+        epa_weight_matches: int = 12,
+        epa_playoff_factor: float = 1 / 3,
+    ):
+        """
+        Args
+        -----
+        elo_start : float, optional
+            Elo of a team before its first match.
+        elo_k : float, optional
+            Elo points at stake in a qualification match.
+        elo_playoff_k : float, optional
+            Elo points at stake in a playoff match, lower since playoff alliances are picked.
+        epa_weight_start : float, optional
+            Share of the prediction error a team's EPA absorbs in its first match.
+        epa_weight_end : float, optional
+            Share absorbed once the team played epa_weight_matches matches, the weight
+            decreases linearly in between so early matches move a new team quickly.
+        epa_weight_matches : int, optional
+            Number of matches over which the weight goes from start to end.
+        epa_playoff_factor : float, optional
+            Multiplier of the weight in playoff matches.
+        """
+        self.elo_start = elo_start
+        self.elo_k = elo_k
+        self.elo_playoff_k = elo_playoff_k
+        self.epa_weight_start = epa_weight_start
+        self.epa_weight_end = epa_weight_end
+        self.epa_weight_matches = epa_weight_matches
+        self.epa_playoff_factor = epa_playoff_factor
+        # Share of the matches whose winner the ratings before the match predicted, set by compute
+        self.prediction_accuracy = {}
+
+    def __epa_weight(self, matches_played: int) -> float:
+        progress = min(matches_played / self.epa_weight_matches, 1)
+        return self.epa_weight_start + progress * (
+            self.epa_weight_end - self.epa_weight_start
+        )
+
+    @staticmethod
+    def chronological_order(rows: np.ndarray) -> np.ndarray:
+        """
+        Returns the indexes of the played records in replay order.
+
+        The store keeps records grouped by event in schedule order, events are
+        ordered by the time of their first match.
+        """
+        played_indexes = np.flatnonzero(rows["played"])
+        if len(played_indexes) == 0:
+            return played_indexes
+        played = rows[played_indexes]
+        event_keys, event_starts = np.unique(played["event_key"], return_index=True)
+        times = np.where(played["time"] > 0, played["time"], UNKNOWN_TIME)
+        first_times = np.minimum.reduceat(times, event_starts)
+        event_ends = np.append(event_starts[1:], len(played))
+
+        order = []
+        for event_index in np.lexsort((event_keys, first_times)):
+            order.append(
+                played_indexes[event_starts[event_index] : event_ends[event_index]]
+            )
+        return np.concatenate(order)
+
+    def compute(self, rows: np.ndarray) -> dict:
+        """
+        Rates every team from a season's match records.
+
+        Args
+        -----
+        rows : np.ndarray
+            MatchStore records, e.g. MatchStore.matches(year=2025). Unplayed matches are ignored.
+
+        Returns
+        -------
+        dict
+            Per team, keyed by team number: "team_number", "elo", "epa",
+            "matches_played", "wins", "losses", "ties" and "events", the list of its
+            events in order with the "event_key", "matches_played", "average_score",
+            "elo" and "epa" at the end of the event.
+        """
+        order = self.chronological_order(rows)
+        rows = rows[order]
+
+        # Plain lists, reading NumPy scalars one by one in the loop is much slower
+        event_keys = [event_key.decode("ascii") for event_key in rows["event_key"]]
+        team_codes = rows["teams"].tolist()
+        scores = (rows["total_points"] - rows["foul_points"]).tolist()
+        winners = rows["winner"].tolist()
+        playoffs = (rows["comp_level"] != 0).tolist()
+
+        # team code -> [elo, epa, matches, wins, losses, ties, events,
+        #               current event, event matches, event score total]
+        teams = {}
+        score_total = 0
+        score_count = 0
+        elo_correct = 0
+        epa_correct = 0
+        decided_matches = 0
+
+        for match_index, alliances in enumerate(team_codes):
+            event_key = event_keys[match_index]
+            red_score, blue_score = scores[match_index]
+            winner = winners[match_index]
+            playoff = playoffs[match_index]
+
+            # New teams start at the average score per robot so far
+            if score_count == 0:
+                initial_epa = (red_score + blue_score) / 6
+            else:
+                initial_epa = score_total / score_count / 3
+            states = []
+            for side_codes in alliances:
+                side_states = []
+                for team_code in side_codes:
+                    if team_code == 0:
+                        continue
+                    state = teams.get(team_code)
+                    if state == None:
+                        state = [
+                            self.elo_start,
+                            initial_epa,
+                            0,
+                            0,
+                            0,
+                            0,
+                            [],
+                            None,
+                            0,
+                            0,
+                        ]
+                        teams[team_code] = state
+                    if state[7] != event_key:
+                        self.__close_event(state)
+                        state[7] = event_key
+                    side_states.append(state)
+                states.append(side_states)
+            red_states, blue_states = states
+
+            red_elo = sum(state[0] for state in red_states)
+            blue_elo = sum(state[0] for state in blue_states)
+            red_epa = sum(state[1] for state in red_states)
+            blue_epa = sum(state[1] for state in blue_states)
+
+            if winner != 0:
+                decided_matches += 1
+                red_won = winner == 1
+                elo_correct += (red_elo > blue_elo) == red_won
+                epa_correct += (red_epa > blue_epa) == red_won
+
+            # Elo, the red alliance's expected result against its actual one
+            expected = 1 / (1 + 10 ** ((blue_elo - red_elo) / 400))
+            actual = 1 if winner == 1 else 0 if winner == 2 else 0.5
+            elo_change = (self.elo_playoff_k if playoff else self.elo_k) * (
+                actual - expected
+            )
+
+            for side, side_states in enumerate(states):
+                score = red_score if side == 0 else blue_score
+                error = score - (red_epa if side == 0 else blue_epa)
+                side_elo_change = elo_change if side == 0 else -elo_change
+                won = winner == side + 1
+                for state in side_states:
+                    weight = self.__epa_weight(state[2])
+                    if playoff:
+                        weight *= self.epa_playoff_factor
+                    state[0] += side_elo_change
+                    state[1] += weight * error / len(side_states)
+                    state[2] += 1
+                    if winner == 0:
+                        state[5] += 1
+                    elif won:
+                        state[3] += 1
+                    else:
+                        state[4] += 1
+                    state[8] += 1
+                    state[9] += score
+
+            score_total += red_score + blue_score
+            score_count += 2
+
+        self.prediction_accuracy = {
+            "matches": decided_matches,
+            "elo": elo_correct / decided_matches if decided_matches else None,
+            "epa": epa_correct / decided_matches if decided_matches else None,
+        }
+
+        ratings = {}
+        for team_code, state in teams.items():
+            self.__close_event(state)
+            team_number = PerformanceCalculator.team_number_from_key(
+                MatchStore.decode_team_key(team_code)
+            )
+            ratings[team_number] = {
+                "team_number": team_number,
+                "elo": state[0],
+                "epa": state[1],
+                "matches_played": state[2],
+                "wins": state[3],
+                "losses": state[4],
+                "ties": state[5],
+                "events": state[6],
+            }
+        return ratings
+
+    @staticmethod
+    def __close_event(state: list):
+        # Records the team's ratings at the end of the event it was playing
+        if state[7] == None:
+            return
+        state[6].append(
+            {
+                "event_key": state[7],
+                "matches_played": state[8],
+                "average_score": state[9] / state[8],
+                "elo": state[0],
+                "epa": state[1],
+            }
+        )
+        state[7] = None
+        state[8] = 0
+        state[9] = 0
+
+    @staticmethod
+    def rankings(ratings: dict, by: str = "epa") -> list:
+        """
+        Orders the teams of compute's result, best first.
+
+        Args
+        -----
+        ratings : dict
+            The result of compute.
+        by : str, optional
+            "epa" or "elo".
+
+        Returns
+        -------
+        list
+            The teams' rating dicts with their "rank" added.
+        """
+        if by not in ("epa", "elo"):
+            raise ValueError(f"Unknown rating: {by}")
+        ordered = sorted(ratings.values(), key=lambda rating: -rating[by])
+        return [
+            {"rank": rank, **rating} for rank, rating in enumerate(ordered, start=1)
+        ]
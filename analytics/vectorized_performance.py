@@ -0,0 +1,388 @@
+import numpy as np
+
+from analytics.performance import STATISTIC_DECIMALS, PerformanceCalculator
+from analytics.scoring_rules import (
+    MOBILITY_NO,
+    MOBILITY_OTHER,
+    MOBILITY_YES,
+    ScoringRules,
+    get_scoring_rules,
+)
+
+# Alliance level columns of flatten's output, (column, scoring rules field role)
+ALLIANCE_COLUMNS = (
+    ("auto_piece_points", "auto_piece_points"),
+    ("auto_piece_count", "auto_piece_count"),
+    ("teleop_points", "teleop_points"),
+    ("teleop_piece_count", "teleop_piece_count"),
+    ("total_points", "total_points"),
+)
+
+
+class VectorizedPerformanceCalculator:
+    """
+    NumPy backend producing the same performance dicts as PerformanceCalculator.
+
+    Score breakdowns are flattened into columnar arrays (one row per alliance and
+    one row per team-match), then the attribution math, totals, rates and the
+    consistency standard deviation are computed with vectorized operations.
+    Per-team sums use np.bincount, which accumulates in row order, so the results
+    match the sequential pure Python backend.
+    """
+
+    def __init__(self, scoring_rules: ScoringRules | None = None):
+        """
+        Args
+        -----
+        scoring_rules : ScoringRules | None, optional
+            Scoring rules of the season of the matches, the latest season's by default.
+        """
+        self.scoring_rules = (
+            scoring_rules if scoring_rules != None else get_scoring_rules()
+        )
+        self.__dict_builder = PerformanceCalculator(self.scoring_rules)
+
+    def compute(self, matches: list, team_numbers: list | None = None) -> dict:
+        """
+        Computes the performance metrics of several teams, see PerformanceCalculator.compute.
+
+        Args
+        -----
+        matches : list
+            Matches as returned by TheBlueAlliance API. Matches without a score breakdown are skipped.
+        team_numbers : list | None, optional
+            The teams to compute metrics for. If not provided every team found in the matches is included.
+        """
+        return self.compute_columns(self.flatten(matches, team_numbers))
+
+    def flatten(self, matches: list, team_numbers: list | None = None) -> dict:
+        """
+        Flattens TBA matches into columnar arrays.
+
+        Returns
+        -------
+        dict
+            Alliance level columns (auto_line and endgame codes, auto_bonus, auto_piece_points,
+            auto_piece_count, teleop_points, teleop_piece_count, total_points, placements, won)
+            with one row per alliance, team-match columns (team_index, alliance_index, position) with
+            one row per team-match, and the labels needed to rebuild the match history.
+        """
+        team_indexes = {}
+        team_numbers_out = []
+        if team_numbers != None:
+            for team_number in team_numbers:
+                team_key = f"frc{team_number}"
+                if team_key not in team_indexes:
+                    team_indexes[team_key] = len(team_numbers_out)
+                    team_numbers_out.append(team_number)
+
+        rules = self.scoring_rules
+        mobility_code = rules.mobility_codes.get
+        endgame_code = rules.endgame_codes.get
+        alliance_fields = [
+            (name, rules.fields[role]) for name, role in ALLIANCE_COLUMNS
+        ]
+        alliance_columns = {name: [] for name, _ in ALLIANCE_COLUMNS}
+        alliance_columns["auto_line"] = []
+        alliance_columns["endgame"] = []
+        alliance_columns["auto_bonus"] = []
+        alliance_columns["placements"] = []
+        alliance_columns["won"] = []
+        match_keys = []
+        alliance_colors = []
+        auto_line_labels = []
+        endgame_labels = []
+        team_index = []
+        alliance_index = []
+        position = []
+
+        for match in matches:
+            score_breakdown = match.get("score_breakdown")
+            if score_breakdown == None:
+                continue
+
+            for alliance_color in ("red", "blue"):
+                alliance_row = len(match_keys)
+                alliance_has_team = False
+                for robot_index, team_key in enumerate(
+                    match["alliances"][alliance_color]["team_keys"]
+                ):
+                    if team_key not in team_indexes:
+                        if team_numbers != None:
+                            continue
+                        team_indexes[team_key] = len(team_numbers_out)
+                        team_numbers_out.append(
+                            PerformanceCalculator.team_number_from_key(team_key)
+                        )
+                    team_index.append(team_indexes[team_key])
+                    alliance_index.append(alliance_row)
+                    position.append(robot_index)
+                    alliance_has_team = True
+
+                if not alliance_has_team:
+                    continue
+
+                alliance_data = score_breakdown[alliance_color]
+                line_labels = tuple(
+                    alliance_data.get(key) for key in rules.mobility_keys
+                )
+                robot_endgames = tuple(
+                    alliance_data.get(key) for key in rules.endgame_keys
+                )
+                match_keys.append(match["key"])
+                alliance_colors.append(alliance_color)
+                auto_line_labels.append(line_labels)
+                endgame_labels.append(robot_endgames)
+                alliance_columns["auto_line"].append(
+                    [mobility_code(label, MOBILITY_OTHER) for label in line_labels]
+                )
+                alliance_columns["endgame"].append(
+                    [endgame_code(label, 0) for label in robot_endgames]
+                )
+                alliance_columns["auto_bonus"].append(rules.auto_bonus(alliance_data))
+                for name, field in alliance_fields:
+                    alliance_columns[name].append(field(alliance_data))
+                alliance_columns["placements"].append(
+                    [field(alliance_data) for field in rules.placement_fields]
+                )
+                alliance_columns["won"].append(
+                    match["winning_alliance"] == alliance_color
+                )
+
+        columns = {
+            "auto_line": np.array(alliance_columns["auto_line"], dtype=np.int8).reshape(
+                -1, 3
+            ),
+            "endgame": np.array(alliance_columns["endgame"], dtype=np.int8).reshape(
+                -1, 3
+            ),
+            "auto_bonus": np.array(alliance_columns["auto_bonus"], dtype=bool),
+            "won": np.array(alliance_columns["won"], dtype=bool),
+            "team_index": np.array(team_index, dtype=np.int64),
+            "alliance_index": np.array(alliance_index, dtype=np.int64),
+            "position": np.array(position, dtype=np.int64),
+            "team_numbers": team_numbers_out,
+            "match_keys": match_keys,
+            "alliance_colors": alliance_colors,
+            "auto_line_labels": auto_line_labels,
+            "endgame_labels": endgame_labels,
+        }
+        columns["placements"] = np.array(
+            alliance_columns["placements"], dtype=np.float64
+        ).reshape(len(match_keys), len(rules.placement_names))
+        for name, _ in ALLIANCE_COLUMNS:
+            columns[name] = np.array(alliance_columns[name], dtype=np.float64)
+        return columns
+
+    def compute_columns(self, columns: dict) -> dict:
+        """Computes the performance dicts from the output of flatten"""
+        rules = self.scoring_rules
+        team_numbers = columns["team_numbers"]
+        team_count = len(team_numbers)
+        team_index = columns["team_index"]
+        alliance_index = columns["alliance_index"]
+        position = columns["position"]
+        row_count = len(team_index)
+
+        # Auto: mobility points plus an equal share of the auto game pieces when the auto bonus was achieved
+        crossed = columns["auto_line"] == MOBILITY_YES
+        robots_crossed = crossed.sum(axis=1)[alliance_index]
+        row_crossed = crossed[alliance_index, position]
+        row_auto_share = row_crossed & columns["auto_bonus"][alliance_index]
+        auto_piece_points = np.divide(
+            columns["auto_piece_points"][alliance_index],
+            robots_crossed,
+            out=np.zeros(row_count),
+            where=row_auto_share,
+        )
+        auto_piece_count = np.divide(
+            columns["auto_piece_count"][alliance_index],
+            robots_crossed,
+            out=np.zeros(row_count),
+            where=row_auto_share,
+        )
+        auto_points = np.where(
+            row_crossed, rules.mobility_points + auto_piece_points, 0.0
+        )
+
+        # Teleop: alliance totals split by activity, robots that didn't move in auto get a 0.7 weight
+        activity = np.where(columns["auto_line"] == MOBILITY_NO, 0.7, 1.0)
+        total_activity = (activity[:, 0] + activity[:, 1] + activity[:, 2])[
+            alliance_index
+        ]
+        row_activity = activity[alliance_index, position]
+
+        def attribute(alliance_column):
+            return alliance_column[alliance_index] * row_activity / total_activity
+
+        teleop_points = attribute(columns["teleop_points"])
+
+        # Endgame
+        endgame = columns["endgame"][alliance_index, position]
+        endgame_points = rules.endgame_point_table()[endgame]
+        endgame_bucket = np.array(rules.endgame_bucket_index)[endgame]
+
+        total_points = auto_points + teleop_points + endgame_points
+        alliance_total = columns["total_points"][alliance_index]
+        contributions = np.divide(
+            total_points,
+            alliance_total,
+            out=np.zeros(row_count),
+            where=alliance_total > 0,
+        )
+
+        def per_team(weights):
+            return np.bincount(team_index, weights=weights, minlength=team_count)
+
+        def per_team_count(mask):
+            return np.bincount(team_index[mask], minlength=team_count)
+
+        matches_played = np.bincount(team_index, minlength=team_count)
+        won = columns["won"][alliance_index]
+        sums = {
+            "wins": per_team_count(won),
+            "auto_line_crosses": per_team_count(row_crossed),
+            "auto_shares": per_team_count(row_auto_share),
+            "total_auto_points": per_team(auto_points),
+            "auto_coral_count": per_team(auto_piece_count),
+            "total_teleop_points": per_team(teleop_points),
+            "total_coral_count": per_team(attribute(columns["teleop_piece_count"])),
+            "total_endgame_points": per_team(endgame_points.astype(np.float64)),
+            "total_estimated_points": per_team(total_points),
+        }
+        placement_sums = [
+            per_team(attribute(columns["placements"][:, placement]))
+            for placement in range(len(rules.placement_names))
+        ]
+        endgame_counts = [
+            per_team_count(endgame_bucket == bucket)
+            for bucket in range(len(rules.endgame_buckets))
+        ]
+
+        # Means and population standard deviation of the contribution percentages
+        played = np.maximum(matches_played, 1)
+        contribution_mean = per_team(contributions) / played
+        deviations = contributions - contribution_mean[team_index]
+        contribution_variance = per_team(deviations**2) / played
+
+        # Group the team-match rows per team, keeping match order
+        order = np.argsort(team_index, kind="stable")
+        boundaries = np.cumsum(matches_played)[:-1]
+        rows_per_team = np.split(order, boundaries) if team_count else []
+
+        history_columns = {
+            "alliance_index": alliance_index.tolist(),
+            "position": position.tolist(),
+            "won": columns["won"].tolist(),
+            "alliance_total": columns["total_points"].astype(np.int64).tolist(),
+            # Integer like the pure Python engine unless the row got a share of the auto pieces
+            "auto": [
+                points if share else int(points)
+                for points, share in zip(auto_points.tolist(), row_auto_share.tolist())
+            ],
+            "teleop": teleop_points.tolist(),
+            "endgame": endgame_points.tolist(),
+            "total": total_points.tolist(),
+            "contribution": contributions.tolist(),
+            "match_keys": columns["match_keys"],
+            "alliance_colors": columns["alliance_colors"],
+            "auto_line_labels": columns["auto_line_labels"],
+            "endgame_labels": columns["endgame_labels"],
+        }
+
+        results = {}
+        for team, team_number in enumerate(team_numbers):
+            performance = self.__dict_builder.new_performance(team_number)
+            results[team_number] = performance
+            rows = rows_per_team[team]
+            matches = int(matches_played[team])
+            if matches == 0:
+                continue
+
+            auto = performance["auto_performance"]
+            teleop = performance["teleop_performance"]
+            endgame_performance = performance["endgame_performance"]
+            overall = performance["overall_metrics"]
+
+            performance["matches_played"] = matches
+            performance["wins"] = int(sums["wins"][team])
+            performance["losses"] = matches - performance["wins"]
+
+            auto["auto_line_crosses"] = int(sums["auto_line_crosses"][team])
+            # Point and count totals keep the types the pure Python engine gives them,
+            # so both engines serialize and hash the same
+            if sums["auto_shares"][team] > 0:
+                auto["total_auto_points"] = float(sums["total_auto_points"][team])
+                auto["auto_coral_count"] = float(sums["auto_coral_count"][team])
+            else:
+                auto["total_auto_points"] = int(sums["total_auto_points"][team])
+            auto["line_cross_success_rate"] = auto["auto_line_crosses"] / matches
+            auto["avg_auto_contribution"] = auto["total_auto_points"] / matches
+
+            teleop["total_teleop_points"] = float(sums["total_teleop_points"][team])
+            teleop["total_coral_count"] = float(sums["total_coral_count"][team])
+            for name, placement_sum in zip(rules.placement_names, placement_sums):
+                teleop[rules.placement_group][name] = float(placement_sum[team])
+            teleop["avg_teleop_contribution"] = teleop["total_teleop_points"] / matches
+            teleop["estimated_coral_per_match"] = teleop["total_coral_count"] / matches
+
+            for count_key, rate_key, counts in zip(
+                rules.endgame_count_keys, rules.endgame_rate_keys, endgame_counts
+            ):
+                count = int(counts[team])
+                endgame_performance[count_key] = count
+                endgame_performance[rate_key] = count / matches
+            endgame_performance["total_endgame_points"] = int(
+                sums["total_endgame_points"][team]
+            )
+            endgame_performance["avg_endgame_points"] = (
+                endgame_performance["total_endgame_points"] / matches
+            )
+
+            overall["total_estimated_points"] = float(
+                sums["total_estimated_points"][team]
+            )
+            overall["avg_points_per_match"] = (
+                overall["total_estimated_points"] / matches
+            )
+            mean = float(contribution_mean[team])
+            std_dev = float(contribution_variance[team]) ** 0.5
+            overall["contribution_percentages"] = contributions[rows].tolist()
+            overall["avg_contribution_percentage"] = round(mean, STATISTIC_DECIMALS)
+            overall["consistency_rating"] = round(
+                1 - (std_dev / mean if mean > 0 else 0), STATISTIC_DECIMALS
+            )
+
+            performance["match_history"] = self.__match_history(history_columns, rows)
+
+        return results
+
+    @staticmethod
+    def __match_history(history_columns: dict, rows) -> list:
+        history = []
+        for row in rows.tolist():
+            alliance_row = history_columns["alliance_index"][row]
+            robot_index = history_columns["position"][row]
+            history.append(
+                {
+                    "match_key": history_columns["match_keys"][alliance_row],
+                    "alliance": history_columns["alliance_colors"][alliance_row],
+                    "result": "win" if history_columns["won"][alliance_row] else "loss",
+                    "robot_position": robot_index + 1,
+                    "auto_line": history_columns["auto_line_labels"][alliance_row][
+                        robot_index
+                    ],
+                    "endgame": history_columns["endgame_labels"][alliance_row][
+                        robot_index
+                    ],
+                    "estimated_points": {
+                        "auto": history_columns["auto"][row],
+                        "teleop": history_columns["teleop"][row],
+                        "endgame": history_columns["endgame"][row],
+                        "total": history_columns["total"][row],
+                    },
+                    "alliance_total": history_columns["alliance_total"][alliance_row],
+                    "contribution_percentage": history_columns["contribution"][row],
+                }
+            )
+        return history
@@ -0,0 +1,255 @@
+import json
+import os
+import random
+import re
+
+from data_sources.isa import IndianaScoutingAllianceConnector
+from data_sources.tba import TheBlueAllianceConnector
+from utils.http_cache import CachedResponse
+from utils.snapshot import SnapshotArchive, SnapshotHttpClient
+
+# The routes rate teams at this event, the fixtures use it so the end-to-end benchmark hits them
+EVENT_CODE = "2025incmp"
+YEAR = 2025
+
+# Bump when make_event changes, so archives built by an older version are not reused
+FIXTURE_VERSION = 1
+
+# name -> (teams, qualification matches), roughly a district event, a district championship
+# and a championship division
+EVENT_SIZES = {
+    "small": (36, 72),
+    "district_champ": (60, 120),
+    "world_champ": (76, 128),
+}
+
+NOTE_PHRASES = (
+    "fast cycles",
+    "good driver",
+    "struggled with defense",
+    "reliable deep climb",
+    "missed auto",
+    "scores L4 consistently",
+    "tipped over once",
+    "great ground intake",
+)
+
+
+def make_event(team_count: int, match_count: int, seed: int = 2025) -> dict:
+    """
+    Generates a deterministic event in TBA's 2025 format.
+
+    Returns
+    -------
+    dict
+        "team_numbers", "matches" (TBA matches) and "scouting" (ISA like entries, one per team and match).
+    """
+    generator = random.Random(seed)
+    team_numbers = sorted(generator.sample(range(1, 10000), team_count))
+    # Per team strength, so OPRs and rankings have something to find
+    strength = {team_number: generator.gauss(1, 0.35) for team_number in team_numbers}
+
+    matches = []
+    scouting = []
+    for match_number in range(1, match_count + 1):
+        teams = generator.sample(team_numbers, 6)
+        alliances = {"red": teams[:3], "blue": teams[3:]}
+        score_breakdown = {}
+        for alliance_color, alliance_teams in alliances.items():
+            alliance_strength = max(
+                sum(strength[team_number] for team_number in alliance_teams), 0.2
+            )
+            breakdown = {}
+            for robot_index, team_number in enumerate(alliance_teams):
+                breakdown[f"autoLineRobot{robot_index + 1}"] = (
+                    "Yes" if generator.random() < 0.85 else "No"
+                )
+                breakdown[f"endGameRobot{robot_index + 1}"] = generator.choice(
+                    ["DeepCage", "ShallowCage", "Parked", "None"]
+                )
+            auto_coral_count = int(generator.random() * 2 * alliance_strength)
+            teleop_coral_count = int(generator.random() * 12 * alliance_strength)
+            top_row = generator.randint(0, teleop_coral_count)
+            mid_row = generator.randint(0, teleop_coral_count - top_row)
+            bot_row = teleop_coral_count - top_row - mid_row
+            auto_points = 3 * auto_coral_count * 2 + generator.randint(0, 9)
+            teleop_points = 4 * teleop_coral_count + generator.randint(0, 20)
+            endgame_points = generator.choice([0, 2, 6, 12, 14, 18, 24])
+            foul_points = generator.choice([0, 0, 0, 2, 5, 6])
+            breakdown.update(
+                {
+                    "autoBonusAchieved": generator.random() < 0.4,
+                    "coralBonusAchieved": generator.random() < 0.2 * alliance_strength,
+                    "bargeBonusAchieved": endgame_points >= 14,
+                    "autoCoralCount": auto_coral_count,
+                    "autoCoralPoints": 7 * auto_coral_count,
+                    "autoPoints": auto_points,
+                    "teleopCoralCount": teleop_coral_count,
+                    "teleopPoints": teleop_points + endgame_points,
+                    "teleopReef": {
+                        "tba_topRowCount": top_row,
+                        "tba_midRowCount": mid_row,
+                        "tba_botRowCount": bot_row,
+                        "trough": generator.randint(0, 4),
+                    },
+                    "endGameBargePoints": endgame_points,
+                    "foulPoints": foul_points,
+                    "totalPoints": auto_points
+                    + teleop_points
+                    + endgame_points
+                    + foul_points,
+                }
+            )
+            score_breakdown[alliance_color] = breakdown
+
+        red_score = score_breakdown["red"]["totalPoints"]
+        blue_score = score_breakdown["blue"]["totalPoints"]
+        for alliance_color in ("red", "blue"):
+            opponent_score = blue_score if alliance_color == "red" else red_score
+            own_score = score_breakdown[alliance_color]["totalPoints"]
+            score_breakdown[alliance_color]["rp"] = (
+                (
+                    3
+                    if own_score > opponent_score
+                    else 1 if own_score == opponent_score else 0
+                )
+                + score_breakdown[alliance_color]["autoBonusAchieved"]
+                + score_breakdown[alliance_color]["coralBonusAchieved"]
+                + score_breakdown[alliance_color]["bargeBonusAchieved"]
+            )
+        match_time = 1743000000 + match_number * 480
+        matches.append(
+            {
+                "key": f"{EVENT_CODE}_qm{match_number}",
+                "event_key": EVENT_CODE,
+                "comp_level": "qm",
+                "set_number": 1,
+                "match_number": match_number,
+                "time": match_time,
+                "actual_time": match_time,
+                "post_result_time": match_time + 180,
+                "winning_alliance": (
+                    "red"
+                    if red_score > blue_score
+                    else "blue" if blue_score > red_score else ""
+                ),
+                "alliances": {
+                    alliance_color: {
+                        "team_keys": [
+                            f"frc{team_number}" for team_number in alliance_teams
+                        ],
+                        "score": score_breakdown[alliance_color]["totalPoints"],
+                    }
+                    for alliance_color, alliance_teams in alliances.items()
+                },
+                "score_breakdown": score_breakdown,
+            }
+        )
+        for team_number in teams:
+            scouting.append(
+                {
+                    "team": team_number,
+                    "match": match_number,
+                    "auto_coral": generator.randint(0, 3),
+                    "teleop_coral": generator.randint(0, 10),
+                    "climb": generator.choice(["deep", "shallow", "park", "none"]),
+                    "notes": ", ".join(generator.sample(NOTE_PHRASES, 2)),
+                }
+            )
+
+    return {"team_numbers": team_numbers, "matches": matches, "scouting": scouting}
+
+
+class FixtureTransport:
+    """Stands in for HttpClient and answers TBA and ISA requests from a generated event"""
+
+    def __init__(self, event: dict):
+        self.event = event
+
+    def __team_matches(self, team_number: int) -> list:
+        team_key = f"frc{team_number}"
+        return [
+            match
+            for match in self.event["matches"]
+            if team_key in match["alliances"]["red"]["team_keys"]
+            or team_key in match["alliances"]["blue"]["team_keys"]
+        ]
+
+    def get(self, url: str, **kwargs) -> CachedResponse:
+        if "workers.dev" in url:
+            teams = re.search(r"[&?]team=([\d,]+)", url)
+            wanted = (
+                {int(team_number) for team_number in teams.group(1).split(",")}
+                if teams
+                else None
+            )
+            body = [
+                entry
+                for entry in self.event["scouting"]
+                if wanted == None or entry["team"] in wanted
+            ]
+        elif url.endswith("/status"):
+            body = {"current_season": YEAR, "is_datafeed_down": False}
+        elif match := re.search(r"/team/frc(\d+)/event/[^/]+/matches$", url):
+            body = self.__team_matches(int(match.group(1)))
+        elif match := re.search(r"/team/frc(\d+)/matches/\d+$", url):
+            body = self.__team_matches(int(match.group(1)))
+        elif match := re.search(r"/team/frc(\d+)$", url):
+            body = {
+                "key": f"frc{match.group(1)}",
+                "team_number": int(match.group(1)),
+                "nickname": f"Team {match.group(1)}",
+            }
+        elif re.search(r"/event/[^/]+/matches$", url):
+            body = self.event["matches"]
+        else:
+            return CachedResponse(404, b"null", {})
+        return CachedResponse(
+            200, json.dumps(body).encode("utf-8"), {"Content-Type": "application/json"}
+        )
+
+    def post(self, url: str, **kwargs):
+        raise NotImplementedError("The fixtures only answer GET requests")
+
+    def close(self):
+        pass
+
+
+def build_snapshot(archive_path: str, event: dict):
+    """
+    Records the generated event into a snapshot archive, through the real connectors so
+    the archived URLs are exactly the ones the app requests.
+    """
+    if os.path.exists(archive_path):
+        os.remove(archive_path)
+    recorder = SnapshotHttpClient(
+        SnapshotArchive(archive_path), record=True, http_client=FixtureTransport(event)
+    )
+    tba_connector = TheBlueAllianceConnector("fixture", YEAR, http_client=recorder)
+    isa_connector = IndianaScoutingAllianceConnector(
+        "fixture", YEAR, http_client=recorder
+    )
+
+    tba_connector.get_status()
+    tba_connector.get_event_matches(EVENT_CODE)
+    isa_connector.get_event_matches(EVENT_CODE)
+    isa_connector.get_teams_scouting(EVENT_CODE, event["team_numbers"])
+    for team_number in event["team_numbers"]:
+        tba_connector.get_event_matches(EVENT_CODE, team_number)
+        tba_connector.get_team_info(team_number)
+        tba_connector.get_team_performance_metrics(team_number)
+        isa_connector.get_teams_scouting(EVENT_CODE, [team_number])
+    recorder.close()
+
+
+def load_fixture(size: str, fixtures_dir: str) -> tuple[dict, str]:
+    """
+    Returns the generated event of a size and the path of its snapshot archive, building it if needed.
+    """
+    team_count, match_count = EVENT_SIZES[size]
+    event = make_event(team_count, match_count)
+    archive_path = os.path.join(fixtures_dir, f"{size}-v{FIXTURE_VERSION}.zip")
+    if not os.path.exists(archive_path):
+        os.makedirs(fixtures_dir, exist_ok=True)
+        build_snapshot(archive_path, event)
+    return event, archive_path
@@ -0,0 +1,338 @@
+"""
+Times the metrics engines, prompt building and the /team/<n> request path on generated events.
+
+    python benchmarks/run_benchmarks.py --output benchmarks/results/current.json
+    python benchmarks/run_benchmarks.py --compare benchmarks/results/baseline.json
+
+Results are saved as JSON. With --compare, every benchmark's median is compared to
+the baseline's and the run fails if one got slower than the threshold.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+REPOSITORY_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPOSITORY_ROOT)
+
+import numpy as np
+
+from analytics.incremental_performance import IncrementalPerformanceAggregator
+from analytics.opr import OprPredictor
+from analytics.performance import PerformanceCalculator
+from analytics.ranking_simulation import RankingSimulator
+from analytics.vectorized_performance import VectorizedPerformanceCalculator
+from benchmarks.fixtures import EVENT_CODE, EVENT_SIZES, YEAR, load_fixture
+from data_sources.tba import TheBlueAllianceConnector
+from llm_integration.team_subjective_rating import TeamRatingGenerator
+from utils.snapshot import SnapshotArchive, SnapshotHttpClient
+
+
+class OllamaStubHandler(BaseHTTPRequestHandler):
+    """Answers /api/generate like Ollama, after an optional delay"""
+
+    latency_seconds = 0.0
+    rating = "<p>Benchmark rating</p>"
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        time.sleep(self.latency_seconds)
+        if request.get("stream"):
+            body = (
+                json.dumps({"response": self.rating, "done": False})
+                + "\n"
+                + json.dumps({"response": "", "done": True})
+                + "\n"
+            ).encode("utf-8")
+        else:
+            body = json.dumps({"response": self.rating, "done": True}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def measure(function, repeat: int, setup=None, warmup: int = 1) -> dict:
+    """Runs function repeat times after warmup runs, setup runs untimed before each call"""
+    for _ in range(warmup):
+        if setup != None:
+            setup()
+        function()
+
+    timings = []
+    for _ in range(repeat):
+        if setup != None:
+            setup()
+        started = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - started)
+    timings.sort()
+    return {
+        "repeat": repeat,
+        "min": timings[0],
+        "median": statistics.median(timings),
+        "mean": statistics.fmean(timings),
+        "p95": timings[min(int(len(timings) * 0.95), len(timings) - 1)],
+    }
+
+
+def benchmark_size(size: str, fixtures_dir: str, work_dir: str, arguments) -> dict:
+    event, archive_path = load_fixture(size, fixtures_dir)
+    matches = event["matches"]
+    team_number = event["team_numbers"][0]
+    repeat = arguments.repeat
+    results = {}
+
+    # TBA metrics through the connector, served from the snapshot so only local work is timed
+    for backend in ("python", "numpy"):
+        connector = TheBlueAllianceConnector(
+            "benchmark",
+            YEAR,
+            http_client=SnapshotHttpClient(SnapshotArchive(archive_path)),
+            metrics_backend=backend,
+        )
+        results[f"tba_team_metrics[{backend}]"] = measure(
+            lambda: connector.get_team_performance_metrics(team_number, EVENT_CODE),
+            repeat,
+        )
+
+    # Event-wide metrics from an in-memory match list
+    calculators = {
+        "python": PerformanceCalculator(),
+        "numpy": VectorizedPerformanceCalculator(),
+    }
+    for backend, calculator in calculators.items():
+        results[f"event_metrics[{backend}]"] = measure(
+            lambda: calculator.compute(matches), repeat
+        )
+    results["event_metrics[incremental]"] = measure(
+        lambda: IncrementalPerformanceAggregator().apply_matches(matches), repeat
+    )
+    results["opr_fit"] = measure(lambda: OprPredictor().fit(matches), repeat)
+    results["ranking_simulation[2000]"] = measure(
+        lambda: RankingSimulator(iterations=2000, seed=1).simulate(
+            matches[: len(matches) * 2 // 3]
+            + [
+                {**match, "score_breakdown": None}
+                for match in matches[len(matches) * 2 // 3 :]
+            ]
+        ),
+        max(repeat // 5, 3),
+    )
+
+    # Prompt construction with the inputs of a real rating
+    class ModelName:
+        model_name = "benchmark"
+
+    rater = TeamRatingGenerator(ModelName())
+    team_key = f"frc{team_number}"
+    team_matches = [
+        match
+        for match in matches
+        if team_key
+        in match["alliances"]["red"]["team_keys"]
+        + match["alliances"]["blue"]["team_keys"]
+    ]
+    performance = PerformanceCalculator().compute(team_matches, [team_number])[
+        team_number
+    ]
+    team_scouting = [
+        entry for entry in event["scouting"] if entry["team"] == team_number
+    ]
+    results["prompt_build"] = measure(
+        lambda: rater.build_prompt(
+            performance, team_matches, team_scouting, team_scouting
+        ),
+        repeat,
+    )
+
+    results.update(
+        benchmark_team_info(size, archive_path, work_dir, team_number, arguments)
+    )
+    return results
+
+
+def benchmark_team_info(size, archive_path, work_dir, team_number, arguments) -> dict:
+    """End to end GET /team/<n> with the data sources replayed and a stub Ollama server"""
+    OllamaStubHandler.latency_seconds = arguments.llm_latency
+    server = ThreadingHTTPServer(("127.0.0.1", 0), OllamaStubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    size_dir = os.path.join(work_dir, size)
+    os.makedirs(size_dir, exist_ok=True)
+    with open(os.path.join(size_dir, "config.json"), "w") as f:
+        json.dump(
+            {
+                "OLLAMA_MODEL": "benchmark",
+                "OLLAMA_URL": f"http://127.0.0.1:{server.server_address[1]}",
+                "SNAPSHOT_MODE": "replay",
+                "SNAPSHOT_PATH": archive_path,
+                "HTTP_CACHE_PATH": os.path.join(size_dir, "http_cache.sqlite3"),
+                "LLM_CACHE_PATH": os.path.join(size_dir, "llm_cache.sqlite3"),
+                "WARMUP_PROGRESS_PATH": os.path.join(size_dir, "warmup.json"),
+                "POLL_EVENTS": [],
+                "EVENTS": [EVENT_CODE],
+            },
+            f,
+        )
+
+    # FrcRatingApp reads config.json from the working directory
+    previous_directory = os.getcwd()
+    os.chdir(size_dir)
+    try:
+        from main import FrcRatingApp
+
+        frc_rating_app = FrcRatingApp()
+        # Request logging would dominate the timings
+        logging.getLogger("frcsp").setLevel(logging.WARNING)
+        client = frc_rating_app.app.test_client()
+
+        def get_team_info():
+            response = client.get(f"/team/{team_number}")
+            if response.status_code != 200:
+                raise RuntimeError(
+                    f"/team/{team_number} answered {response.status_code}"
+                )
+
+        results = {
+            "team_info[cold]": measure(
+                get_team_info,
+                arguments.repeat,
+                setup=frc_rating_app.rating_cache.clear,
+            ),
+            "team_info[cached]": measure(get_team_info, arguments.repeat),
+            "gather_team_data": measure(
+                lambda: asyncio.run(
+                    frc_rating_app.gather_team_data(team_number, EVENT_CODE)
+                ),
+                arguments.repeat,
+            ),
+        }
+    finally:
+        os.chdir(previous_directory)
+        server.shutdown()
+        server.server_close()
+    return results
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    """Prints the median of every benchmark next to the baseline's, returns the regressions"""
+    regressions = []
+    print(f"{'benchmark':<50}{'baseline':>12}{'current':>12}{'ratio':>8}")
+    for size, size_results in results["results"].items():
+        for name, timing in size_results.items():
+            baseline_timing = baseline["results"].get(size, {}).get(name)
+            if baseline_timing == None:
+                continue
+            ratio = timing["median"] / baseline_timing["median"]
+            flag = " <-" if ratio > threshold else ""
+            print(
+                f"{size + '/' + name:<50}{baseline_timing['median'] * 1000:>10.3f}ms"
+                f"{timing['median'] * 1000:>10.3f}ms{ratio:>8.2f}{flag}"
+            )
+            if ratio > threshold:
+                regressions.append(f"{size}/{name}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--sizes",
+        nargs="+",
+        choices=list(EVENT_SIZES),
+        default=list(EVENT_SIZES),
+        help="Event sizes to benchmark",
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=20, help="Timed runs per benchmark"
+    )
+    parser.add_argument(
+        "--llm-latency",
+        type=float,
+        default=0.0,
+        help="Seconds the stub Ollama server waits before answering",
+    )
+    parser.add_argument(
+        "--fixtures-dir",
+        default=os.path.join(REPOSITORY_ROOT, "benchmarks", "fixtures"),
+        help="Where the generated snapshot archives are kept",
+    )
+    parser.add_argument(
+        "--output",
+        default=os.path.join(
+            REPOSITORY_ROOT,
+            "benchmarks",
+            "results",
+            f"{datetime.now().strftime('%Y%m%d-%H%M%S')}.json",
+        ),
+        help="Path of the JSON results",
+    )
+    parser.add_argument("--compare", help="Baseline results to compare with")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=1.25,
+        help="Slowdown ratio of the median that counts as a regression",
+    )
+    arguments = parser.parse_args()
+
+    results = {
+        "metadata": {
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "processor": platform.processor(),
+            "cpu_count": os.cpu_count(),
+            "repeat": arguments.repeat,
+            "llm_latency": arguments.llm_latency,
+        },
+        "results": {},
+    }
+    with tempfile.TemporaryDirectory() as work_dir:
+        for size in arguments.sizes:
+            print(
+                f"Benchmarking {size} ({EVENT_SIZES[size][0]} teams, {EVENT_SIZES[size][1]} matches)"
+            )
+            results["results"][size] = benchmark_size(
+                size, arguments.fixtures_dir, work_dir, arguments
+            )
+            for name, timing in results["results"][size].items():
+                print(f"    {name:<36}{timing['median'] * 1000:>10.3f}ms median")
+
+    output_directory = os.path.dirname(arguments.output)
+    if output_directory:
+        os.makedirs(output_directory, exist_ok=True)
+    with open(arguments.output, "w") as f:
+        json.dump(results, f, indent=4)
+    print(f"Results saved to {arguments.output}")
+
+    if arguments.compare:
+        with open(arguments.compare, "r") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, arguments.threshold)
+        if regressions:
+            print(
+                f"Slower than {arguments.threshold}x the baseline: {', '.join(regressions)}"
+            )
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
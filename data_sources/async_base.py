@@ -0,0 +1,66 @@
+import asyncio
+from abc import ABC, abstractmethod
+from concurrent.futures import Executor
+
+from data_sources.base import DataSource, DataSourceStatus
+
+
+class AsyncDataSource(ABC):
+    """Abstract base class for data sources that can be awaited, mirrors DataSource"""
+
+    @abstractmethod
+    async def get_status(self) -> tuple[DataSourceStatus, dict]:
+        """Retrieves the status of the data source, see DataSource.get_status"""
+
+    @abstractmethod
+    async def get_team_info(self, team_number: int):
+        """Retrieve information about a specific team, see DataSource.get_team_info"""
+
+    @abstractmethod
+    async def get_event_matches(self, event_code: str, team_number: int | None = None):
+        """Retrieve matches for a specific event, see DataSource.get_event_matches"""
+
+    @abstractmethod
+    async def get_team_performance_metrics(self, team_number, event_code=None):
+        """Get performance metrics for a team, see DataSource.get_team_performance_metrics"""
+
+
+class ThreadedAsyncDataSource(AsyncDataSource):
+    """
+    Awaitable wrapper running a blocking DataSource on a thread pool.
+
+    The wrapped connector keeps its pooled keep-alive transport, response cache and
+    error handling, while several calls can be gathered and run concurrently.
+    """
+
+    def __init__(self, data_source: DataSource, executor: Executor | None = None):
+        """
+        Args
+        -----
+        data_source : DataSource
+            The blocking connector to wrap.
+        executor : Executor | None, optional
+            Thread pool the calls run on. The event loop's default executor is used if not provided.
+        """
+        self.data_source = data_source
+        self.executor = executor
+
+    async def _run_blocking(self, function, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, function, *args)
+
+    async def get_status(self) -> tuple[DataSourceStatus, dict]:
+        return await self._run_blocking(self.data_source.get_status)
+
+    async def get_team_info(self, team_number: int):
+        return await self._run_blocking(self.data_source.get_team_info, team_number)
+
+    async def get_event_matches(self, event_code: str, team_number: int | None = None):
+        return await self._run_blocking(
+            self.data_source.get_event_matches, event_code, team_number
+        )
+
+    async def get_team_performance_metrics(self, team_number, event_code=None):
+        return await self._run_blocking(
+            self.data_source.get_team_performance_metrics, team_number, event_code
+        )
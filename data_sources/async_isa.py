@@ -0,0 +1,29 @@
+from concurrent.futures import Executor
+
+from data_sources.async_base import ThreadedAsyncDataSource
+from data_sources.isa import MATCH_FIELDS, NOTE_FIELDS, IndianaScoutingAllianceConnector
+
+
+class AsyncIndianaScoutingAllianceConnector(ThreadedAsyncDataSource):
+    """Awaitable version of IndianaScoutingAllianceConnector"""
+
+    def __init__(
+        self,
+        connector: IndianaScoutingAllianceConnector,
+        executor: Executor | None = None,
+    ):
+        super().__init__(connector, executor)
+
+    async def get_robot_notes(self, team_number, event_code=None):
+        return await self._run_blocking(
+            self.data_source.get_robot_notes, team_number, event_code
+        )
+
+    async def get_teams_scouting(self, event_code, team_numbers, batch_size=50):
+        return await self._run_blocking(
+            self.data_source.get_teams_scouting,
+            event_code,
+            team_numbers,
+            MATCH_FIELDS + NOTE_FIELDS,
+            batch_size,
+        )
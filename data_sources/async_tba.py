@@ -0,0 +1,18 @@
+from concurrent.futures import Executor
+
+from data_sources.async_base import ThreadedAsyncDataSource
+from data_sources.tba import TheBlueAllianceConnector
+
+
+class AsyncTheBlueAllianceConnector(ThreadedAsyncDataSource):
+    """Awaitable version of TheBlueAllianceConnector"""
+
+    def __init__(
+        self, connector: TheBlueAllianceConnector, executor: Executor | None = None
+    ):
+        super().__init__(connector, executor)
+
+    async def get_event_performance_metrics(self, event_code: str) -> dict | None:
+        return await self._run_blocking(
+            self.data_source.get_event_performance_metrics, event_code
+        )
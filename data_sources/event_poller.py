@@ -0,0 +1,159 @@
+import threading
+
+from analytics.performance import PerformanceCalculator
+
+
+class EventPoller:
+    """
+    Background thread watching events' match lists for new and corrected results.
+
+    Every interval the watched events' matches are requested through the TBA
+    connector. With a response cache the request is revalidated with ETag /
+    Last-Modified, so an unchanged list costs a 304. The list is diffed against the
+    previous poll and on_change is called with only the matches whose result
+    appeared or changed, and the teams that played in them. The first poll of an
+    event reports no changes but still calls on_change, so derived data can be built.
+    """
+
+    def __init__(self, tba_connector, on_change, interval_seconds: float = 60):
+        """
+        Args
+        -----
+        tba_connector : TheBlueAllianceConnector
+            Connector the match lists are requested from.
+        on_change : callable
+            on_change(event_code, matches, changes) with the full match list and the changes,
+            see poll_event. Called from the poller's thread.
+        interval_seconds : float, optional
+            Time between two polls of the watched events.
+        """
+        self.tba_connector = tba_connector
+        self.on_change = on_change
+        self.interval_seconds = interval_seconds
+        self.__lock = threading.Lock()
+        self.__stop = threading.Event()
+        self.__thread = None
+        # event code -> {match key: result signature}, None until the first poll
+        self.__signatures = {}
+
+    def watch(self, event_code: str):
+        """Starts tracking an event, its first poll becomes the baseline later polls are diffed with"""
+        with self.__lock:
+            self.__signatures.setdefault(event_code, None)
+
+    def unwatch(self, event_code: str):
+        with self.__lock:
+            self.__signatures.pop(event_code, None)
+
+    def watched_events(self) -> list:
+        with self.__lock:
+            return list(self.__signatures)
+
+    @staticmethod
+    def result_signature(match: dict) -> tuple | None:
+        """What identifies a match's result, None for unplayed matches"""
+        if match.get("score_breakdown") == None:
+            return None
+        return (
+            match["alliances"]["red"]["score"],
+            match["alliances"]["blue"]["score"],
+            match["winning_alliance"],
+            match.get("post_result_time"),
+        )
+
+    def poll_event(self, event_code: str) -> dict | None:
+        """
+        Fetches an event's matches and diffs them with the previous poll.
+
+        The poll only becomes the baseline of the next one once on_change returned,
+        so changes a failed callback didn't apply are reported again.
+
+        Returns
+        -------
+        dict | None
+            "new_results" and "corrected_results" (match keys), "schedule_changed" (bool),
+            "team_numbers" (teams of the new and corrected matches) and "first_poll" (bool).
+            None if the matches could not be retrieved.
+        """
+        matches = self.tba_connector.get_event_matches(event_code)
+        if matches == None:
+            return None
+
+        signatures = {match["key"]: self.result_signature(match) for match in matches}
+        with self.__lock:
+            previous = self.__signatures.get(event_code)
+
+        changes = {
+            "first_poll": previous == None,
+            "new_results": [],
+            "corrected_results": [],
+            "schedule_changed": False,
+            "team_numbers": set(),
+        }
+        if previous == None:
+            self.on_change(event_code, matches, changes)
+            self.__commit_signatures(event_code, signatures)
+            return changes
+
+        changes["schedule_changed"] = signatures.keys() != previous.keys()
+        for match in matches:
+            signature = signatures[match["key"]]
+            previous_signature = previous.get(match["key"])
+            if signature == None or signature == previous_signature:
+                continue
+            if previous_signature == None:
+                changes["new_results"].append(match["key"])
+            else:
+                changes["corrected_results"].append(match["key"])
+            for alliance_color in ("red", "blue"):
+                for team_key in match["alliances"][alliance_color]["team_keys"]:
+                    changes["team_numbers"].add(
+                        PerformanceCalculator.team_number_from_key(team_key)
+                    )
+
+        if (
+            changes["new_results"]
+            or changes["corrected_results"]
+            or changes["schedule_changed"]
+        ):
+            self.on_change(event_code, matches, changes)
+        self.__commit_signatures(event_code, signatures)
+        return changes
+
+    def __commit_signatures(self, event_code: str, signatures: dict):
+        with self.__lock:
+            # An event unwatched during the callback stays unwatched
+            if event_code in self.__signatures:
+                self.__signatures[event_code] = signatures
+
+    def poll_once(self) -> dict:
+        """Polls every watched event once, returns the changes of each"""
+        results = {}
+        for event_code in self.watched_events():
+            try:
+                results[event_code] = self.poll_event(event_code)
+            except Exception as e:
+                print(f"Error polling event {event_code}: {e}")
+                results[event_code] = None
+        return results
+
+    def start(self):
+        """Polls the watched events in a daemon thread until stop is called"""
+        if self.__thread != None and self.__thread.is_alive():
+            return
+        self.__stop.clear()
+        self.__thread = threading.Thread(
+            target=self.__run, name="event-poller", daemon=True
+        )
+        self.__thread.start()
+
+    def stop(self):
+        self.__stop.set()
+        if self.__thread != None:
+            self.__thread.join()
+            self.__thread = None
+
+    def __run(self):
+        while not self.__stop.is_set():
+            self.poll_once()
+            self.__stop.wait(self.interval_seconds)
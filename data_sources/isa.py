@@ -1,10 +1,56 @@
-import requests
 from data_sources.base import DataSource, DataSourceStatus
 from datetime import datetime
+from enum import IntEnum
+from utils.http_client import HttpClient
+from utils.metrics import DATA_SOURCE_SECONDS, timed
+
+
+class IsaRobotField(IntEnum):
+    """
+    Columns of the ISA robots endpoint (2025 scouting form), the value is the column's position in the include mask.
+
+    Only the columns this app requests are listed.
+    """
+
+    AUTO_CORAL = 0
+    TELEOP_CORAL = 1
+    # The entry's team and match, requested with both the match data and the notes
+    TEAM_NUMBER = 2
+    MATCH_NUMBER = 3
+    CLIMB = 4
+    NOTES = 29
+
+
+MATCH_FIELDS = (
+    IsaRobotField.AUTO_CORAL,
+    IsaRobotField.TELEOP_CORAL,
+    IsaRobotField.TEAM_NUMBER,
+    IsaRobotField.MATCH_NUMBER,
+    IsaRobotField.CLIMB,
+)
+NOTE_FIELDS = (
+    IsaRobotField.TEAM_NUMBER,
+    IsaRobotField.MATCH_NUMBER,
+    IsaRobotField.NOTES,
+)
+# One character per column of the robots endpoint
+INCLUDE_MASK_LENGTH = 90
+# The notes mask was always sent with one extra trailing 0, which the endpoint ignores.
+# It is kept so the notes request URLs, and the HTTP, snapshot and rating cache entries
+# keyed on them, stay the same
+NOTES_INCLUDE_MASK_LENGTH = INCLUDE_MASK_LENGTH + 1
+
+# Keys an entry may carry its team number in
+TEAM_NUMBER_KEYS = ("team", "team_number", "teamNumber", "Team")
 
 
 class IndianaScoutingAllianceConnector(DataSource):
-    def __init__(self, api_token: str, year=datetime.now().year):
+    def __init__(
+        self,
+        api_token: str,
+        year=datetime.now().year,
+        http_client: HttpClient | None = None,
+    ):
         """
         Initializes the class instance with an API token and a specific year.
 
@@ -14,6 +60,8 @@ class IndianaScoutingAllianceConnector(DataSource):
             The authentication token required for API access.
         year : int, optional
             The year for which data will be retrieved. Defaults to the current year.
+        http_client : HttpClient | None, optional
+            Pooled transport used for every request. A private one is created if not provided.
         """
         self.__api_token = api_token
         self.__observed_year = year
@@ -21,6 +69,7 @@ class IndianaScoutingAllianceConnector(DataSource):
             "https://isa2025-api.liujip2020.workers.dev/public/REPLACEME/json?"
         )
         self.__headers = {"Authorization": f"Bearer {self.__api_token}"}
+        self.__http = http_client if http_client != None else HttpClient()
 
     def __build_ISA_robot_url(
         self, include_flags: str, teams: list = [], event_key: str = ""
@@ -33,6 +82,27 @@ class IndianaScoutingAllianceConnector(DataSource):
         url = url.replace("REPLACEME", "robots")
         return url
 
+    @staticmethod
+    def build_include_mask(fields, length: int = INCLUDE_MASK_LENGTH) -> str:
+        """
+        Builds the include mask selecting fields.
+
+        Args
+        -----
+        fields : iterable of IsaRobotField | int
+            The fields to include.
+        length : int, optional
+            Length of the mask, extended if a field lies beyond it.
+
+        Returns
+        -------
+        str
+            A string of 0 and 1, 1 at the position of every selected field.
+        """
+        positions = {int(field) for field in fields}
+        length = max(length, max(positions, default=0) + 1)
+        return "".join("1" if index in positions else "0" for index in range(length))
+
     def __build_ISA_human_url(
         self, include_flags: str, teams: list = [], event_key: str = ""
     ):
@@ -44,34 +114,145 @@ class IndianaScoutingAllianceConnector(DataSource):
         url = url.replace("REPLACEME", "humans")
         return url
 
+    @timed(DATA_SOURCE_SECONDS, source="isa", method="get_status")
     def get_status(self):
         url = self.__build_ISA_human_url("100000000000000")
-        response = requests.get(url, headers=self.__headers)
+        response = self.__http.get(url, headers=self.__headers)
         if response.status_code == 200:
             return (DataSourceStatus.CONNECTED, {"extra_info": {}})
         if response.status_code == 401:
             return (DataSourceStatus.UNAUTHENTICATED, {})
 
-    def get_event_matches(self, event_code, team_number=None):
+    @timed(DATA_SOURCE_SECONDS, source="isa", method="get_event_matches")
+    def get_event_matches(self, event_code, team_number=None, fields=MATCH_FIELDS):
         human_url = self.__build_ISA_robot_url(
-            "111110000000000000000000000000000000000000000000000000000000000000000000000000000000000000",
+            self.build_include_mask(fields),
             [str(team_number)] if not team_number == None else None,
             event_code,
         )
-        response = requests.get(human_url, headers=self.__headers)
+        response = self.__http.get(human_url, headers=self.__headers)
         if response.status_code == 200:
             return response.json()
 
-    def get_robot_notes(self, team_number, event_code=None):
+    @timed(DATA_SOURCE_SECONDS, source="isa", method="get_robot_notes")
+    def get_robot_notes(self, team_number, event_code=None, fields=NOTE_FIELDS):
         notes_url = self.__build_ISA_robot_url(
-            "0011000000000000000000000000010000000000000000000000000000000000000000000000000000000000000",
+            self.build_include_mask(fields, NOTES_INCLUDE_MASK_LENGTH),
             [str(team_number)],
             event_code,
         )
-        response = requests.get(notes_url, headers=self.__headers)
+        response = self.__http.get(notes_url, headers=self.__headers)
         if response.status_code == 200:
             return response.json()
 
+    @timed(DATA_SOURCE_SECONDS, source="isa", method="get_teams_scouting")
+    def get_teams_scouting(
+        self,
+        event_code: str,
+        team_numbers: list,
+        fields=MATCH_FIELDS + NOTE_FIELDS,
+        batch_size: int = 50,
+    ) -> dict | None:
+        """
+        Fetches the scouting entries of several teams at an event, split per team.
+
+        The match data and the notes are requested together and up to batch_size
+        teams share a request, so a whole event takes a handful of requests instead
+        of two per team. Entries are split by their team number field. If an entry
+        of a batch has none, the batch's teams are requested one by one instead, the
+        server filters single team requests.
+
+        Args
+        -----
+        event_code : str
+            The event to fetch the entries of.
+        team_numbers : list
+            The teams to fetch the entries of.
+        fields : iterable of IsaRobotField | int, optional
+            The fields to include, the match data and notes fields by default.
+        batch_size : int, optional
+            Maximum number of teams per request.
+
+        Returns
+        -------
+        dict | None
+            team number -> list of the team's entries, teams without entries get an empty list.
+            B teams keep their suffix, e.g. "254B".
+            None if a request failed.
+        """
+        include_flags = self.build_include_mask(fields)
+        scouting = {self.__team_number(team_number): [] for team_number in team_numbers}
+        wanted_teams = list(scouting)
+        for start in range(0, len(wanted_teams), batch_size):
+            batch = wanted_teams[start : start + batch_size]
+            entries = self.__request_entries(include_flags, batch, event_code)
+            if entries == None:
+                return None
+
+            # Entries are split the same way whether their team was requested alone or
+            # in a batch, so a warm-up and a single rating get the same rows
+            entry_teams = [self.__entry_team_number(entry) for entry in entries]
+            if None in entry_teams and len(batch) == 1:
+                # The server filtered the single team request
+                scouting[batch[0]].extend(entries)
+                continue
+            if None in entry_teams:
+                # No way to tell whose entries these are, ask for each team separately
+                for team_number in batch:
+                    team_entries = self.__request_entries(
+                        include_flags, [team_number], event_code
+                    )
+                    if team_entries == None:
+                        return None
+                    scouting[team_number].extend(team_entries)
+                continue
+
+            for entry, team_number in zip(entries, entry_teams):
+                # Entries of teams that were not asked for are left out
+                if team_number in scouting:
+                    scouting[team_number].append(entry)
+        return scouting
+
+    def __request_entries(
+        self, include_flags: str, team_numbers: list, event_code: str
+    ) -> list | None:
+        url = self.__build_ISA_robot_url(
+            include_flags,
+            [str(team_number) for team_number in team_numbers],
+            event_code,
+        )
+        response = self.__http.get(url, headers=self.__headers)
+        if response.status_code != 200:
+            return None
+        return self.__entries(response.json())
+
+    def __entries(self, data) -> list:
+        # Entries come either as a list or as the list value of a wrapping object
+        if isinstance(data, list):
+            return [entry for entry in data if isinstance(entry, dict)]
+        if isinstance(data, dict):
+            for value in data.values():
+                if isinstance(value, list):
+                    return [entry for entry in value if isinstance(entry, dict)]
+        return []
+
+    def __entry_team_number(self, entry: dict) -> int | None:
+        """The team number of an entry's team field, None if it has none"""
+        for key in TEAM_NUMBER_KEYS:
+            if key in entry:
+                return self.__team_number(entry[key])
+        return None
+
+    @staticmethod
+    def __team_number(value) -> int | str | None:
+        # 254, "254" and "frc254" are team 254, B teams keep their suffix ("254B")
+        team_number = str(value).strip().removeprefix("frc")
+        if team_number.isdigit():
+            return int(team_number)
+        if team_number[:-1].isdigit() and team_number[-1:].isalpha():
+            return team_number.upper()
+        return None
+
     def get_team_info(self, team_number):
         pass
 
@@ -0,0 +1,133 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from analytics.match_store import MatchStore
+from analytics.scoring_rules import get_event_scoring_rules
+
+# TBA event types of official events: regionals, districts, district championships
+# (and their divisions), championship divisions and finals, remote events
+OFFICIAL_EVENT_TYPES = (0, 1, 2, 3, 4, 5, 7)
+
+
+class SeasonIngestor:
+    """
+    Downloads every event's matches of a season into a MatchStore.
+
+    Events are requested concurrently by a bounded number of threads, sharing the
+    connector's pooled transport and response cache, so a re-run only revalidates
+    the events that didn't change. Matches are written to the store every few
+    events instead of once per event, since every write rewrites the store file.
+    Events of seasons without scoring rules can't be stored and are skipped.
+    """
+
+    def __init__(
+        self,
+        tba_connector,
+        match_store: MatchStore,
+        workers: int = 8,
+        store_batch_events: int = 25,
+        event_types: tuple = OFFICIAL_EVENT_TYPES,
+    ):
+        """
+        Args
+        -----
+        tba_connector : TheBlueAllianceConnector
+            Connector the events and matches are requested from.
+        match_store : MatchStore
+            Where the matches are stored.
+        workers : int, optional
+            Number of events requested at once, keep it at or below the HTTP pool size.
+        store_batch_events : int, optional
+            Number of downloaded events written to the store at once.
+        event_types : tuple, optional
+            TBA event types to ingest, official events by default. None ingests every event.
+        """
+        self.tba_connector = tba_connector
+        self.match_store = match_store
+        self.workers = workers
+        self.store_batch_events = store_batch_events
+        self.event_types = event_types
+
+    def season_event_keys(self, year: int | None = None) -> list | None:
+        """Keys of the season's events of the ingested types, None if the list could not be retrieved"""
+        events = self.tba_connector.get_season_events(year)
+        if events == None:
+            return None
+        return sorted(
+            event["key"]
+            for event in events
+            if self.event_types == None or event.get("event_type") in self.event_types
+        )
+
+    def ingest(
+        self, year: int | None = None, event_keys: list | None = None, progress=None
+    ) -> dict | None:
+        """
+        Downloads and stores the matches of a season's events.
+
+        Args
+        -----
+        year : int | None, optional
+            The season, the connector's year by default.
+        event_keys : list | None, optional
+            Only ingest these events instead of every event of the season.
+        progress : callable, optional
+            progress(event_key, match_count) called after each event, match_count is None on failure.
+
+        Returns
+        -------
+        dict | None
+            "events" and "matches" ingested, the keys of the "failed" events and of the
+            "unsupported" events, whose season has no scoring rules.
+            None if the season's event list could not be retrieved.
+        """
+        if event_keys == None:
+            event_keys = self.season_event_keys(year)
+            if event_keys == None:
+                return None
+
+        summary = {"events": 0, "matches": 0, "failed": [], "unsupported": []}
+        supported_event_keys = []
+        for event_key in event_keys:
+            try:
+                get_event_scoring_rules(event_key)
+            except ValueError as e:
+                print(f"Skipping {event_key}: {e}")
+                summary["unsupported"].append(event_key)
+                continue
+            supported_event_keys.append(event_key)
+
+        pending_matches = []
+        pending_events = 0
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = {
+                executor.submit(self.tba_connector.get_event_matches, event_key): (
+                    event_key
+                )
+                for event_key in supported_event_keys
+            }
+            for future in as_completed(futures):
+                event_key = futures[future]
+                try:
+                    matches = future.result()
+                except Exception as e:
+                    print(f"Error downloading the matches of {event_key}: {e}")
+                    matches = None
+
+                if matches == None:
+                    summary["failed"].append(event_key)
+                else:
+                    pending_matches.extend(matches)
+                    pending_events += 1
+                    summary["events"] += 1
+                    summary["matches"] += len(matches)
+                if progress != None:
+                    progress(event_key, None if matches == None else len(matches))
+
+                if pending_events >= self.store_batch_events:
+                    self.match_store.add_matches(pending_matches)
+                    pending_matches = []
+                    pending_events = 0
+
+        self.match_store.add_matches(pending_matches)
+        summary["failed"].sort()
+        return summary
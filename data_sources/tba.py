@@ -1,12 +1,28 @@
-import requests
+from analytics.performance import PerformanceCalculator
+from analytics.scoring_rules import get_event_scoring_rules, get_scoring_rules
+from analytics.vectorized_performance import VectorizedPerformanceCalculator
 from data_sources.base import DataSource, DataSourceStatus
 from datetime import datetime
+from utils.http_cache import HttpResponseCache
+from utils.http_client import HttpClient
+from utils.json_stream import iter_json_array
+from utils.metrics import DATA_SOURCE_SECONDS, STAGE_SECONDS, timed
+
+# Size of the pieces streamed match lists are parsed in
+STREAM_CHUNK_BYTES = 64 * 1024
 
 
 class TheBlueAllianceConnector(DataSource):
     """Data source to handle pulling data from TheBlueAlliance.com"""
 
-    def __init__(self, api_token: str, year=datetime.now().year):
+    def __init__(
+        self,
+        api_token: str,
+        year=datetime.now().year,
+        cache: HttpResponseCache | None = None,
+        http_client: HttpClient | None = None,
+        metrics_backend: str = "python",
+    ):
         """
         Initializes the class instance with an API token and a specific year.
 
@@ -16,360 +32,252 @@ class TheBlueAllianceConnector(DataSource):
             The authentication token required for API access.
         year : int, optional
             The year for which data will be retrieved. Defaults to the current year.
+        cache : HttpResponseCache | None, optional
+            Response cache used to revalidate requests with ETag / Last-Modified. Disabled if not provided.
+        http_client : HttpClient | None, optional
+            Pooled transport used for every request. A private one is created if not provided.
+        metrics_backend : str, optional
+            "python" for the pure Python metrics engine or "numpy" for the vectorized one. Both produce the same output.
         """
         self.__api_token = api_token
         self.__observed_year = year
         self.__base_url = "https://www.thebluealliance.com/api/v3"
         self.__headers = {"X-TBA-Auth-Key": self.__api_token}
+        self.__cache = cache
+        self.__http = http_client if http_client != None else HttpClient()
+        if metrics_backend == "python":
+            self.__calculator_class = PerformanceCalculator
+        elif metrics_backend == "numpy":
+            self.__calculator_class = VectorizedPerformanceCalculator
+        else:
+            raise ValueError(f"Unknown metrics backend: {metrics_backend}")
+        # season -> (calculator, streaming calculator) with the season's scoring rules.
+        # Streamed matches are folded in one at a time, which only the pure Python engine does
+        self.__calculators = {}
+
+    def __season_calculators(self, event_code: str | None) -> tuple | None:
+        try:
+            if event_code != None:
+                scoring_rules = get_event_scoring_rules(event_code)
+            else:
+                scoring_rules = get_scoring_rules(self.__observed_year)
+        except ValueError as e:
+            print(f"Error computing performance metrics: {e}")
+            return None
+        calculators = self.__calculators.get(scoring_rules.year)
+        if calculators == None:
+            calculators = (
+                self.__calculator_class(scoring_rules),
+                PerformanceCalculator(scoring_rules),
+            )
+            self.__calculators[scoring_rules.year] = calculators
+        return calculators
+
+    def __get(self, url: str):
+        if self.__cache == None:
+            return self.__http.get(url, headers=self.__headers)
+        return self.__cache.fetch(url, self.__headers, self.__http.get)
+
+    def __stream_matches(self, url: str):
+        """
+        Requests a match list and returns an iterator parsing its matches as they are read, None on failure.
+
+        Without a response cache the body is read from the network as the iterator is
+        consumed. Cached responses are already in memory, but their matches are still
+        parsed one at a time instead of into a list. The download happens as the
+        iterator is consumed, so it is timed with the calling method.
+        """
+        if self.__cache == None:
+            response = self.__http.get(url, headers=self.__headers, stream=True)
+        else:
+            response = self.__cache.fetch(url, self.__headers, self.__http.get)
+        if response.status_code != 200:
+            response.close()
+            return None
+        return self.__iter_response_matches(response)
 
+    @staticmethod
+    def __iter_response_matches(response):
+        try:
+            yield from iter_json_array(response.iter_content(STREAM_CHUNK_BYTES))
+        finally:
+            # Hands the connection back to the pool even if the consumer stopped early
+            response.close()
+
+    @timed(DATA_SOURCE_SECONDS, source="tba", method="get_status")
     def get_status(self) -> tuple[DataSourceStatus, dict]:
         url = f"{self.__base_url}/status"
-        response = requests.get(url, headers=self.__headers)
+        response = self.__get(url)
         if response.status_code == 200:
             response_json = response.json()
             return (DataSourceStatus.CONNECTED, {"extra_info": response_json})
         if response.status_code == 401:
             return (DataSourceStatus.UNAUTHENTICATED, {})
 
+    @timed(DATA_SOURCE_SECONDS, source="tba", method="get_team_info")
     def get_team_info(self, team_number: int) -> dict | None:
         url = f"{self.__base_url}/team/frc{team_number}"
-        response = requests.get(url, headers=self.__headers)
+        response = self.__get(url)
         if response.status_code == 200:
             return response.json()
         return None
 
+    @timed(DATA_SOURCE_SECONDS, source="tba", method="get_event_matches")
     def get_event_matches(
         self, event_code: str, team_number: int | None = None
     ) -> dict | None:
         if team_number != None:
             url = f"{self.__base_url}/team/frc{team_number}/event/{event_code}/matches"
-            response = requests.get(url, headers=self.__headers)
+            response = self.__get(url)
             if response.status_code == 200:
                 return response.json()
         else:
             url = f"{self.__base_url}/event/{event_code}/matches"
-            response = requests.get(url, headers=self.__headers)
+            response = self.__get(url)
             if response.status_code == 200:
                 return response.json()
         return None
 
-    def get_team_performance_metrics(self, team_number, event_code=None) -> dict | None:
+    @timed(DATA_SOURCE_SECONDS, source="tba", method="get_season_events")
+    def get_season_events(self, year: int | None = None) -> list | None:
+        """
+        Lists the events of a season.
+
+        Args
+        -----
+        year : int | None, optional
+            The season, the connector's year by default.
+
+        Returns
+        -------
+        list | None
+            TBA's simple event dicts (key, name, event_type, dates...), None if the request failed.
+        """
+        if year == None:
+            year = self.__observed_year
+        response = self.__get(f"{self.__base_url}/events/{year}/simple")
+        if response.status_code == 200:
+            return response.json()
+        return None
+
+    def invalidate_team_event_matches(self, event_code: str, team_numbers):
+        """
+        Drops the cached per-team match lists of teams at an event.
+
+        Args
+        -----
+        event_code : str
+            The event whose matches changed.
+        team_numbers : iterable
+            Teams that played in the changed matches.
+        """
+        if self.__cache == None:
+            return
+        for team_number in team_numbers:
+            self.__cache.invalidate(
+                f"{self.__base_url}/team/frc{team_number}/event/{event_code}/matches",
+                self.__headers,
+            )
+
+    @timed(DATA_SOURCE_SECONDS, source="tba", method="get_team_performance_metrics")
+    def get_team_performance_metrics(
+        self, team_number, event_code=None, stream: bool = False
+    ) -> dict | None:
+        """
+        Computes a team's performance metrics at an event, or over the season without an event.
+
+        Args
+        -----
+        team_number : int
+            The team to compute metrics for.
+        event_code : str | None, optional
+            The event, the connector's whole year if not provided.
+        stream : bool, optional
+            Parse the matches as the response is read and fold them in one at a time,
+            without match_history nor the per match contribution_percentages, so memory
+            stays flat however many matches there are. Always uses the pure Python engine.
+
+        Returns
+        -------
+        dict | None
+            The team's performance dict, None if the matches could not be retrieved or
+            their season has no scoring rules.
+        """
         matches = None
         team_key = f"frc{team_number}"
+        calculators = self.__season_calculators(event_code)
+        if calculators == None:
+            return None
+        calculator, streaming_calculator = calculators
+
+        if stream:
+            if event_code != None:
+                url = f"{self.__base_url}/team/{team_key}/event/{event_code}/matches"
+            else:
+                url = (
+                    f"{self.__base_url}/team/{team_key}/matches/{self.__observed_year}"
+                )
+            matches = self.__stream_matches(url)
+            if matches == None:
+                return None
+            with STAGE_SECONDS.time(stage="performance_metrics"):
+                return streaming_calculator.compute(
+                    matches, [team_number], keep_history=False
+                )[team_number]
 
         if event_code != None:
             matches = self.get_event_matches(event_code, team_number)
         else:
             url = f"{self.__base_url}/team/{team_key}/matches/{self.__observed_year}"
-            response = requests.get(url, headers=self.__headers)
+            response = self.__get(url)
             if response.status_code == 200:
                 matches = response.json()
 
         if matches == None:
             return None
 
-        performance = {
-            "team_number": team_number,
-            "matches_played": 0,
-            "wins": 0,
-            "losses": 0,
-            "auto_performance": {
-                "auto_line_crosses": 0,
-                "line_cross_success_rate": 0.0,
-                "avg_auto_contribution": 0.0,
-                "total_auto_points": 0,
-                "auto_coral_count": 0,
-            },
-            "teleop_performance": {
-                "avg_teleop_contribution": 0.0,
-                "total_teleop_points": 0,
-                "estimated_coral_per_match": 0.0,
-                "total_coral_count": 0,
-                "reef_placements": {
-                    "top_row": 0,
-                    "mid_row": 0,
-                    "bot_row": 0,
-                    "trough": 0,
-                },
-            },
-            "endgame_performance": {
-                "parked_count": 0,
-                "parked_rate": 0.0,
-                "deep_cage_count": 0,
-                "deep_cage_rate": 0.0,
-                "shallow_cage_count": 0,
-                "shallow_cage_rate": 0.0,
-                "none_count": 0,
-                "none_rate": 0.0,
-                "total_endgame_points": 0,
-                "avg_endgame_points": 0.0,
-            },
-            "overall_metrics": {
-                "total_estimated_points": 0,
-                "avg_points_per_match": 0.0,
-                "contribution_percentages": [],
-                "avg_contribution_percentage": 0.0,
-                "consistency_rating": 0.0,
-            },
-            "match_history": [],
-        }
-
-        contribution_percentages = []
-
-        for match in matches:
-            red_alliance = match["alliances"]["red"]["team_keys"]
-            blue_alliance = match["alliances"]["blue"]["team_keys"]
+        with STAGE_SECONDS.time(stage="performance_metrics"):
+            return calculator.compute(matches, [team_number])[team_number]
 
-            if team_key in red_alliance:
-                alliance_color = "red"
-                robot_position = red_alliance.index(team_key) + 1
-            elif team_key in blue_alliance:
-                alliance_color = "blue"
-                robot_position = blue_alliance.index(team_key) + 1
-            else:
-                # Team not in this match
-                continue
-
-            performance["matches_played"] += 1
-            if match["winning_alliance"] == alliance_color:
-                performance["wins"] += 1
-            else:
-                performance["losses"] += 1
-
-            alliance_data = match["score_breakdown"][alliance_color]
-            match_points = {"auto": 0, "teleop": 0, "endgame": 0, "total": 0}
-            alliance_total = alliance_data["totalPoints"]
-
-            # Initialize match record to be added to match_history
-            match_record = {
-                "match_key": match["key"],
-                "alliance": alliance_color,
-                "result": (
-                    "win" if match["winning_alliance"] == alliance_color else "loss"
-                ),
-                "robot_position": robot_position,
-                "auto_line": alliance_data[f"autoLineRobot{robot_position}"],
-                "endgame": alliance_data[f"endGameRobot{robot_position}"],
-                "estimated_points": {"auto": 0, "teleop": 0, "endgame": 0, "total": 0},
-                "alliance_total": alliance_total,
-                "contribution_percentage": 0.0,
-            }
-
-            self.__calculate_auto_performance(
-                performance, match_points, match_record, alliance_data, robot_position
-            )
-            self.__calculate_teleop_performance(
-                performance, match_points, match_record, alliance_data, robot_position
-            )
-            self.__calculate_endgame_performance(
-                performance, match_points, match_record, alliance_data, robot_position
-            )
-
-            # Calculate total contribution for this match
-            match_points["total"] = (
-                match_points["auto"] + match_points["teleop"] + match_points["endgame"]
-            )
-            match_record["estimated_points"]["total"] = match_points["total"]
-
-            # Calculate contribution percentage
-            contribution_percentage = (
-                match_points["total"] / alliance_total if alliance_total > 0 else 0
-            )
-            match_record["contribution_percentage"] = contribution_percentage
-            contribution_percentages.append(contribution_percentage)
-
-            # Add match record to history
-            performance["overall_metrics"]["total_estimated_points"] += match_points[
-                "total"
-            ]
-            performance["match_history"].append(match_record)
-
-        # After processing all matches:
-        if performance["matches_played"] > 0:
-            # Auto performance rates
-            performance["auto_performance"]["line_cross_success_rate"] = (
-                performance["auto_performance"]["auto_line_crosses"]
-                / performance["matches_played"]
-            )
-            performance["auto_performance"]["avg_auto_contribution"] = (
-                performance["auto_performance"]["total_auto_points"]
-                / performance["matches_played"]
-            )
-
-            # Teleop performance rates
-            performance["teleop_performance"]["avg_teleop_contribution"] = (
-                performance["teleop_performance"]["total_teleop_points"]
-                / performance["matches_played"]
-            )
-            performance["teleop_performance"]["estimated_coral_per_match"] = (
-                performance["teleop_performance"]["total_coral_count"]
-                / performance["matches_played"]
-            )
-
-            # Endgame performance rates
-            total_endgame = (
-                performance["endgame_performance"]["parked_count"]
-                + performance["endgame_performance"]["deep_cage_count"]
-                + performance["endgame_performance"]["shallow_cage_count"]
-                + performance["endgame_performance"]["none_count"]
-            )
+    @timed(DATA_SOURCE_SECONDS, source="tba", method="get_event_performance_metrics")
+    def get_event_performance_metrics(
+        self, event_code: str, stream: bool = False
+    ) -> dict | None:
+        """
+        Computes the performance metrics of every team at an event.
 
-            performance["endgame_performance"]["parked_rate"] = (
-                performance["endgame_performance"]["parked_count"]
-                / performance["matches_played"]
-            )
-            performance["endgame_performance"]["deep_cage_rate"] = (
-                performance["endgame_performance"]["deep_cage_count"]
-                / performance["matches_played"]
-            )
-            performance["endgame_performance"]["shallow_cage_rate"] = (
-                performance["endgame_performance"]["shallow_cage_count"]
-                / performance["matches_played"]
-            )
-            performance["endgame_performance"]["none_rate"] = (
-                performance["endgame_performance"]["none_count"]
-                / performance["matches_played"]
-            )
-            performance["endgame_performance"]["avg_endgame_points"] = (
-                performance["endgame_performance"]["total_endgame_points"]
-                / performance["matches_played"]
-            )
+        The event's matches are downloaded once and processed in a single pass,
+        instead of one request and one pass per team.
 
-            # Overall performance metrics
-            performance["overall_metrics"]["avg_points_per_match"] = (
-                performance["overall_metrics"]["total_estimated_points"]
-                / performance["matches_played"]
+        Args
+        -----
+        event_code : str
+            The eventcode for the event you want to compute metrics for.
+        stream : bool, optional
+            Parse the matches as the response is read, without the per match lists,
+            see get_team_performance_metrics.
+
+        Returns
+        -------
+        dict | None
+            Performance dict of each team, keyed by team number. None if the matches could not be
+            retrieved or their season has no scoring rules.
+        """
+        calculators = self.__season_calculators(event_code)
+        if calculators == None:
+            return None
+        calculator, streaming_calculator = calculators
+        if stream:
+            matches = self.__stream_matches(
+                f"{self.__base_url}/event/{event_code}/matches"
             )
+            if matches == None:
+                return None
+            with STAGE_SECONDS.time(stage="event_performance_metrics"):
+                return streaming_calculator.compute(matches, keep_history=False)
 
-            # Calculate consistency metrics
-            if contribution_percentages:
-                performance["overall_metrics"][
-                    "contribution_percentages"
-                ] = contribution_percentages
-                mean = sum(contribution_percentages) / len(contribution_percentages)
-                performance["overall_metrics"]["avg_contribution_percentage"] = mean
-
-                # Calculate standard deviation
-                variance = sum((x - mean) ** 2 for x in contribution_percentages) / len(
-                    contribution_percentages
-                )
-                std_dev = variance**0.5
-
-                # Higher consistency means lower standard deviation relative to the mean
-                performance["overall_metrics"]["consistency_rating"] = 1 - (
-                    std_dev / mean if mean > 0 else 0
-                )
-
-        return performance
-
-    def __calculate_auto_performance(
-        self, performance, match_points, match_record, alliance_data, robot_position
-    ):
-        auto_line_status = alliance_data[f"autoLineRobot{robot_position}"]
-        if auto_line_status == "Yes":
-            performance["auto_performance"]["auto_line_crosses"] += 1
-            estimated_auto_points = 3  # Mobility points
-
-            # If auto bonus achieved, attribute partial credit for coral as the data doesn't track who scored it
-            if alliance_data["autoBonusAchieved"]:
-                robots_crossed = sum(
-                    1
-                    for i in range(1, 4)
-                    if alliance_data[f"autoLineRobot{i}"] == "Yes"
-                )
-                if robots_crossed > 0:
-                    auto_coral_points = alliance_data["autoCoralPoints"]
-                    estimated_auto_points += auto_coral_points / robots_crossed
-
-                    # Track auto coral count (approximately)
-                    auto_coral_count = alliance_data["autoCoralCount"] / robots_crossed
-                    performance["auto_performance"][
-                        "auto_coral_count"
-                    ] += auto_coral_count
-        else:
-            estimated_auto_points = 0
-
-        performance["auto_performance"]["total_auto_points"] += estimated_auto_points
-        match_points["auto"] = estimated_auto_points
-        match_record["estimated_points"]["auto"] = estimated_auto_points
-
-    def __calculate_endgame_performance(
-        self, performance, match_points, match_record, alliance_data, robot_position
-    ):
-        endgame_status = alliance_data[f"endGameRobot{robot_position}"]
-        if endgame_status == "Parked":
-            performance["endgame_performance"]["parked_count"] += 1
-            estimated_endgame_points = 2  # Points for parking
-        elif endgame_status == "DeepCage":
-            performance["endgame_performance"]["deep_cage_count"] += 1
-            estimated_endgame_points = 12  # Points for deep cage
-        elif endgame_status == "ShallowCage":
-            performance["endgame_performance"]["shallow_cage_count"] += 1
-            estimated_endgame_points = 6  # Points for shallow cage
-        else:  # None
-            performance["endgame_performance"]["none_count"] += 1
-            estimated_endgame_points = 0
-
-        performance["endgame_performance"][
-            "total_endgame_points"
-        ] += estimated_endgame_points
-        match_points["endgame"] = estimated_endgame_points
-        match_record["estimated_points"]["endgame"] = estimated_endgame_points
-
-    def __calculate_teleop_performance(
-        self, performance, match_points, match_record, alliance_data, robot_position
-    ):
-        # Teleop performance estimation
-        robots_active = 3  # Assume all 3 robots contribute by default
-
-        # Basic estimate: divide equally
-        basic_teleop_estimate = alliance_data["teleopPoints"] / robots_active
-
-        # Adjust based on activity levels (if a robot didn't cross auto line, might be less active)
-        activity_adjustments = {1: 1.0, 2: 1.0, 3: 1.0}  # Full activity
-
-        for i in range(1, 4):
-            if alliance_data[f"autoLineRobot{i}"] == "No":
-                activity_adjustments[i] = 0.7  # Reduced activity if didn't move in auto
-
-        # Calculate adjusted teleop estimate
-        total_activity = sum(activity_adjustments.values())
-        adjusted_teleop_estimate = (
-            alliance_data["teleopPoints"]
-            * activity_adjustments[robot_position]
-            / total_activity
-        )
-
-        # Track coral placements
-        total_coral = alliance_data["teleopCoralCount"]
-        estimated_coral = (
-            total_coral * activity_adjustments[robot_position] / total_activity
-        )
-        performance["teleop_performance"]["total_coral_count"] += estimated_coral
-
-        # Track reef placements
-        reef_data = alliance_data["teleopReef"]
-        top_row_count = reef_data["tba_topRowCount"]
-        mid_row_count = reef_data["tba_midRowCount"]
-        bot_row_count = reef_data["tba_botRowCount"]
-        trough_count = reef_data.get("trough", 0)
-
-        # Attribute reef placements based on activity adjustment
-        performance["teleop_performance"]["reef_placements"]["top_row"] += (
-            top_row_count * activity_adjustments[robot_position] / total_activity
-        )
-        performance["teleop_performance"]["reef_placements"]["mid_row"] += (
-            mid_row_count * activity_adjustments[robot_position] / total_activity
-        )
-        performance["teleop_performance"]["reef_placements"]["bot_row"] += (
-            bot_row_count * activity_adjustments[robot_position] / total_activity
-        )
-        performance["teleop_performance"]["reef_placements"]["trough"] += (
-            trough_count * activity_adjustments[robot_position] / total_activity
-        )
-
-        performance["teleop_performance"][
-            "total_teleop_points"
-        ] += adjusted_teleop_estimate
-        match_points["teleop"] = adjusted_teleop_estimate
-        match_record["estimated_points"]["teleop"] = adjusted_teleop_estimate
+        matches = self.get_event_matches(event_code)
+        if matches == None:
+            return None
+        with STAGE_SECONDS.time(stage="event_performance_metrics"):
+            return calculator.compute(matches)
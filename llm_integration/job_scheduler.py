@@ -0,0 +1,229 @@
+import itertools
+import queue
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from utils.metrics import REGISTRY
+
+JOB_SUBMISSIONS = REGISTRY.counter(
+    "frcsp_llm_job_submissions_total",
+    "Submitted jobs by outcome: queued, coalesced into a running one, rejected or finished without a worker (cached)",
+)
+JOB_SECONDS = REGISTRY.histogram(
+    "frcsp_llm_job_seconds", "Time jobs spent waiting for a worker and running"
+)
+
+
+class LLMJob:
+    """State of a job submitted to the LLMJobScheduler"""
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+    def __init__(self, job_id: str, job_key: str, function, args: tuple):
+        self.job_id = job_id
+        self.job_key = job_key
+        self.status = self.QUEUED
+        self.result = None
+        self.error = None
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.__function = function
+        self.__args = args
+        self.__finished = threading.Event()
+
+    def run(self):
+        self.status = self.RUNNING
+        self.started_at = time.time()
+        try:
+            self.result = self.__function(*self.__args)
+            self.status = self.DONE
+        except Exception as e:
+            print(f"Error running LLM job {self.job_key}: {e}")
+            self.error = str(e)
+            self.status = self.FAILED
+        finally:
+            self.finished_at = time.time()
+            JOB_SECONDS.observe(self.started_at - self.submitted_at, phase="wait")
+            JOB_SECONDS.observe(self.finished_at - self.started_at, phase="run")
+            self.__finished.set()
+
+    def finish(self, result):
+        """Completes the job with a result known without running it"""
+        self.started_at = self.finished_at = time.time()
+        self.result = result
+        self.status = self.DONE
+        self.__finished.set()
+
+    def wait(self, timeout: float | None = None) -> bool:
+        """Blocks until the job finished, returns False if the timeout expired first"""
+        return self.__finished.wait(timeout)
+
+    def finished(self) -> bool:
+        return self.__finished.is_set()
+
+    def to_dict(self) -> dict:
+        """JSON serializable view of the job for polling clients"""
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "result": self.result,
+            "error": self.error,
+            "submitted_at": self.submitted_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class LLMJobScheduler:
+    """
+    Bounded job queue in front of the model server.
+
+    Generations are submitted as jobs and drained by a fixed number of worker
+    threads, sized to what the Ollama instance can run at once, so concurrent users
+    queue up instead of starting parallel generations that slow each other down.
+    A job submitted while another one with the same key is queued or running is
+    coalesced into it, and finished jobs are kept for a while so clients can poll
+    for their results.
+    """
+
+    def __init__(
+        self, workers: int = 1, max_queue_size: int = 32, max_finished_jobs: int = 256
+    ):
+        """
+        Args
+        -----
+        workers : int, optional
+            Number of jobs run at once, the number of generations the model server handles in parallel.
+        max_queue_size : int, optional
+            Maximum number of waiting jobs, further submissions are rejected.
+        max_finished_jobs : int, optional
+            Number of finished jobs kept for polling.
+        """
+        self.max_finished_jobs = max_finished_jobs
+        self.__queue = queue.Queue(maxsize=max_queue_size)
+        self.__lock = threading.Lock()
+        self.__ids = itertools.count(1)
+        self.__active_jobs = {}
+        self.__jobs = OrderedDict()
+        # Held by every running generation, including streams started outside the queue
+        self.__capacity = threading.Semaphore(workers)
+        self.__running_jobs = 0
+
+        # Read at scrape time, the most recently created scheduler is the one exported
+        REGISTRY.gauge(
+            "frcsp_llm_queue_depth", "Jobs waiting for a worker", self.queue_size
+        )
+        REGISTRY.gauge(
+            "frcsp_llm_running_jobs",
+            "Generations holding a worker slot, streams included",
+            lambda: self.__running_jobs,
+        )
+
+        self.__workers = [
+            threading.Thread(
+                target=self.__work, name=f"llm-worker-{index}", daemon=True
+            )
+            for index in range(workers)
+        ]
+        for worker in self.__workers:
+            worker.start()
+
+    def submit(self, job_key: str, function, *args) -> LLMJob | None:
+        """
+        Queues function(*args), or returns the queued/running job with the same key.
+
+        Args
+        -----
+        job_key : str
+            Identifies what the job computes, e.g. "rate_team:2025incmp:7457".
+        function : callable
+            The generation to run, its return value becomes the job's result.
+
+        Returns
+        -------
+        LLMJob | None
+            The job, None if the queue is full.
+        """
+        with self.__lock:
+            active_job = self.__active_jobs.get(job_key)
+            if active_job != None:
+                JOB_SUBMISSIONS.inc(result="coalesced")
+                return active_job
+
+            job = LLMJob(str(next(self.__ids)), job_key, function, args)
+            try:
+                self.__queue.put_nowait(job)
+            except queue.Full:
+                print(f"LLM job queue is full, rejecting {job_key}")
+                JOB_SUBMISSIONS.inc(result="rejected")
+                return None
+            JOB_SUBMISSIONS.inc(result="queued")
+
+            self.__active_jobs[job_key] = job
+            self.__jobs[job.job_id] = job
+            return job
+
+    def add_finished(self, job_key: str, result) -> LLMJob:
+        """
+        Records a job that is already done, e.g. a rating served from the cache.
+
+        The job can be polled like a queued one, but never waits for or takes a worker.
+        """
+        job = LLMJob(str(next(self.__ids)), job_key, None, ())
+        job.finish(result)
+        JOB_SUBMISSIONS.inc(result="finished")
+        with self.__lock:
+            self.__jobs[job.job_id] = job
+            self.__forget_finished_jobs()
+        return job
+
+    def get(self, job_id: str) -> LLMJob | None:
+        """Returns a queued, running or recently finished job"""
+        with self.__lock:
+            return self.__jobs.get(job_id)
+
+    def queue_size(self) -> int:
+        """Number of jobs waiting for a worker"""
+        return self.__queue.qsize()
+
+    @contextmanager
+    def reserve(self):
+        """
+        Holds one worker slot while the block runs.
+
+        For generations that can't go through the queue, e.g. responses streamed to the
+        browser, so they still count against the model server's capacity.
+        """
+        with self.__capacity:
+            with self.__lock:
+                self.__running_jobs += 1
+            try:
+                yield
+            finally:
+                with self.__lock:
+                    self.__running_jobs -= 1
+
+    def __work(self):
+        while True:
+            job = self.__queue.get()
+            with self.reserve():
+                job.run()
+
+            with self.__lock:
+                if self.__active_jobs.get(job.job_key) is job:
+                    del self.__active_jobs[job.job_key]
+                self.__forget_finished_jobs()
+            self.__queue.task_done()
+
+    def __forget_finished_jobs(self):
+        finished_ids = [job_id for job_id, job in self.__jobs.items() if job.finished()]
+        for job_id in finished_ids[
+            : max(len(finished_ids) - self.max_finished_jobs, 0)
+        ]:
+            del self.__jobs[job_id]
@@ -1,6 +1,21 @@
 import json
 import requests
 
+from utils.http_client import HttpClient
+from utils.metrics import REGISTRY
+
+GENERATION_SECONDS = REGISTRY.histogram(
+    "frcsp_llm_generation_seconds", "Duration of Ollama generations, by mode"
+)
+GENERATED_TOKENS = REGISTRY.counter(
+    "frcsp_llm_tokens_total", "Tokens evaluated by Ollama, prompt and response"
+)
+TOKENS_PER_SECOND = REGISTRY.histogram(
+    "frcsp_llm_tokens_per_second",
+    "Response generation speed reported by Ollama",
+    buckets=(1, 2, 5, 10, 20, 35, 50, 75, 100, 150, 250, 500),
+)
+
 
 class OLLAMAConnector:
     """
@@ -8,10 +23,27 @@ class OLLAMAConnector:
     """
 
     def __init__(
-        self, model_name: str, ollama_base_url: str = "http://localhost:11434"
+        self,
+        model_name: str,
+        ollama_base_url: str = "http://localhost:11434",
+        http_client: HttpClient | None = None,
     ):
         self.model_name = model_name
         self.ollama_base_url = ollama_base_url
+        # Generations routinely take minutes on CPU, so the default read timeout is generous
+        self.http_client = (
+            http_client if http_client != None else HttpClient(timeout=(5, 600))
+        )
+
+    @staticmethod
+    def __record_statistics(statistics: dict):
+        # Ollama reports token counts and the generation time in nanoseconds with the final message
+        GENERATED_TOKENS.inc(statistics.get("prompt_eval_count", 0), kind="prompt")
+        GENERATED_TOKENS.inc(statistics.get("eval_count", 0), kind="response")
+        if statistics.get("eval_count") and statistics.get("eval_duration"):
+            TOKENS_PER_SECOND.observe(
+                statistics["eval_count"] / statistics["eval_duration"] * 1e9
+            )
 
     def query_ollama(self, prompt: str):
         """
@@ -24,9 +56,44 @@ class OLLAMAConnector:
             "stream": False,  # Set to False to get the full response at once
         }
         try:
-            response = requests.post(url, json=data, stream=False)
-            response.raise_for_status()  # Raise HTTPError for bad responses (4xx or 5xx)
-            return response.json()["response"]
+            with GENERATION_SECONDS.time(mode="query"):
+                response = self.http_client.post(url, json=data, stream=False)
+                response.raise_for_status()  # Raise HTTPError for bad responses (4xx or 5xx)
+                response_json = response.json()
+            self.__record_statistics(response_json)
+            return response_json["response"]
         except requests.exceptions.RequestException as e:
             print(f"Error querying Ollama: {e}")
             return None
+
+    def stream_ollama(self, prompt: str, on_done=None):
+        """
+        Helper function to query the Ollama API, yielding the response text as it is generated.
+
+        on_done is called with Ollama's final message (generation statistics) once the
+        generation completed, it is not called if the stream was cut short.
+        """
+        url = f"{self.ollama_base_url}/api/generate"
+        data = {
+            "prompt": prompt,
+            "model": self.model_name,
+            "stream": True,  # Ollama answers with one JSON object per line
+        }
+        try:
+            with GENERATION_SECONDS.time(mode="stream"), self.http_client.post(
+                url, json=data, stream=True
+            ) as response:
+                response.raise_for_status()
+                for line in response.iter_lines():
+                    if not line:
+                        continue
+                    chunk = json.loads(line)
+                    if chunk.get("response"):
+                        yield chunk["response"]
+                    if chunk.get("done"):
+                        self.__record_statistics(chunk)
+                        if on_done != None:
+                            on_done(chunk)
+                        break
+        except requests.exceptions.RequestException as e:
+            print(f"Error querying Ollama: {e}")
@@ -1,9 +1,60 @@
+from analytics.opr import OprPredictor
+
+
 class MatchPredictor:
-    """Predicts match outcomes using LLM."""
+    """Predicts match outcomes using LLM, or statistically from OPRs when many matches are needed."""
 
-    def __init__(self, llm_model):
+    def __init__(self, llm_model, opr_ridge: float = 1.0):
+        """
+        Args
+        -----
+        llm_model : OLLAMAConnector
+            Model used for the written predictions.
+        opr_ridge : float, optional
+            Regularization of the OPR solve used for the numeric predictions, see OprPredictor.
+        """
         self.llm_model = llm_model
+        self.opr_ridge = opr_ridge
 
     def predict_outcome(self, blue_alliance_data, red_alliance_data):
         prompt = f"Given blue alliance data: {blue_alliance_data} and red alliance data: {red_alliance_data}, predict the match outcome."
-        return self.query_ollama(prompt)
+        return self.llm_model.query_ollama(prompt)
+
+    def predict_scores(
+        self, played_matches: list, red_team_numbers: list, blue_team_numbers: list
+    ) -> dict:
+        """
+        Predicts the scores and win probabilities of a single match without the LLM.
+
+        Args
+        -----
+        played_matches : list
+            The event's matches as returned by TheBlueAlliance API, used to fit the ratings.
+        red_team_numbers : list
+            Team numbers of the red alliance.
+        blue_team_numbers : list
+            Team numbers of the blue alliance.
+        """
+        model = OprPredictor(self.opr_ridge).fit(played_matches)
+        return model.predict(red_team_numbers, blue_team_numbers)
+
+    def predict_schedule(self, event_matches: list) -> list:
+        """
+        Predicts every match of an event without the LLM.
+
+        The ratings are fitted on the played matches, then every match (played or not)
+        gets a prediction so the accuracy of the played ones can be checked.
+
+        Args
+        -----
+        event_matches : list
+            The event's matches as returned by TheBlueAlliance API.
+
+        Returns
+        -------
+        list
+            One dict per match with its "key", the predicted "red_score" and "blue_score",
+            "red_win_probability" and "blue_win_probability".
+        """
+        model = OprPredictor(self.opr_ridge).fit(event_matches)
+        return model.predict_matches(event_matches)
@@ -0,0 +1,272 @@
+import json
+import re
+
+from analytics.scoring_rules import ScoringRules, get_event_scoring_rules
+
+
+class PromptFeatureExtractor:
+    """
+    Builds a compact, token-budgeted text representation of a team's data for LLM prompts.
+
+    Instead of interpolating the raw dicts (every match's full score breakdown), the
+    data is reduced to a metrics summary, one line per match and per scouting entry,
+    and a deduplicated list of notes. Lines are added in priority order until the
+    token budget is spent, most recent matches first.
+    """
+
+    def __init__(
+        self,
+        token_limit: int = 2048,
+        chars_per_token: float = 4.0,
+        max_matches: int = 12,
+        max_value_length: int = 200,
+    ):
+        """
+        Args
+        -----
+        token_limit : int, optional
+            Approximate number of tokens the data sections may use in total.
+        chars_per_token : float, optional
+            Characters per token used to estimate the size of the text, about 4 for English with Llama tokenizers.
+        max_matches : int, optional
+            Maximum number of (most recent) matches listed.
+        max_value_length : int, optional
+            Scouting values longer than this are truncated.
+        """
+        self.token_limit = token_limit
+        self.chars_per_token = chars_per_token
+        self.max_matches = max_matches
+        self.max_value_length = max_value_length
+
+    def estimate_tokens(self, text: str) -> int:
+        """Rough token count of a text"""
+        return int(len(text) / self.chars_per_token) + 1
+
+    def build_sections(
+        self,
+        perfomance_metrics: dict,
+        raw_event_data: list | None,
+        isa_data,
+        isa_notes,
+        scoring_rules: ScoringRules | None = None,
+    ) -> dict:
+        """
+        Returns the compact sections of the prompt, trimmed to the token budget.
+
+        Args
+        -----
+        scoring_rules : ScoringRules | None, optional
+            Rules of the season the data is from, read from the matches' event by default.
+
+        Returns
+        -------
+        dict
+            "summary", "matches", "scouting" and "notes", each a string.
+        """
+        if scoring_rules == None:
+            scoring_rules = self.event_scoring_rules(raw_event_data)
+        team_number = (perfomance_metrics or {}).get("team_number")
+        sections = {
+            "summary": self.summarize_performance(perfomance_metrics, scoring_rules),
+            # Free text is listed once, in the notes, even when the scouting data holds it too
+            "notes": self.deduplicate_notes([isa_notes, isa_data]),
+            "matches": self.summarize_matches(
+                raw_event_data, team_number, scoring_rules
+            ),
+            "scouting": self.tabulate(isa_data),
+        }
+
+        # Fill the budget in priority order, a section only gets what the previous ones left
+        remaining_chars = int(self.token_limit * self.chars_per_token)
+        trimmed = {}
+        for name in ("summary", "notes", "matches", "scouting"):
+            kept_lines = []
+            for line in sections[name]:
+                if len(line) + 1 > remaining_chars:
+                    break
+                kept_lines.append(line)
+                remaining_chars -= len(line) + 1
+            if len(kept_lines) < len(sections[name]):
+                kept_lines.append(
+                    f"({len(sections[name]) - len(kept_lines)} more lines omitted)"
+                )
+            trimmed[name] = "\n".join(kept_lines) if kept_lines else "No data"
+        return trimmed
+
+    @staticmethod
+    def event_scoring_rules(raw_event_data: list | None) -> ScoringRules:
+        """Scoring rules of the season of the first match that names its event"""
+        for match in raw_event_data or []:
+            if isinstance(match, dict) and match.get("event_key"):
+                return get_event_scoring_rules(match["event_key"])
+        return get_event_scoring_rules(None)
+
+    def summarize_performance(
+        self, perfomance_metrics: dict | None, scoring_rules: ScoringRules
+    ) -> list:
+        """One line per metric group of a performance dict of the season of scoring_rules"""
+        if not perfomance_metrics:
+            return []
+
+        auto = perfomance_metrics["auto_performance"]
+        teleop = perfomance_metrics["teleop_performance"]
+        placements = teleop[scoring_rules.placement_group]
+        placement_summary = " ".join(
+            f"{name.replace('_', ' ')} {placements[name]:.1f}"
+            for name in scoring_rules.placement_names
+        )
+        endgame = perfomance_metrics["endgame_performance"]
+        endgame_summary = ", ".join(
+            f"{bucket.replace('_', ' ')} {endgame[rate_key]:.0%}"
+            for bucket, rate_key in zip(
+                scoring_rules.endgame_buckets, scoring_rules.endgame_rate_keys
+            )
+        )
+        overall = perfomance_metrics["overall_metrics"]
+        return [
+            f"Team {perfomance_metrics['team_number']}: {perfomance_metrics['matches_played']} matches, "
+            f"{perfomance_metrics['wins']} wins, {perfomance_metrics['losses']} losses",
+            f"Auto: left starting line {auto['line_cross_success_rate']:.0%}, "
+            f"avg {auto['avg_auto_contribution']:.1f} pts, ~{auto['auto_coral_count']:.1f} game pieces total",
+            f"Teleop ({scoring_rules.game}): avg {teleop['avg_teleop_contribution']:.1f} pts, "
+            f"~{teleop['estimated_coral_per_match']:.1f} game pieces/match"
+            + (
+                f", {scoring_rules.placement_group.replace('_', ' ')} {placement_summary}"
+                if placement_summary
+                else ""
+            ),
+            f"Endgame: {endgame_summary}, avg {endgame['avg_endgame_points']:.1f} pts",
+            f"Overall: avg {overall['avg_points_per_match']:.1f} estimated pts/match, "
+            f"avg {overall['avg_contribution_percentage']:.0%} of alliance score, "
+            f"consistency {overall['consistency_rating']:.2f}",
+        ]
+
+    def summarize_matches(
+        self, raw_event_data: list | None, team_number, scoring_rules: ScoringRules
+    ) -> list:
+        """One line per played match from the team's point of view, most recent first"""
+        if not raw_event_data:
+            return []
+
+        team_key = f"frc{team_number}"
+        played = [
+            match for match in raw_event_data if match.get("score_breakdown") != None
+        ]
+        played.sort(
+            key=lambda match: match.get("actual_time") or match.get("time") or 0,
+            reverse=True,
+        )
+
+        lines = []
+        for match in played[: self.max_matches]:
+            alliance_color = None
+            for color in ("red", "blue"):
+                if team_key in match["alliances"][color]["team_keys"]:
+                    alliance_color = color
+            if alliance_color == None:
+                continue
+            opponent_color = "blue" if alliance_color == "red" else "red"
+            robot_index = match["alliances"][alliance_color]["team_keys"].index(
+                team_key
+            )
+            alliance_data = match["score_breakdown"][alliance_color]
+            partners = [
+                partner[3:]
+                for partner in match["alliances"][alliance_color]["team_keys"]
+                if partner != team_key
+            ]
+            result = (
+                "W"
+                if match["winning_alliance"] == alliance_color
+                else ("T" if match["winning_alliance"] == "" else "L")
+            )
+            lines.append(
+                f"{match['key'].split('_')[-1]} {alliance_color} {result} "
+                f"{match['alliances'][alliance_color]['score']}-{match['alliances'][opponent_color]['score']} "
+                f"with {'/'.join(partners)}: "
+                f"auto line {alliance_data.get(scoring_rules.mobility_keys[robot_index])}, "
+                f"endgame {alliance_data.get(scoring_rules.endgame_keys[robot_index])}, "
+                f"alliance auto {scoring_rules.fields['auto_points'](alliance_data)} "
+                f"teleop {scoring_rules.fields['teleop_points'](alliance_data)} "
+                f"fouls {scoring_rules.fields['foul_points'](alliance_data)}"
+            )
+        return lines
+
+    def tabulate(self, data) -> list:
+        """
+        Flattens scouting data into a header line and one compact line per entry.
+
+        Free-text columns are left out, they are listed by deduplicate_notes.
+        """
+        rows = self.__rows(data)
+        if not rows:
+            return []
+
+        columns = []
+        text_columns = set()
+        for row in rows:
+            for column, value in row.items():
+                if isinstance(value, str) and " " in value.strip():
+                    text_columns.add(column)
+                elif column not in columns and value not in (None, "", [], {}):
+                    columns.append(column)
+        columns = [column for column in columns if column not in text_columns]
+        if not columns:
+            return []
+
+        lines = ["|".join(columns)]
+        seen = set()
+        for row in rows:
+            line = "|".join(self.__compact_value(row.get(column)) for column in columns)
+            if line in seen:
+                continue
+            seen.add(line)
+            lines.append(line)
+        return lines
+
+    def deduplicate_notes(self, notes) -> list:
+        """Extracts the free-text notes, dropping duplicates and empty entries"""
+        texts = []
+        self.__collect_text(notes, texts)
+
+        unique_notes = []
+        seen = set()
+        for text in texts:
+            normalized = re.sub(r"\W+", " ", text).strip().lower()
+            if not normalized or normalized in seen:
+                continue
+            seen.add(normalized)
+            unique_notes.append(f"- {self.__compact_value(text)}")
+        return unique_notes
+
+    def __rows(self, data) -> list:
+        if isinstance(data, list):
+            return [row for row in data if isinstance(row, dict)]
+        if isinstance(data, dict):
+            for value in data.values():
+                if isinstance(value, list) and value and isinstance(value[0], dict):
+                    return value
+            return [data]
+        return []
+
+    def __collect_text(self, data, texts: list):
+        # Notes are the free-text values: strings containing spaces, anywhere in the structure
+        if isinstance(data, str):
+            if " " in data.strip():
+                texts.append(data)
+        elif isinstance(data, dict):
+            for value in data.values():
+                self.__collect_text(value, texts)
+        elif isinstance(data, list):
+            for value in data:
+                self.__collect_text(value, texts)
+
+    def __compact_value(self, value) -> str:
+        if value == None:
+            return ""
+        if isinstance(value, (dict, list)):
+            value = json.dumps(value, separators=(",", ":"))
+        value = re.sub(r"\s+", " ", str(value)).strip()
+        if len(value) > self.max_value_length:
+            value = value[: self.max_value_length - 3] + "..."
+        return value
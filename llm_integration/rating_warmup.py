@@ -0,0 +1,108 @@
+import json
+import os
+import time
+
+
+class RatingWarmup:
+    """
+    Generates the ratings of every team at an event ahead of time.
+
+    Teams are rated one after the other in the given priority order, so the teams
+    people look at first are ready first and the model server keeps capacity for
+    live requests. Progress is written to a JSON file after every team, an
+    interrupted warm-up picks up where it stopped when it is run again.
+    """
+
+    def __init__(self, progress_path: str = "cache/warmup_{event_code}.json"):
+        """
+        Args
+        -----
+        progress_path : str, optional
+            Path of the progress file, {event_code} is replaced by the event's code.
+        """
+        self.progress_path = progress_path
+
+    def load_progress(self, event_code: str) -> dict:
+        """Returns the saved progress of an event, empty if there is none"""
+        path = self.progress_path.format(event_code=event_code)
+        if os.path.exists(path):
+            try:
+                with open(path, "r") as f:
+                    return json.load(f)
+            except Exception as e:
+                print(f"Error loading warm-up progress: {e}")
+        return {"event_code": event_code, "completed": [], "failed": []}
+
+    def save_progress(self, event_code: str, progress: dict):
+        path = self.progress_path.format(event_code=event_code)
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Written next to the file and swapped in, an interruption never leaves it half written
+        temporary_path = f"{path}.tmp"
+        with open(temporary_path, "w") as f:
+            json.dump(progress, f, indent=4)
+        os.replace(temporary_path, path)
+
+    def run(
+        self,
+        event_code: str,
+        team_numbers: list,
+        rate_team,
+        restart: bool = False,
+        limit: int | None = None,
+    ) -> dict:
+        """
+        Rates the teams that were not rated by a previous run.
+
+        Args
+        -----
+        event_code : str
+            The event the teams are rated for.
+        team_numbers : list
+            Teams in priority order, the first ones are rated first.
+        rate_team : callable
+            rate_team(team_number, event_code) generates and stores a rating, returns False if it failed.
+        restart : bool, optional
+            Ignore the saved progress and rate every team again.
+        limit : int | None, optional
+            Maximum number of teams rated in this run.
+
+        Returns
+        -------
+        dict
+            The progress: "completed" and "failed" team numbers.
+        """
+        progress = (
+            {"event_code": event_code, "completed": [], "failed": []}
+            if restart
+            else self.load_progress(event_code)
+        )
+        completed = set(progress["completed"])
+        # Failed teams are retried, they are likely to succeed once the model server is back
+        remaining = [
+            team_number for team_number in team_numbers if team_number not in completed
+        ]
+        if limit != None:
+            remaining = remaining[:limit]
+
+        for position, team_number in enumerate(remaining):
+            started = time.time()
+            try:
+                succeeded = rate_team(team_number, event_code)
+            except Exception as e:
+                print(f"Error warming up team {team_number}: {e}")
+                succeeded = False
+
+            if team_number in progress["failed"]:
+                progress["failed"].remove(team_number)
+            if succeeded:
+                progress["completed"].append(team_number)
+            else:
+                progress["failed"].append(team_number)
+            self.save_progress(event_code, progress)
+            print(
+                f"[{position + 1}/{len(remaining)}] team {team_number} "
+                f"{'rated' if succeeded else 'failed'} in {time.time() - started:.1f}s"
+            )
+        return progress
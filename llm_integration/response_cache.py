@@ -0,0 +1,92 @@
+import hashlib
+import json
+
+from utils.disk_cache import DiskCache
+from utils.metrics import REGISTRY
+
+CACHE_REQUESTS = REGISTRY.counter(
+    "frcsp_llm_cache_requests_total", "Generated output lookups by outcome"
+)
+
+
+class LLMResponseCache:
+    """
+    Content-addressed on-disk cache of generated LLM outputs.
+
+    Outputs are keyed by a hash of the model name, the prompt template version and
+    the normalized input data, so a request with unchanged inputs is answered
+    without running the model. Entries are tagged with the teams they cover, and
+    the events they were generated for, so they can be dropped as soon as new
+    matches arrive for a team without touching its outputs at other events.
+    """
+
+    def __init__(
+        self,
+        cache_path: str = "cache/llm_cache.sqlite3",
+        max_entries: int = 2000,
+        max_bytes: int = 0,
+    ):
+        """
+        Args
+        -----
+        cache_path : str, optional
+            Path of the SQLite file backing the cache.
+        max_entries : int, optional
+            Maximum number of stored outputs before least recently used ones are evicted.
+        max_bytes : int, optional
+            Maximum total size of the stored outputs in bytes, 0 disables the size bound.
+        """
+        self.__store = DiskCache(cache_path, max_entries, max_bytes)
+
+    @staticmethod
+    def make_key(model_name: str, template_version, *inputs) -> str:
+        """Hashes the model, prompt template version and inputs into a cache key"""
+        normalized = json.dumps(
+            [model_name, template_version, inputs],
+            sort_keys=True,
+            separators=(",", ":"),
+            default=str,
+        )
+        return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def team_tag(team_number) -> str:
+        """Tag of the outputs generated about a team"""
+        return f"frc{team_number}"
+
+    @staticmethod
+    def event_team_tag(event_code: str, team_number) -> str:
+        """Tag of the outputs generated about a team at an event"""
+        return f"{event_code}:frc{team_number}"
+
+    def get(self, key: str) -> str | None:
+        """Returns the stored output for a key"""
+        entry = self.__store.get(key)
+        if entry == None:
+            CACHE_REQUESTS.inc(result="miss")
+            return None
+        CACHE_REQUESTS.inc(result="hit")
+        return entry[0].decode("utf-8")
+
+    def set(self, key: str, output: str, tags: list | tuple = ()):
+        """Stores a generated output"""
+        self.__store.set(key, output.encode("utf-8"), tags=tags)
+
+    def invalidate_team(self, team_number, event_code: str | None = None) -> int:
+        """
+        Drops the outputs generated about a team, returns how many were dropped.
+
+        Args
+        -----
+        team_number : int
+            The team whose data changed.
+        event_code : str | None, optional
+            Only drop the outputs generated for this event, every event's if not provided.
+        """
+        if event_code != None:
+            return self.__store.delete_tag(self.event_team_tag(event_code, team_number))
+        return self.__store.delete_tag(self.team_tag(team_number))
+
+    def clear(self):
+        """Drops every stored output"""
+        self.__store.clear()
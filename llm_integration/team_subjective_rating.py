@@ -1,8 +1,175 @@
+import json
+
+from llm_integration.prompt_features import PromptFeatureExtractor
+from llm_integration.response_cache import LLMResponseCache
+from utils.metrics import STAGE_SECONDS, timed
+
+
 class TeamRatingGenerator:
     """Generates subjective team ratings using LLM predictions"""
 
-    def __init__(self, llm_model):
+    # Bump whenever build_prompt changes so cached ratings of the old prompt are not reused
+    PROMPT_TEMPLATE_VERSION = 3
+    # Floats of the cache key inputs are rounded to this many decimals, far below what the
+    # prompt shows but above the last-bit differences of summing in another order
+    CACHE_KEY_DECIMALS = 6
+
+    def __init__(
+        self,
+        llm_model,
+        cache: LLMResponseCache | None = None,
+        feature_extractor: PromptFeatureExtractor | None = None,
+    ):
         self.llm_model = llm_model
+        self.cache = cache
+        self.feature_extractor = (
+            feature_extractor if feature_extractor != None else PromptFeatureExtractor()
+        )
+
+    def cache_key(
+        self,
+        perfomance_metrics: dict,
+        raw_event_data: dict,
+        isa_data: dict,
+        isa_notes: dict,
+    ) -> str:
+        """
+        Content address of a rating, see LLMResponseCache.make_key.
+
+        The inputs are canonicalized first, so the same data gathered another way
+        gets the same key: a warm-up feeds the running metrics every match at once
+        and fetches scouting data in bulk, a route request after the poller folded
+        in matches one by one and fetches one team's scouting data.
+        """
+        return LLMResponseCache.make_key(
+            self.llm_model.model_name,
+            # The token budget changes what ends up in the prompt, so it is part of the template
+            f"{self.PROMPT_TEMPLATE_VERSION}:{self.feature_extractor.token_limit}",
+            *self.canonical_inputs(
+                perfomance_metrics, raw_event_data, isa_data, isa_notes
+            ),
+        )
+
+    def canonical_inputs(
+        self,
+        perfomance_metrics: dict,
+        raw_event_data: list | None,
+        isa_data,
+        isa_notes,
+    ) -> tuple:
+        """
+        The rating inputs in an order and precision independent of how they were gathered.
+
+        Match history is sorted by match key, with contribution_percentages in the
+        same order. Matches and scouting entries are sorted. Floats are rounded to
+        CACHE_KEY_DECIMALS.
+        """
+        if perfomance_metrics and perfomance_metrics.get("match_history"):
+            history = sorted(
+                perfomance_metrics["match_history"],
+                key=lambda match_record: match_record["match_key"],
+            )
+            perfomance_metrics = {
+                **perfomance_metrics,
+                "match_history": history,
+                "overall_metrics": {
+                    **perfomance_metrics["overall_metrics"],
+                    "contribution_percentages": [
+                        match_record["contribution_percentage"]
+                        for match_record in history
+                    ],
+                },
+            }
+        if isinstance(raw_event_data, list):
+            raw_event_data = sorted(
+                raw_event_data,
+                key=lambda match: (
+                    match.get("key", "") if isinstance(match, dict) else ""
+                ),
+            )
+        return tuple(
+            self.__round_floats(value)
+            for value in (
+                perfomance_metrics,
+                raw_event_data,
+                self.__sort_entries(isa_data),
+                self.__sort_entries(isa_notes),
+            )
+        )
+
+    @staticmethod
+    def __sort_entries(entries):
+        if not isinstance(entries, list):
+            return entries
+        return sorted(
+            entries,
+            key=lambda entry: json.dumps(entry, sort_keys=True, default=str),
+        )
+
+    def __round_floats(self, value):
+        if isinstance(value, float):
+            return round(value, self.CACHE_KEY_DECIMALS)
+        if isinstance(value, dict):
+            return {key: self.__round_floats(item) for key, item in value.items()}
+        if isinstance(value, list):
+            return [self.__round_floats(item) for item in value]
+        return value
+
+    def __cache_tags(self, perfomance_metrics: dict, raw_event_data) -> list:
+        if not perfomance_metrics or "team_number" not in perfomance_metrics:
+            return []
+        team_number = perfomance_metrics["team_number"]
+        tags = [LLMResponseCache.team_tag(team_number)]
+        # The team's matches tell which event the rating was generated for
+        event_codes = {
+            match["event_key"]
+            for match in raw_event_data or []
+            if isinstance(match, dict) and match.get("event_key")
+        }
+        for event_code in sorted(event_codes):
+            tags.append(LLMResponseCache.event_team_tag(event_code, team_number))
+        return tags
+
+    @timed(STAGE_SECONDS, stage="prompt_build")
+    def build_prompt(
+        self,
+        perfomance_metrics: dict,
+        raw_event_data: dict,
+        isa_data: dict,
+        isa_notes: dict,
+    ) -> str:
+        """Builds the rating prompt from the available data"""
+        sections = self.feature_extractor.build_sections(
+            perfomance_metrics, raw_event_data, isa_data, isa_notes
+        )
+        return (
+            "The following First Robotics Competition (FRC) data comes from three different sources covering "
+            "the exact same team and event, please cross reference them to identify possible problems.\n"
+            f"Metrics estimated from The Blue Alliance match results:\n```\n{sections['summary']}\n```\n"
+            f"The team's matches from The Blue Alliance, most recent first:\n```\n{sections['matches']}\n```\n"
+            f"Scouting data from the Indiana Scouting Alliance, one line per entry:\n```\n{sections['scouting']}\n```\n"
+            "Do note that while the data source is the same for all three, the presentation of the data doesn't "
+            "match up perfectly. I also have the following notes about the team in the data:\n"
+            f"```\n{sections['notes']}\n```\n"
+            "Once you've done so, please use the data you have collected and referenced to give a comprehensive "
+            "subjective rating to the team. This is not an interactive conversation, so please give an output that "
+            "covers everything that you think the user may want in a single message including examples to support "
+            "the conclusions. THE DATA ONLY CONTAINS ONE TEAM, OUTPUT MUST BE IN HTML FORMAT."
+        )
+
+    def cached_rating(
+        self,
+        perfomance_metrics: dict,
+        raw_event_data: dict,
+        isa_data: dict,
+        isa_notes: dict,
+    ) -> str | None:
+        """Returns the cached rating of the data, None if it wasn't generated yet or there is no cache"""
+        if self.cache == None:
+            return None
+        return self.cache.get(
+            self.cache_key(perfomance_metrics, raw_event_data, isa_data, isa_notes)
+        )
 
     def rate_team(
         self,
@@ -12,6 +179,62 @@ class TeamRatingGenerator:
         isa_notes: dict,
     ) -> str | None:
         """Rates a team based on available data"""
-        return self.llm_model.query_ollama(
-            prompt=f"The following First Robotics Competition (FRC), data comes from three different sources covering the exact same team and event, please cross reference them to identify possible problems. ```{perfomance_metrics}```, ```{raw_event_data}```, ```{isa_data}``` Do note that while the data source is the same for all three, the presentation of the data doesn't match up perfectly. I also have the following notes about the team in the data: ```{isa_notes}```Once you've done so, please use the data you have collected and referenced to give a comprehensive subjective rating to the team. This is not an interactive conversation, so please give an output that covers everything that you think the user may want in a single message including examples to support the conclusions. THE DATA ONLY CONTAINS ONE TEAM, OUTPUT MUST BE IN HTML FORMAT."
+        if self.cache != None:
+            key = self.cache_key(
+                perfomance_metrics, raw_event_data, isa_data, isa_notes
+            )
+            cached_rating = self.cache.get(key)
+            if cached_rating != None:
+                return cached_rating
+
+        rating = self.llm_model.query_ollama(
+            prompt=self.build_prompt(
+                perfomance_metrics, raw_event_data, isa_data, isa_notes
+            )
         )
+        if self.cache != None and rating != None:
+            self.cache.set(
+                key, rating, self.__cache_tags(perfomance_metrics, raw_event_data)
+            )
+        return rating
+
+    def rate_team_stream(
+        self,
+        perfomance_metrics: dict,
+        raw_event_data: dict,
+        isa_data: dict,
+        isa_notes: dict,
+    ):
+        """Rates a team based on available data, yielding the rating as it is generated"""
+        if self.cache == None:
+            yield from self.llm_model.stream_ollama(
+                prompt=self.build_prompt(
+                    perfomance_metrics, raw_event_data, isa_data, isa_notes
+                )
+            )
+            return
+
+        key = self.cache_key(perfomance_metrics, raw_event_data, isa_data, isa_notes)
+        cached_rating = self.cache.get(key)
+        if cached_rating != None:
+            yield cached_rating
+            return
+
+        tokens = []
+        completed = []
+        for token in self.llm_model.stream_ollama(
+            prompt=self.build_prompt(
+                perfomance_metrics, raw_event_data, isa_data, isa_notes
+            ),
+            on_done=completed.append,
+        ):
+            tokens.append(token)
+            yield token
+
+        # Only complete generations are cached, never a stream that was cut short
+        if completed:
+            self.cache.set(
+                key,
+                "".join(tokens),
+                self.__cache_tags(perfomance_metrics, raw_event_data),
+            )
@@ -72,70 +72,400 @@
 #     app.run(debug=True)
 
 
-from flask import Flask, render_template, jsonify
+import argparse
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 
+from flask import (
+    Flask,
+    Response,
+    g,
+    render_template,
+    jsonify,
+    request,
+    stream_with_context,
+)
 
+
+from analytics.batch_metrics import BatchMetricsRunner
+from analytics.event_registry import EventRegistry
+from analytics.incremental_performance import IncrementalPerformanceAggregator
+from analytics.match_store import MatchStore
+from analytics.opr import OprPredictor
+from analytics.performance import PerformanceCalculator
+from analytics.ranking_simulation import RankingSimulator
+from analytics.scoring_rules import get_event_scoring_rules
+from analytics.season_ratings import SeasonRatingCalculator
+from data_sources.async_isa import AsyncIndianaScoutingAllianceConnector
+from data_sources.async_tba import AsyncTheBlueAllianceConnector
+from data_sources.event_poller import EventPoller
+from data_sources.season_ingestion import SeasonIngestor
 from data_sources.tba import TheBlueAllianceConnector
 from data_sources.isa import IndianaScoutingAllianceConnector
 from llm_integration.llm_model import OLLAMAConnector
 from llm_integration.team_subjective_rating import TeamRatingGenerator
 from llm_integration.match_outcome_prediction import MatchPredictor
 from llm_integration.alliance_selection import AllianceSelectionAssistant
+from llm_integration.job_scheduler import LLMJobScheduler
+from llm_integration.prompt_features import PromptFeatureExtractor
+from llm_integration.rating_warmup import RatingWarmup
+from llm_integration.response_cache import LLMResponseCache
 from utils.config_manager import ConfigurationManager
+from utils.http_cache import HttpResponseCache
+from utils.http_client import HttpClient
+from utils.json_api import JsonResponder
 from utils.logger import Logger
+from utils.metrics import REGISTRY, STAGE_SECONDS
+from utils.snapshot import SnapshotArchive, SnapshotHttpClient
+
+ROUTE_SECONDS = REGISTRY.histogram(
+    "frcsp_route_seconds",
+    "Time to answer each route, streamed bodies are timed until their first byte",
+)
 
 
 class FrcRatingApp:
-    def __init__(self):
+    def __init__(self, snapshot_mode: str | None = None):
+        """
+        Args
+        -----
+        snapshot_mode : str | None, optional
+            "record" to archive every data source response, "replay" to serve them from the archive
+            without network, "off" for live data. Defaults to the SNAPSHOT_MODE setting.
+        """
         self.app = Flask(__name__)
         self.config = ConfigurationManager()
         self.logger = Logger(__name__)
 
+        # Shared pooled transport used by every data source
+        self.http_client = HttpClient(
+            pool_maxsize=self.config.get("HTTP_POOL_SIZE", 10),
+            timeout=self.config.get("HTTP_TIMEOUT_SECONDS", 30),
+            max_retries=self.config.get("HTTP_MAX_RETRIES", 3),
+            backoff_factor=self.config.get("HTTP_BACKOFF_FACTOR", 0.5),
+        )
+
         # Initialize data sources
+        self.http_cache = HttpResponseCache(
+            self.config.get("HTTP_CACHE_PATH", "cache/http_cache.sqlite3"),
+            ttl_seconds=self.config.get("HTTP_CACHE_TTL_SECONDS", 30),
+            max_entries=self.config.get("HTTP_CACHE_MAX_ENTRIES", 5000),
+            max_bytes=self.config.get("HTTP_CACHE_MAX_BYTES", 0),
+        )
+
+        # Snapshots sit in place of the transport, the response cache is bypassed so every
+        # request is recorded and replays never go to the network
+        if snapshot_mode == None:
+            snapshot_mode = self.config.get("SNAPSHOT_MODE", "off")
+        if snapshot_mode not in ("off", "record", "replay"):
+            raise ValueError(f"Unknown snapshot mode: {snapshot_mode}")
+        self.snapshot_client = None
+        data_source_client = self.http_client
+        tba_cache = self.http_cache
+        if snapshot_mode != "off":
+            self.snapshot_client = SnapshotHttpClient(
+                SnapshotArchive(
+                    self.config.get("SNAPSHOT_PATH", "snapshots/snapshot.zip")
+                ),
+                record=snapshot_mode == "record",
+                http_client=self.http_client,
+            )
+            data_source_client = self.snapshot_client
+            tba_cache = None
+
         tba_api_key = self.config.get("TBA_TOKEN")
-        self.tba_connector = TheBlueAllianceConnector(tba_api_key)
+        self.tba_connector = TheBlueAllianceConnector(
+            tba_api_key,
+            cache=tba_cache,
+            http_client=data_source_client,
+            metrics_backend=self.config.get("METRICS_BACKEND", "python"),
+        )
 
         isa_api_key = self.config.get("ISA_TOKEN")
-        self.isa_connector = IndianaScoutingAllianceConnector(isa_api_key)
+        self.isa_connector = IndianaScoutingAllianceConnector(
+            isa_api_key, http_client=data_source_client
+        )
+
+        # Awaitable views of the connectors so a request can fan out its calls concurrently
+        self.data_source_executor = ThreadPoolExecutor(
+            max_workers=self.config.get("DATA_SOURCE_WORKERS", 8)
+        )
+        self.async_tba_connector = AsyncTheBlueAllianceConnector(
+            self.tba_connector, self.data_source_executor
+        )
+        self.async_isa_connector = AsyncIndianaScoutingAllianceConnector(
+            self.isa_connector, self.data_source_executor
+        )
 
         # Initialize LLM model
         llm_model = self.config.get("OLLAMA_MODEL")
-        self.llm = OLLAMAConnector(llm_model)
+        self.llm = OLLAMAConnector(
+            llm_model,
+            self.config.get("OLLAMA_URL", "http://localhost:11434"),
+            http_client=HttpClient(
+                pool_maxsize=self.config.get("OLLAMA_POOL_SIZE", 2),
+                timeout=self.config.get("OLLAMA_TIMEOUT_SECONDS", 600),
+                max_retries=self.config.get("HTTP_MAX_RETRIES", 3),
+            ),
+        )
+
+        # Generations are queued and run by as many workers as Ollama can serve at once
+        self.llm_scheduler = LLMJobScheduler(
+            workers=self.config.get("LLM_WORKERS", 1),
+            max_queue_size=self.config.get("LLM_QUEUE_SIZE", 32),
+        )
+        self.llm_job_wait_seconds = self.config.get("LLM_JOB_WAIT_SECONDS", 600)
+
+        # Compact, compressed and revalidatable JSON for the dashboards polling the API
+        self.json_responder = JsonResponder(
+            max_age=self.config.get("API_CACHE_MAX_AGE_SECONDS", 5)
+        )
+
+        # Generated outputs are reused as long as their inputs don't change
+        self.rating_cache = LLMResponseCache(
+            self.config.get("LLM_CACHE_PATH", "cache/llm_cache.sqlite3"),
+            max_entries=self.config.get("LLM_CACHE_MAX_ENTRIES", 2000),
+        )
 
         # Initialize prediction and rating services
-        self.team_rater = TeamRatingGenerator(self.llm)
-        self.match_predictor = MatchPredictor(self.llm)
+        self.team_rater = TeamRatingGenerator(
+            self.llm,
+            cache=self.rating_cache,
+            feature_extractor=PromptFeatureExtractor(
+                token_limit=self.config.get("LLM_PROMPT_TOKEN_LIMIT", 2048)
+            ),
+        )
+        self.match_predictor = MatchPredictor(
+            self.llm, opr_ridge=self.config.get("OPR_RIDGE", 1.0)
+        )
         self.alliance_assistant = AllianceSelectionAssistant(self.llm)
+        self.ranking_simulator = RankingSimulator(
+            iterations=self.config.get("SIMULATION_ITERATIONS", 10000),
+            opr_ridge=self.config.get("OPR_RIDGE", 1.0),
+        )
+
+        self.rating_warmup = RatingWarmup(
+            self.config.get("WARMUP_PROGRESS_PATH", "cache/warmup_{event_code}.json")
+        )
+
+        # Running metrics of every served event, partitioned by event so one process
+        # serves all of a weekend's events, only newly played matches are folded in on refresh
+        self.events = EventRegistry(
+            self.config.get("EVENTS", ["2025incmp"]),
+            default_event=self.config.get("DEFAULT_EVENT"),
+            max_loaded_events=self.config.get("MAX_LOADED_EVENTS", 8),
+        )
+
+        # Watches the events' match lists and refreshes what depends on the changed matches
+        self.event_poller = EventPoller(
+            self.tba_connector,
+            self.apply_event_changes,
+            interval_seconds=self.config.get("POLL_INTERVAL_SECONDS", 60),
+        )
+        for event_code in self.config.get("POLL_EVENTS", self.config.get("EVENTS", [])):
+            self.event_poller.watch(event_code)
+
+        # Every match of the season, downloaded by `python main.py season`
+        self.season_store = MatchStore(
+            self.config.get("SEASON_STORE_PATH", "cache/season_matches.npy")
+        )
+        self.season_ingestor = SeasonIngestor(
+            self.tba_connector,
+            self.season_store,
+            workers=self.config.get("SEASON_WORKERS", 8),
+        )
+        self.season_rating_calculator = SeasonRatingCalculator()
+        # Nightly recomputation of every event's and team's metrics from the season store
+        self.batch_metrics_runner = BatchMetricsRunner(
+            self.config.get("SEASON_STORE_PATH", "cache/season_matches.npy"),
+            workers=self.config.get("BATCH_WORKERS", os.cpu_count()),
+        )
+        # (year, stored match count, store file modification time) -> ratings
+        self.__season_ratings = (None, None)
 
         self.setup_routes()
 
     def setup_routes(self):
+        self.app.before_request(self.__start_route_timer)
+        self.app.after_request(self.__observe_route_timer)
+        self.app.add_url_rule("/metrics", "metrics", self.metrics)
         self.app.add_url_rule("/", "index", self.index)
         self.app.add_url_rule("/team/<int:team_number>", "team_info", self.team_info)
+        self.app.add_url_rule(
+            "/team/<int:team_number>/stream", "team_info_stream", self.team_info_stream
+        )
+        self.app.add_url_rule(
+            "/team/<int:team_number>/job", "team_info_job", self.team_info_job
+        )
+        self.app.add_url_rule(
+            "/event/<event_code>/team/<int:team_number>",
+            "event_team_info",
+            self.team_info,
+        )
+        self.app.add_url_rule(
+            "/event/<event_code>/team/<int:team_number>/stream",
+            "event_team_info_stream",
+            self.team_info_stream,
+        )
+        self.app.add_url_rule(
+            "/event/<event_code>/team/<int:team_number>/job",
+            "event_team_info_job",
+            self.team_info_job,
+        )
+        self.app.add_url_rule("/jobs/<job_id>", "llm_job", self.llm_job)
+        self.app.add_url_rule(
+            "/event/<event_code>/predictions",
+            "event_predictions",
+            self.event_predictions,
+        )
+        self.app.add_url_rule(
+            "/event/<event_code>/rankings/simulation",
+            "event_ranking_simulation",
+            self.event_ranking_simulation,
+        )
+        self.app.add_url_rule(
+            "/api/team/<int:team_number>", "api_team_metrics", self.api_team_metrics
+        )
+        self.app.add_url_rule("/api/events", "api_events", self.api_events)
+        self.app.add_url_rule(
+            "/api/event/<event_code>/team/<int:team_number>",
+            "api_event_team_metrics",
+            self.api_team_metrics,
+        )
+        self.app.add_url_rule(
+            "/api/event/<event_code>/metrics",
+            "api_event_metrics",
+            self.api_event_metrics,
+        )
+        self.app.add_url_rule(
+            "/api/event/<event_code>/predictions",
+            "api_event_predictions",
+            self.api_event_predictions,
+        )
+        self.app.add_url_rule(
+            "/api/season/rankings", "api_season_rankings", self.api_season_rankings
+        )
+
+    def __start_route_timer(self):
+        g.route_started = time.perf_counter()
+
+    def __observe_route_timer(self, response):
+        ROUTE_SECONDS.observe(
+            time.perf_counter() - g.route_started,
+            endpoint=request.endpoint or "not_found",
+            status=response.status_code,
+        )
+        return response
+
+    def metrics(self):
+        """Timings, counters and queue depths in the Prometheus text format"""
+        return Response(
+            REGISTRY.render(), content_type="text/plain; version=0.0.4; charset=utf-8"
+        )
 
     def index(self):
         return render_template("index.html")
 
-    def team_info(self, team_number):
-        event_code = "2025incmp"
-        tba_team_performance_metrics = self.tba_connector.get_team_performance_metrics(
-            team_number, event_code
+    def __unknown_event(self, event_code):
+        """404 response for a malformed event code or a season without scoring rules, None if it is valid"""
+        if self.events.is_valid_event_code(event_code):
+            return None
+        return jsonify({"error": f"Unknown event {event_code}"}), 404
+
+    def __unknown_api_event(self, event_code):
+        """Same as __unknown_event, answered through the JSON API"""
+        if self.events.is_valid_event_code(event_code):
+            return None
+        return self.json_responder.respond(
+            request, {"error": f"Unknown event {event_code}"}, 404
         )
-        tba_raw_event_data = self.tba_connector.get_event_matches(
-            event_code, team_number
+
+    def team_info(self, team_number, event_code=None):
+        """Rates a team at an event, the default event if not given, through the job queue and waits for the result"""
+        event_code = event_code or self.events.default_event
+        unknown_event = self.__unknown_event(event_code)
+        if unknown_event != None:
+            return unknown_event
+        job = self.__submit_rating_job(team_number, event_code)
+        if job == None:
+            return "The rating queue is full, please try again later", 503
+        if not job.wait(self.llm_job_wait_seconds):
+            return jsonify(job.to_dict()), 202
+        if job.status != job.DONE:
+            # The rating raised, expose the error the way /jobs/<job_id> does
+            return jsonify(job.to_dict()), 502
+        return job.result
+
+    def team_info_job(self, team_number, event_code=None):
+        """Queues a team rating and returns the job to poll at /jobs/<job_id>"""
+        event_code = event_code or self.events.default_event
+        unknown_event = self.__unknown_event(event_code)
+        if unknown_event != None:
+            return unknown_event
+        job = self.__submit_rating_job(team_number, event_code)
+        if job == None:
+            return jsonify({"error": "The rating queue is full"}), 503
+        return jsonify(job.to_dict()), 202
+
+    def llm_job(self, job_id):
+        """Status, and once finished the result, of a queued job"""
+        job = self.llm_scheduler.get(job_id)
+        if job == None:
+            return jsonify({"error": f"Unknown job {job_id}"}), 404
+        return jsonify(job.to_dict())
+
+    def __submit_rating_job(self, team_number, event_code):
+        job_key = f"rate_team:{event_code}:{team_number}"
+        team_data = asyncio.run(self.gather_team_data(team_number, event_code))
+        # Cached ratings and missing metrics are answered at once, only generations wait for a worker
+        if not team_data[0]:
+            return self.llm_scheduler.add_finished(
+                job_key, self.rate_team(team_number, event_code, team_data)
+            )
+        cached_rating = self.team_rater.cached_rating(*team_data)
+        if cached_rating != None:
+            return self.llm_scheduler.add_finished(
+                job_key, f"Subjective Team Rating: {cached_rating}"
+            )
+        # Requests for a team that is already being rated share the same job
+        return self.llm_scheduler.submit(
+            job_key,
+            self.rate_team,
+            team_number,
+            event_code,
+            team_data,
         )
-        isa_data = self.isa_connector.get_event_matches(event_code, team_number)
-        isa_notes = self.isa_connector.get_robot_notes(team_number, event_code)
+
+    def rate_team(self, team_number, event_code, team_data: tuple | None = None):
+        """
+        Generates a team's rating, runs on the job queue's workers.
+
+        Args
+        -----
+        team_data : tuple | None, optional
+            The team's inputs as returned by gather_team_data, gathered if not provided.
+        """
+        if team_data == None:
+            team_data = asyncio.run(self.gather_team_data(team_number, event_code))
+        (
+            tba_team_performance_metrics,
+            tba_raw_event_data,
+            isa_data,
+            isa_notes,
+        ) = team_data
 
         if tba_team_performance_metrics:
             # Generate subjective team rating
             self.logger.info(f"Generating Team rating...")
-            team_rating = self.team_rater.rate_team(
-                tba_team_performance_metrics,
-                tba_raw_event_data,
-                isa_data,
-                isa_notes,
-            )
+            with STAGE_SECONDS.time(stage="team_rating"):
+                team_rating = self.team_rater.rate_team(
+                    tba_team_performance_metrics,
+                    tba_raw_event_data,
+                    isa_data,
+                    isa_notes,
+                )
             output = f"Subjective Team Rating: {team_rating}"
             self.logger.info(output)
             return output
@@ -145,10 +475,671 @@ class FrcRatingApp:
             self.logger.info(output)
             return output
 
+    def team_info_stream(self, team_number, event_code=None):
+        """Same as team_info, but the rating is sent to the browser as it is generated"""
+        event_code = event_code or self.events.default_event
+        unknown_event = self.__unknown_event(event_code)
+        if unknown_event != None:
+            return unknown_event
+
+        def generate():
+            (
+                tba_team_performance_metrics,
+                tba_raw_event_data,
+                isa_data,
+                isa_notes,
+            ) = asyncio.run(self.gather_team_data(team_number, event_code))
+
+            if not tba_team_performance_metrics:
+                output = f"Could not retrieve metrics for team {team_number} at event {event_code}"
+                self.logger.info(output)
+                yield output
+                return
+
+            yield "Subjective Team Rating: "
+            cached_rating = self.team_rater.cached_rating(
+                tba_team_performance_metrics,
+                tba_raw_event_data,
+                isa_data,
+                isa_notes,
+            )
+            if cached_rating != None:
+                self.logger.info(f"Subjective Team Rating: {cached_rating}")
+                yield cached_rating
+                return
+
+            self.logger.info(f"Generating Team rating...")
+            team_rating = []
+            # Streams bypass the queue but still take one of the model server's slots
+            with self.llm_scheduler.reserve():
+                for token in self.team_rater.rate_team_stream(
+                    tba_team_performance_metrics,
+                    tba_raw_event_data,
+                    isa_data,
+                    isa_notes,
+                ):
+                    team_rating.append(token)
+                    yield token
+            self.logger.info(f"Subjective Team Rating: {''.join(team_rating)}")
+
+        return Response(
+            stream_with_context(generate()),
+            mimetype="text/html",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+    def event_predictions(self, event_code):
+        """Predicted scores and win probabilities of every match of an event, computed from OPRs"""
+        unknown_event = self.__unknown_event(event_code)
+        if unknown_event != None:
+            return unknown_event
+        predictions = self.predict_event_matches(event_code)
+        if predictions == None:
+            return (
+                jsonify(
+                    {"error": f"Could not retrieve matches for event {event_code}"}
+                ),
+                502,
+            )
+        return jsonify(predictions)
+
+    def predict_event_matches(self, event_code) -> list | None:
+        """
+        Predicts every match of an event from OPRs.
+
+        Returns
+        -------
+        list | None
+            One prediction per match with the alliances and, once played, the winner.
+            None if the matches could not be retrieved.
+        """
+        event_matches = self.tba_connector.get_event_matches(event_code)
+        if event_matches == None:
+            self.logger.info(f"Could not retrieve matches for event {event_code}")
+            return None
+
+        with STAGE_SECONDS.time(stage="match_predictions"):
+            predictions = self.match_predictor.predict_schedule(event_matches)
+        matches_by_key = {match["key"]: match for match in event_matches}
+        for prediction in predictions:
+            match = matches_by_key[prediction["key"]]
+            prediction["red_teams"] = match["alliances"]["red"]["team_keys"]
+            prediction["blue_teams"] = match["alliances"]["blue"]["team_keys"]
+            prediction["winning_alliance"] = (
+                match["winning_alliance"]
+                if match.get("score_breakdown") != None
+                else None
+            )
+        return predictions
+
+    def event_ranking_simulation(self, event_code):
+        """Distribution of every team's final qualification rank, simulated from the remaining schedule"""
+        unknown_event = self.__unknown_event(event_code)
+        if unknown_event != None:
+            return unknown_event
+        event_matches = self.tba_connector.get_event_matches(event_code)
+        if event_matches == None:
+            output = f"Could not retrieve matches for event {event_code}"
+            self.logger.info(output)
+            return jsonify({"error": output}), 502
+
+        with STAGE_SECONDS.time(stage="ranking_simulation"):
+            simulation = self.ranking_simulator.simulate(event_matches)
+        return jsonify(
+            sorted(
+                (
+                    {"team_number": team_number, **result}
+                    for team_number, result in simulation.items()
+                ),
+                key=lambda result: result["mean_rank"],
+            )
+        )
+
+    def api_events(self):
+        """The served events and the state of their live data, see list_events"""
+        return self.json_responder.respond(request, self.list_events())
+
+    def api_team_metrics(self, team_number, event_code=None):
+        """A team's live metrics at an event as JSON, /api/team/<n> reads the event from ?event=, the default event if not given"""
+        event_code = event_code or request.args.get("event", self.events.default_event)
+        unknown_event = self.__unknown_api_event(event_code)
+        if unknown_event != None:
+            return unknown_event
+        performance = self.get_live_team_performance(team_number, event_code)
+        if performance == None:
+            return self.json_responder.respond(
+                request,
+                {"error": f"Could not retrieve matches for event {event_code}"},
+                502,
+            )
+        return self.json_responder.respond(request, performance)
+
+    def api_event_metrics(self, event_code):
+        """Live metrics of every team at an event as JSON, in team number order"""
+        unknown_event = self.__unknown_api_event(event_code)
+        if unknown_event != None:
+            return unknown_event
+        performances = self.get_live_event_performance(event_code)
+        if performances == None:
+            return self.json_responder.respond(
+                request,
+                {"error": f"Could not retrieve matches for event {event_code}"},
+                502,
+            )
+        return self.json_responder.respond(
+            request,
+            [performances[team_number] for team_number in sorted(performances)],
+        )
+
+    def api_event_predictions(self, event_code):
+        """Same as event_predictions, served through the JSON API"""
+        unknown_event = self.__unknown_api_event(event_code)
+        if unknown_event != None:
+            return unknown_event
+        predictions = self.predict_event_matches(event_code)
+        if predictions == None:
+            return self.json_responder.respond(
+                request,
+                {"error": f"Could not retrieve matches for event {event_code}"},
+                502,
+            )
+        return self.json_responder.respond(request, predictions)
+
+    def api_season_rankings(self):
+        """
+        Teams of a stored season ordered by rating, with their per-event trend.
+
+        ?year= selects the season, the latest stored one by default, ?by= is "epa" (default)
+        or "elo" and ?limit= keeps the best teams only.
+        """
+        by = request.args.get("by", "epa")
+        if by not in ("epa", "elo"):
+            return self.json_responder.respond(
+                request, {"error": f"Unknown rating: {by}"}, 400
+            )
+        ratings = self.season_ratings(request.args.get("year", type=int))
+        if ratings == None:
+            return self.json_responder.respond(
+                request,
+                {"error": "No season stored, run `python main.py season` first"},
+                404,
+            )
+        rankings = self.season_rating_calculator.rankings(ratings, by)
+        limit = request.args.get("limit", type=int)
+        if limit != None:
+            rankings = rankings[:limit]
+        return self.json_responder.respond(request, rankings)
+
+    def list_events(self) -> list:
+        """
+        Lists the served events: the configured ones, default event first, then those loaded on demand.
+
+        Returns
+        -------
+        list
+            One dict per event with "event_code", "default", "configured", "polled",
+            "loaded" (its running metrics are in memory), "team_count" (teams with
+            running metrics) and "warmup" ("completed" and "failed" team counts of its
+            saved warm-up progress).
+        """
+        configured_events = self.events.configured_events()
+        polled_events = set(self.event_poller.watched_events())
+        event_list = []
+        for event_code in self.events.served_events():
+            aggregator = self.events.aggregator(event_code, create=False)
+            progress = self.rating_warmup.load_progress(event_code)
+            event_list.append(
+                {
+                    "event_code": event_code,
+                    "default": event_code == self.events.default_event,
+                    "configured": event_code in configured_events,
+                    "polled": event_code in polled_events,
+                    "loaded": aggregator != None,
+                    "team_count": (
+                        0 if aggregator == None else len(aggregator.team_numbers())
+                    ),
+                    "warmup": {
+                        "completed": len(progress.get("completed", [])),
+                        "failed": len(progress.get("failed", [])),
+                    },
+                }
+            )
+        return event_list
+
+    def ingest_season(self, year: int | None = None) -> dict | None:
+        """Downloads every official event's matches of a season into the season store"""
+
+        def progress(event_key, match_count):
+            if match_count == None:
+                self.logger.info(f"{event_key}: download failed")
+            else:
+                self.logger.info(f"{event_key}: {match_count} matches")
+
+        return self.season_ingestor.ingest(year, progress=progress)
+
+    def season_ratings(self, year: int | None = None) -> dict | None:
+        """
+        Elo and EPA of every team of a stored season, see SeasonRatingCalculator.compute.
+
+        The ratings are computed once per version of the store, picking up the matches
+        a season ingestion running in another process added.
+
+        Args
+        -----
+        year : int | None, optional
+            The season, the latest stored one by default.
+
+        Returns
+        -------
+        dict | None
+            Ratings keyed by team number, None if no match of the season is stored.
+        """
+        self.season_store.reload()
+        store_path = self.config.get("SEASON_STORE_PATH", "cache/season_matches.npy")
+        if len(self.season_store) == 0 or not os.path.exists(store_path):
+            return None
+        if year == None:
+            year = int(self.season_store.matches()["year"].max())
+
+        version = (year, len(self.season_store), os.stat(store_path).st_mtime_ns)
+        cached_version, cached_ratings = self.__season_ratings
+        if cached_version == version:
+            return cached_ratings
+
+        rows = self.season_store.matches(year=year)
+        if len(rows) == 0:
+            return None
+        with STAGE_SECONDS.time(stage="season_ratings"):
+            ratings = self.season_rating_calculator.compute(rows)
+        self.__season_ratings = (version, ratings)
+        return ratings
+
+    def recompute_season_metrics(self, year: int | None = None) -> dict | None:
+        """
+        Computes the performance metrics of every stored event and of every team over the season.
+
+        The work is spread over BATCH_WORKERS processes, see BatchMetricsRunner.
+
+        Args
+        -----
+        year : int | None, optional
+            The season, the latest stored one by default.
+
+        Returns
+        -------
+        dict | None
+            "year", "events" (event key -> performances keyed by team number) and "teams"
+            (team number -> season performance), without match histories. None if no match
+            of the season is stored.
+        """
+        self.season_store.reload()
+        if len(self.season_store) == 0:
+            return None
+        if year == None:
+            year = int(self.season_store.matches()["year"].max())
+
+        units = self.batch_metrics_runner.season_units(year)
+        if len(units) == 0:
+            return None
+        with STAGE_SECONDS.time(stage="season_metrics"):
+            results = self.batch_metrics_runner.compute(units, year=year)
+
+        season_metrics = {"year": year, "events": {}, "teams": {}}
+        for (event_key, team_number), performances in results.items():
+            if event_key != None:
+                season_metrics["events"][event_key] = performances
+            else:
+                season_metrics["teams"][team_number] = performances
+        return season_metrics
+
+    async def gather_team_data(
+        self, team_number, event_code, isa_scouting: list | None = None
+    ) -> tuple:
+        """
+        Fetches the TBA and ISA inputs of a team rating concurrently.
+
+        Args
+        -----
+        isa_scouting : list | None, optional
+            The team's ISA entries when they were already fetched in bulk, fetched if not provided.
+
+        Returns
+        -------
+        tuple
+            (performance metrics, raw TBA team matches, ISA match data, ISA notes)
+        """
+        requests = [
+            self.async_tba_connector.get_event_matches(event_code),
+            self.async_tba_connector.get_event_matches(event_code, team_number),
+        ]
+        if isa_scouting == None:
+            requests.append(
+                self.async_isa_connector.get_teams_scouting(event_code, [team_number])
+            )
+        with STAGE_SECONDS.time(stage="gather_team_data"):
+            results = await asyncio.gather(*requests)
+        event_matches, tba_raw_event_data = results[0], results[1]
+        if isa_scouting == None and results[2] != None:
+            isa_scouting = results[2].get(team_number, [])
+
+        # A single ISA request returns both the match data and the notes, the prompt
+        # takes the structured values from the former and the free text from the latter
+        isa_data = isa_notes = isa_scouting
+        tba_team_performance_metrics = self.__update_live_performance(
+            team_number, event_code, event_matches
+        )
+        return tba_team_performance_metrics, tba_raw_event_data, isa_data, isa_notes
+
+    def prepare_team_rating(
+        self, team_number, event_code, isa_scouting: list | None = None
+    ) -> bool:
+        """Generates and caches a team's rating ahead of time, returns whether it succeeded"""
+        (
+            tba_team_performance_metrics,
+            tba_raw_event_data,
+            isa_data,
+            isa_notes,
+        ) = asyncio.run(self.gather_team_data(team_number, event_code, isa_scouting))
+        if not tba_team_performance_metrics:
+            return False
+        # Same inputs as team_info, so the cached rating is the one the routes look up
+        team_rating = self.team_rater.rate_team(
+            tba_team_performance_metrics,
+            tba_raw_event_data,
+            isa_data,
+            isa_notes,
+        )
+        return team_rating != None
+
+    def event_team_priority(self, event_code) -> list:
+        """
+        Returns the event's teams, those most likely to be picked first come first.
+
+        Teams are ordered by OPR, teams without a played match come last in team number order.
+        B teams (frc254B) keep their suffix and follow the team with the same number.
+        """
+        event_matches = self.tba_connector.get_event_matches(event_code)
+        if event_matches == None:
+            return []
+
+        team_numbers = set()
+        for match in event_matches:
+            for alliance_color in ("red", "blue"):
+                for team_key in match["alliances"][alliance_color]["team_keys"]:
+                    team_numbers.add(
+                        PerformanceCalculator.team_number_from_key(team_key)
+                    )
+
+        ratings = (
+            OprPredictor(self.config.get("OPR_RIDGE", 1.0)).fit(event_matches).ratings()
+        )
+        return sorted(
+            team_numbers,
+            key=lambda team_number: (
+                team_number not in ratings,
+                -ratings.get(team_number, {"opr": 0})["opr"],
+                int(str(team_number).rstrip("ABCDEFGHIJKLMNOPQRSTUVWXYZ")),
+                str(team_number),
+            ),
+        )
+
+    def warm_up_event(self, event_code, restart=False, limit=None) -> dict:
+        """Rates every team at an event ahead of time, resuming a previous interrupted run"""
+        team_numbers = self.event_team_priority(event_code)
+        if not team_numbers:
+            self.logger.info(f"Could not retrieve the teams of event {event_code}")
+            return {}
+        self.logger.info(f"Warming up {len(team_numbers)} teams at {event_code}")
+
+        # The scouting data of the whole event takes a few bulk requests instead of one per team
+        event_scouting = self.isa_connector.get_teams_scouting(
+            event_code,
+            team_numbers,
+            batch_size=self.config.get("ISA_BATCH_SIZE", 50),
+        )
+
+        def prepare_team_rating(team_number, event_code):
+            return self.prepare_team_rating(
+                team_number,
+                event_code,
+                None if event_scouting == None else event_scouting[team_number],
+            )
+
+        return self.rating_warmup.run(
+            event_code,
+            team_numbers,
+            prepare_team_rating,
+            restart=restart,
+            limit=limit,
+        )
+
+    def record_event_snapshot(self, event_code) -> int:
+        """
+        Requests everything the app reads about an event and its teams, so a recording snapshot archives it.
+
+        Returns
+        -------
+        int
+            Number of teams recorded, 0 if the event's matches could not be retrieved.
+        """
+        self.tba_connector.get_status()
+        self.isa_connector.get_event_matches(event_code)
+        team_numbers = self.event_team_priority(event_code)
+        self.isa_connector.get_teams_scouting(
+            event_code,
+            team_numbers,
+            batch_size=self.config.get("ISA_BATCH_SIZE", 50),
+        )
+        for team_number in team_numbers:
+            # The same requests as a rating, so the replayed URLs match
+            asyncio.run(self.gather_team_data(team_number, event_code))
+            self.tba_connector.get_team_info(team_number)
+            # Scored with the rules of the event's season, the connector's year may have none
+            self.tba_connector.get_team_performance_metrics(team_number, event_code)
+        if self.snapshot_client != None and self.snapshot_client.record:
+            self.snapshot_client.archive.save()
+        return len(team_numbers)
+
+    def get_live_team_performance(self, team_number, event_code):
+        """Returns a team's metrics at an event, updated with the matches played since the last call"""
+        matches = self.tba_connector.get_event_matches(event_code)
+        return self.__update_live_performance(team_number, event_code, matches)
+
+    def get_live_event_performance(self, event_code) -> dict | None:
+        """Returns the metrics of every team that played at an event, keyed by team number"""
+        aggregator = self.__update_live_aggregator(
+            event_code, self.tba_connector.get_event_matches(event_code)
+        )
+        if aggregator == None:
+            return None
+        return {
+            team_number: aggregator.get_performance(team_number)
+            for team_number in aggregator.team_numbers()
+        }
+
+    def apply_event_changes(self, event_code, matches, changes):
+        """
+        Refreshes the data derived from the changed matches of an event, called by the event poller.
+
+        Only the teams that played in the new or corrected matches are touched: their
+        cached per-team match lists, their ratings at this event and their running
+        metrics. Their ratings at other events are kept. OPRs, predictions and rank
+        simulations are computed per request from the event's match list, which the
+        poll just refreshed.
+        """
+        if changes["corrected_results"]:
+            # Running totals can't take a result back, rebuild them and swap them in whole
+            aggregator = IncrementalPerformanceAggregator(
+                scoring_rules=get_event_scoring_rules(event_code)
+            )
+            aggregator.apply_matches(matches)
+            self.events.replace_aggregator(event_code, aggregator)
+        else:
+            self.events.aggregator(event_code).apply_matches(matches)
+
+        if changes["team_numbers"]:
+            self.tba_connector.invalidate_team_event_matches(
+                event_code, changes["team_numbers"]
+            )
+            for team_number in changes["team_numbers"]:
+                self.rating_cache.invalidate_team(team_number, event_code)
+            self.logger.info(
+                f"{event_code}: {len(changes['new_results'])} new and "
+                f"{len(changes['corrected_results'])} corrected results, "
+                f"refreshed {len(changes['team_numbers'])} teams"
+            )
+
+    def __update_live_performance(self, team_number, event_code, matches):
+        aggregator = self.__update_live_aggregator(event_code, matches)
+        if aggregator == None:
+            return None
+        return aggregator.get_performance(team_number)
+
+    def __update_live_aggregator(self, event_code, matches):
+        if matches == None:
+            return None
+        first_load = not self.events.is_loaded(event_code)
+        aggregator = self.events.aggregator(event_code)
+        with STAGE_SECONDS.time(stage="live_metrics"):
+            updated_teams = aggregator.apply_matches(matches)
+
+        # Ratings generated before the new matches are stale. Nothing is dropped on the
+        # first load so ratings cached by a previous run, or before the event was
+        # evicted, stay usable.
+        if not first_load:
+            for updated_team in updated_teams:
+                self.rating_cache.invalidate_team(updated_team, event_code)
+        return aggregator
+
     def run(self, debug=True):
+        # The debug reloader runs the app in a child process, only that one polls
+        if not debug or os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+            self.event_poller.start()
         self.app.run(debug=debug)
 
 
+def main():
+    parser = argparse.ArgumentParser(description="FRC team ratings")
+    subparsers = parser.add_subparsers(dest="command")
+    serve_parser = subparsers.add_parser("serve", help="Run the web app (default)")
+    serve_parser.add_argument(
+        "--offline",
+        action="store_true",
+        help="Serve the data sources from the snapshot archive instead of the network",
+    )
+    warmup_parser = subparsers.add_parser(
+        "warmup", help="Generate the ratings of every team at events ahead of time"
+    )
+    warmup_parser.add_argument(
+        "event_codes",
+        nargs="*",
+        help="TBA event codes, e.g. 2025incmp, every configured event (EVENTS) by default",
+    )
+    warmup_parser.add_argument(
+        "--restart",
+        action="store_true",
+        help="Ignore the saved progress and rate every team again",
+    )
+    warmup_parser.add_argument(
+        "--limit", type=int, default=None, help="Rate at most this many teams"
+    )
+    snapshot_parser = subparsers.add_parser(
+        "snapshot",
+        help="Archive events' TBA and ISA data for offline use (SNAPSHOT_PATH)",
+    )
+    snapshot_parser.add_argument(
+        "event_codes",
+        nargs="*",
+        help="TBA event codes, e.g. 2025incmp, every configured event (EVENTS) by default",
+    )
+    season_parser = subparsers.add_parser(
+        "season",
+        help="Download every official event of a season (SEASON_STORE_PATH) and rate its teams",
+    )
+    season_parser.add_argument(
+        "--year", type=int, default=None, help="The season, the current one by default"
+    )
+    season_parser.add_argument(
+        "--top", type=int, default=25, help="Number of teams to list"
+    )
+    metrics_parser = subparsers.add_parser(
+        "metrics",
+        help="Recompute every stored event's and team's metrics of a season on BATCH_WORKERS processes",
+    )
+    metrics_parser.add_argument(
+        "--year",
+        type=int,
+        default=None,
+        help="The season, the latest stored one by default",
+    )
+    metrics_parser.add_argument(
+        "--output",
+        default="cache/season_metrics.json",
+        help="File the metrics are written to",
+    )
+    args = parser.parse_args()
+
+    if args.command == "snapshot":
+        frc_rating_app = FrcRatingApp(snapshot_mode="record")
+        # Every event goes in the same archive, an offline deployment serves them all
+        for event_code in args.event_codes or frc_rating_app.events.configured_events():
+            team_count = frc_rating_app.record_event_snapshot(event_code)
+            print(
+                f"Recorded {event_code} with {team_count} teams to "
+                f"{frc_rating_app.snapshot_client.archive.archive_path}"
+            )
+        return
+
+    frc_rating_app = FrcRatingApp(
+        snapshot_mode="replay" if getattr(args, "offline", False) else None
+    )
+    if args.command == "season":
+        summary = frc_rating_app.ingest_season(args.year)
+        if summary == None:
+            print("Could not retrieve the season's events")
+            return
+        print(
+            f"{summary['events']} events, {summary['matches']} matches stored, "
+            f"{len(summary['failed'])} events failed, "
+            f"{len(summary['unsupported'])} events of a season without scoring rules skipped"
+        )
+        ratings = frc_rating_app.season_ratings(args.year)
+        if ratings == None:
+            return
+        for rating in frc_rating_app.season_rating_calculator.rankings(ratings)[
+            : args.top
+        ]:
+            print(
+                f"{rating['rank']:>4}. {rating['team_number']:<6} EPA {rating['epa']:6.1f}  "
+                f"Elo {rating['elo']:6.0f}  {rating['wins']}-{rating['losses']}-{rating['ties']}"
+            )
+    elif args.command == "metrics":
+        started = time.perf_counter()
+        season_metrics = frc_rating_app.recompute_season_metrics(args.year)
+        if season_metrics == None:
+            print("No season stored, run `python main.py season` first")
+            return
+        os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+        with open(args.output, "wb") as file:
+            file.write(frc_rating_app.json_responder.serialize(season_metrics))
+        print(
+            f"{len(season_metrics['events'])} events and {len(season_metrics['teams'])} teams "
+            f"of {season_metrics['year']} computed in {time.perf_counter() - started:.1f}s, "
+            f"written to {args.output}"
+        )
+    elif args.command == "warmup":
+        # Each event keeps its own progress file, so one interrupted event doesn't restart the others
+        for event_code in args.event_codes or frc_rating_app.events.configured_events():
+            progress = frc_rating_app.warm_up_event(
+                event_code, restart=args.restart, limit=args.limit
+            )
+            print(
+                f"{event_code}: {len(progress.get('completed', []))} teams rated, "
+                f"{len(progress.get('failed', []))} failed"
+            )
+    else:
+        frc_rating_app.run()
+
+
 if __name__ == "__main__":
-    frc_rating_app = FrcRatingApp()
-    frc_rating_app.run()
+    main()
@@ -0,0 +1,162 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+
+class DiskCache:
+    """Persistent key/value store on disk with least-recently-used eviction"""
+
+    def __init__(self, cache_path: str, max_entries: int = 5000, max_bytes: int = 0):
+        """
+        Opens (or creates) the cache database.
+
+        Args
+        -----
+        cache_path : str
+            Path of the SQLite file backing the cache. Parent directories are created as needed.
+        max_entries : int, optional
+            Maximum number of entries kept before the least recently used ones are evicted.
+        max_bytes : int, optional
+            Maximum total size of the stored values in bytes, 0 disables the size bound.
+        """
+        self.__max_entries = max_entries
+        self.__max_bytes = max_bytes
+        self.__lock = threading.Lock()
+
+        cache_dir = os.path.dirname(cache_path)
+        if cache_dir and not os.path.exists(cache_dir):
+            os.makedirs(cache_dir)
+
+        self.__connection = sqlite3.connect(cache_path, check_same_thread=False)
+        self.__connection.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " key TEXT PRIMARY KEY,"
+            " value BLOB NOT NULL,"
+            " metadata TEXT NOT NULL,"
+            " stored_at REAL NOT NULL,"
+            " last_access REAL NOT NULL,"
+            " size INTEGER NOT NULL)"
+        )
+        self.__connection.execute(
+            "CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access)"
+        )
+        self.__connection.execute(
+            "CREATE TABLE IF NOT EXISTS tags (tag TEXT NOT NULL, key TEXT NOT NULL,"
+            " PRIMARY KEY (tag, key))"
+        )
+        self.__connection.execute("CREATE INDEX IF NOT EXISTS tags_key ON tags (key)")
+        self.__connection.commit()
+
+    def get(self, key: str) -> tuple[bytes, dict, float] | None:
+        """Returns (value, metadata, stored_at) for a key and marks it as recently used"""
+        with self.__lock:
+            row = self.__connection.execute(
+                "SELECT value, metadata, stored_at FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row == None:
+                return None
+            self.__connection.execute(
+                "UPDATE entries SET last_access = ? WHERE key = ?", (time.time(), key)
+            )
+            self.__connection.commit()
+        return (bytes(row[0]), json.loads(row[1]), row[2])
+
+    def set(
+        self,
+        key: str,
+        value: bytes,
+        metadata: dict | None = None,
+        tags: list | tuple = (),
+    ):
+        """
+        Stores a value, evicting least recently used entries if the bounds are exceeded.
+
+        Args
+        -----
+        key : str
+            The entry key.
+        value : bytes
+            The value to store.
+        metadata : dict | None, optional
+            JSON serializable data stored along with the value.
+        tags : list | tuple, optional
+            Labels the entry can be invalidated by with delete_tag.
+        """
+        now = time.time()
+        with self.__lock:
+            self.__connection.execute(
+                "INSERT OR REPLACE INTO entries"
+                " (key, value, metadata, stored_at, last_access, size)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (key, value, json.dumps(metadata or {}), now, now, len(value)),
+            )
+            self.__connection.executemany(
+                "INSERT OR IGNORE INTO tags (tag, key) VALUES (?, ?)",
+                [(tag, key) for tag in tags],
+            )
+            self.__evict()
+            self.__connection.commit()
+
+    def touch(self, key: str):
+        """Marks an entry as freshly stored without rewriting its value"""
+        now = time.time()
+        with self.__lock:
+            self.__connection.execute(
+                "UPDATE entries SET stored_at = ?, last_access = ? WHERE key = ?",
+                (now, now, key),
+            )
+            self.__connection.commit()
+
+    def delete(self, key: str):
+        """Removes a single entry"""
+        with self.__lock:
+            self.__connection.execute("DELETE FROM entries WHERE key = ?", (key,))
+            self.__connection.execute("DELETE FROM tags WHERE key = ?", (key,))
+            self.__connection.commit()
+
+    def delete_tag(self, tag: str) -> int:
+        """Removes every entry stored with the given tag, returns how many were removed"""
+        with self.__lock:
+            removed = self.__connection.execute(
+                "DELETE FROM entries WHERE key IN (SELECT key FROM tags WHERE tag = ?)",
+                (tag,),
+            ).rowcount
+            self.__connection.execute(
+                "DELETE FROM tags WHERE key NOT IN (SELECT key FROM entries)"
+            )
+            self.__connection.commit()
+        return removed
+
+    def clear(self):
+        """Removes every entry"""
+        with self.__lock:
+            self.__connection.execute("DELETE FROM entries")
+            self.__connection.execute("DELETE FROM tags")
+            self.__connection.commit()
+
+    def __evict(self):
+        if self.__max_entries > 0:
+            self.__connection.execute(
+                "DELETE FROM entries WHERE key IN ("
+                " SELECT key FROM entries ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+                (self.__max_entries,),
+            )
+        if self.__max_bytes > 0:
+            total_size = self.__connection.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM entries"
+            ).fetchone()[0]
+            while total_size > self.__max_bytes:
+                row = self.__connection.execute(
+                    "SELECT key, size FROM entries ORDER BY last_access ASC LIMIT 1"
+                ).fetchone()
+                if row == None:
+                    break
+                self.__connection.execute(
+                    "DELETE FROM entries WHERE key = ?", (row[0],)
+                )
+                total_size -= row[1]
+        self.__connection.execute(
+            "DELETE FROM tags WHERE key NOT IN (SELECT key FROM entries)"
+        )
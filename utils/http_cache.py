@@ -0,0 +1,162 @@
+import hashlib
+import json
+import time
+
+from utils.disk_cache import DiskCache
+from utils.metrics import REGISTRY
+
+CACHE_REQUESTS = REGISTRY.counter(
+    "frcsp_http_cache_requests_total",
+    "Cached GETs by outcome: fresh (no request), revalidated (304) or miss",
+)
+
+
+class CachedResponse:
+    """Minimal response object returned by HttpResponseCache"""
+
+    def __init__(
+        self,
+        status_code: int,
+        content: bytes,
+        headers: dict | None = None,
+        from_cache: bool = False,
+    ):
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers or {}
+        # True when the body was served from local storage (fresh hit or 304 revalidation)
+        self.from_cache = from_cache
+
+    def json(self):
+        return json.loads(self.content)
+
+    def iter_content(self, chunk_size: int = 1):
+        """Yields the body in pieces, like requests.Response.iter_content"""
+        for start in range(0, len(self.content), chunk_size):
+            yield self.content[start : start + chunk_size]
+
+    def close(self):
+        pass
+
+
+class HttpResponseCache:
+    """
+    On-disk cache of HTTP GET responses that revalidates stale entries with
+    If-None-Match / If-Modified-Since so unchanged data is served from local storage.
+    """
+
+    def __init__(
+        self,
+        cache_path: str = "cache/http_cache.sqlite3",
+        ttl_seconds: float = 30,
+        max_entries: int = 5000,
+        max_bytes: int = 0,
+    ):
+        """
+        Args
+        -----
+        cache_path : str, optional
+            Path of the SQLite file backing the cache.
+        ttl_seconds : float, optional
+            How long a stored response is served without asking the server, after that it is revalidated.
+        max_entries : int, optional
+            Maximum number of stored responses before least recently used ones are evicted.
+        max_bytes : int, optional
+            Maximum total size of the stored bodies in bytes, 0 disables the size bound.
+        """
+        self.__ttl_seconds = ttl_seconds
+        self.__store = DiskCache(cache_path, max_entries, max_bytes)
+
+    @staticmethod
+    def __cache_key(url: str, headers: dict | None) -> str:
+        key_source = json.dumps([url, sorted((headers or {}).items())])
+        return hashlib.sha256(key_source.encode("utf-8")).hexdigest()
+
+    def get_fresh(self, url: str, headers: dict | None = None) -> CachedResponse | None:
+        """Returns the stored response if it is still within its TTL"""
+        entry = self.__store.get(self.__cache_key(url, headers))
+        if entry == None:
+            return None
+        content, metadata, stored_at = entry
+        if time.time() - stored_at > self.__ttl_seconds:
+            return None
+        return CachedResponse(200, content, metadata["headers"], from_cache=True)
+
+    def conditional_headers(self, url: str, headers: dict | None = None) -> dict:
+        """Returns the request headers extended with the validators of the stored response"""
+        request_headers = dict(headers or {})
+        entry = self.__store.get(self.__cache_key(url, headers))
+        if entry == None:
+            return request_headers
+
+        stored_headers = entry[1]["headers"]
+        if stored_headers.get("ETag"):
+            request_headers["If-None-Match"] = stored_headers["ETag"]
+        if stored_headers.get("Last-Modified"):
+            request_headers["If-Modified-Since"] = stored_headers["Last-Modified"]
+        return request_headers
+
+    def resolve(
+        self,
+        url: str,
+        headers: dict | None,
+        status_code: int,
+        content: bytes,
+        response_headers,
+    ) -> CachedResponse:
+        """
+        Folds a server response into the cache.
+
+        A 304 refreshes and returns the stored body, a 200 replaces the stored entry,
+        anything else is passed through without touching the cache.
+        """
+        key = self.__cache_key(url, headers)
+        if status_code == 304:
+            entry = self.__store.get(key)
+            if entry != None:
+                self.__store.touch(key)
+                return CachedResponse(
+                    200, entry[0], entry[1]["headers"], from_cache=True
+                )
+
+        validators = {
+            name: response_headers[name]
+            for name in ("ETag", "Last-Modified")
+            if response_headers.get(name)
+        }
+        if status_code == 200:
+            self.__store.set(key, content, {"headers": validators})
+        return CachedResponse(status_code, content, validators)
+
+    def fetch(self, url: str, headers: dict | None, get) -> CachedResponse:
+        """
+        Performs a cached GET.
+
+        Args
+        -----
+        url : str
+            The URL to request.
+        headers : dict | None
+            Request headers, they are part of the cache key.
+        get : callable
+            Function with the signature of requests.get used to reach the server.
+        """
+        cached = self.get_fresh(url, headers)
+        if cached != None:
+            CACHE_REQUESTS.inc(result="fresh")
+            return cached
+
+        response = get(url, headers=self.conditional_headers(url, headers))
+        resolved = self.resolve(
+            url, headers, response.status_code, response.content, response.headers
+        )
+        CACHE_REQUESTS.inc(result="revalidated" if resolved.from_cache else "miss")
+        return resolved
+
+    def invalidate(self, url: str, headers: dict | None = None):
+        """Drops the stored response for a URL"""
+        self.__store.delete(self.__cache_key(url, headers))
+
+    def clear(self):
+        """Drops every stored response"""
+        self.__store.clear()
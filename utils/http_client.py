@@ -0,0 +1,99 @@
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from utils.metrics import REGISTRY
+
+REQUEST_SECONDS = REGISTRY.histogram(
+    "frcsp_http_client_request_seconds",
+    "Duration of outgoing HTTP requests, retries and backoff included",
+)
+RETRIES = REGISTRY.counter(
+    "frcsp_http_client_retries_total", "Outgoing HTTP requests retried, by cause"
+)
+
+
+class CountingRetry(Retry):
+    """Retry policy that counts every retry it allows"""
+
+    def increment(self, method=None, url=None, response=None, error=None, **kwargs):
+        # Raises once the retries are exhausted, so only retries that happen are counted
+        retry = super().increment(method, url, response, error, **kwargs)
+        if error != None or response == None:
+            reason = "error"
+        else:
+            reason = f"status_{response.status}"
+        RETRIES.inc(method=method or "", reason=reason)
+        return retry
+
+
+class HttpClient:
+    """
+    Shared HTTP transport for the data sources.
+
+    Wraps a requests.Session so connections are pooled and kept alive between calls,
+    applies a default timeout to every request and retries failed requests with
+    exponential backoff, honoring Retry-After when the server sends it.
+    """
+
+    def __init__(
+        self,
+        pool_connections: int = 10,
+        pool_maxsize: int = 10,
+        timeout: float | tuple[float, float] = (5, 30),
+        max_retries: int = 3,
+        backoff_factor: float = 0.5,
+        status_forcelist: tuple = (429, 500, 502, 503, 504),
+    ):
+        """
+        Args
+        -----
+        pool_connections : int, optional
+            Number of per-host connection pools to keep.
+        pool_maxsize : int, optional
+            Maximum number of connections kept open to a single host. Requests block
+            while all of them are in use instead of opening more.
+        timeout : float | tuple[float, float], optional
+            Default timeout in seconds, either a single value or (connect, read).
+        max_retries : int, optional
+            Number of retries for connection errors and retryable status codes.
+        backoff_factor : float, optional
+            Base of the exponential backoff between retries, in seconds.
+        status_forcelist : tuple, optional
+            Status codes that trigger a retry for idempotent requests.
+        """
+        self.__timeout = timeout
+
+        retry = CountingRetry(
+            total=max_retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=status_forcelist,
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            max_retries=retry,
+            pool_block=True,
+        )
+
+        self.__session = requests.Session()
+        self.__session.mount("http://", adapter)
+        self.__session.mount("https://", adapter)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        """Sends a GET request, accepts the same keyword arguments as requests.get"""
+        kwargs.setdefault("timeout", self.__timeout)
+        with REQUEST_SECONDS.time(method="GET"):
+            return self.__session.get(url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        """Sends a POST request, accepts the same keyword arguments as requests.post"""
+        kwargs.setdefault("timeout", self.__timeout)
+        with REQUEST_SECONDS.time(method="POST"):
+            return self.__session.post(url, **kwargs)
+
+    def close(self):
+        """Closes every pooled connection"""
+        self.__session.close()
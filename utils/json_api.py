@@ -0,0 +1,174 @@
+import gzip
+import hashlib
+import threading
+from collections import OrderedDict
+
+import orjson
+from flask import Response
+
+try:
+    import brotli
+except ImportError:
+    # Optional, responses fall back to gzip when it isn't installed
+    brotli = None
+
+
+def select_fields(payload, fields: list | None):
+    """
+    Keeps only the requested fields of a payload.
+
+    Args
+    -----
+    payload : dict | list
+        A dict, or a list of dicts where the selection applies to every item.
+    fields : list | None
+        Field names, dotted names select nested fields, e.g. "average_score" or
+        "contribution_percentages.auto". None keeps the whole payload.
+
+    Returns
+    -------
+    dict | list
+        The payload reduced to the requested fields, missing fields are left out.
+    """
+    if fields == None:
+        return payload
+    if isinstance(payload, list):
+        return [select_fields(item, fields) for item in payload]
+    if not isinstance(payload, dict):
+        return payload
+
+    selected = {}
+    nested_fields = {}
+    for field in fields:
+        name, _, rest = field.partition(".")
+        if name not in payload:
+            continue
+        if rest and name not in selected:
+            nested_fields.setdefault(name, []).append(rest)
+        else:
+            # Selecting the whole field wins over selecting parts of it
+            selected[name] = payload[name]
+            nested_fields.pop(name, None)
+    for name, rest in nested_fields.items():
+        selected[name] = select_fields(payload[name], rest)
+    return selected
+
+
+class JsonResponder:
+    """
+    Builds the JSON responses of the API routes.
+
+    Payloads are serialized with orjson, reduced to the fields listed in the
+    ?fields= query parameter, compressed with brotli or gzip when the client
+    accepts it and sent with an ETag and Cache-Control so pollers revalidate with
+    If-None-Match and get an empty 304 while the data is unchanged. Compressed
+    bodies are kept per ETag, so unchanged data is compressed once however many
+    clients poll it.
+    """
+
+    def __init__(
+        self,
+        max_age: int = 5,
+        min_compress_bytes: int = 512,
+        max_compressed_bodies: int = 256,
+    ):
+        """
+        Args
+        -----
+        max_age : int, optional
+            Seconds browsers and proxies may reuse a response before revalidating it.
+        min_compress_bytes : int, optional
+            Bodies smaller than this are sent uncompressed, compression wouldn't pay off.
+        max_compressed_bodies : int, optional
+            Number of compressed bodies kept for reuse.
+        """
+        self.max_age = max_age
+        self.min_compress_bytes = min_compress_bytes
+        self.max_compressed_bodies = max_compressed_bodies
+        self.__lock = threading.Lock()
+        self.__compressed_bodies = OrderedDict()
+
+    @staticmethod
+    def serialize(payload) -> bytes:
+        """Serializes a payload, team numbers used as keys become strings"""
+        return orjson.dumps(
+            payload,
+            default=str,
+            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY,
+        )
+
+    @staticmethod
+    def requested_fields(request) -> list | None:
+        """Field names of the ?fields= parameter, comma separated, None if absent"""
+        fields = request.args.get("fields")
+        if not fields:
+            return None
+        return [field.strip() for field in fields.split(",") if field.strip()]
+
+    @staticmethod
+    def __encoding(request) -> str | None:
+        accepted = request.accept_encodings
+        if brotli != None and accepted["br"]:
+            return "br"
+        if accepted["gzip"]:
+            return "gzip"
+        return None
+
+    def __compress(self, etag: str, encoding: str, body: bytes) -> bytes:
+        key = (etag, encoding)
+        with self.__lock:
+            compressed = self.__compressed_bodies.get(key)
+            if compressed != None:
+                self.__compressed_bodies.move_to_end(key)
+                return compressed
+
+        if encoding == "br":
+            # Quality 5 is far faster than the default 11 and almost as small on JSON
+            compressed = brotli.compress(body, quality=5)
+        else:
+            compressed = gzip.compress(body, compresslevel=6, mtime=0)
+
+        with self.__lock:
+            self.__compressed_bodies[key] = compressed
+            while len(self.__compressed_bodies) > self.max_compressed_bodies:
+                self.__compressed_bodies.popitem(last=False)
+        return compressed
+
+    def respond(self, request, payload, status: int = 200) -> Response:
+        """
+        Builds the response of a payload for a request.
+
+        Args
+        -----
+        request : flask.Request
+            The request being answered, for its fields, Accept-Encoding and If-None-Match.
+        payload : dict | list
+            The data to send.
+        status : int, optional
+            Status code. Only 200 responses get an ETag and can be cached.
+
+        Returns
+        -------
+        Response
+            The JSON response, or an empty 304 if the client's copy is current.
+        """
+        body = self.serialize(select_fields(payload, self.requested_fields(request)))
+        if status != 200:
+            return Response(body, status=status, content_type="application/json")
+
+        # Weak, the same JSON is sent with different content encodings
+        digest = hashlib.blake2b(body, digest_size=16).hexdigest()
+        etag = f'W/"{digest}"'
+        headers = {
+            "ETag": etag,
+            "Cache-Control": f"public, max-age={self.max_age}",
+            "Vary": "Accept-Encoding",
+        }
+        if request.if_none_match.contains_weak(digest):
+            return Response(status=304, headers=headers)
+
+        encoding = self.__encoding(request)
+        if encoding != None and len(body) >= self.min_compress_bytes:
+            body = self.__compress(etag, encoding, body)
+            headers["Content-Encoding"] = encoding
+        return Response(body, headers=headers, content_type="application/json")
@@ -0,0 +1,86 @@
+import codecs
+import json
+
+WHITESPACE = " \t\n\r"
+SEPARATORS = WHITESPACE + ",]"
+
+
+def iter_json_array(chunks, decoder: json.JSONDecoder | None = None):
+    """
+    Yields the elements of a JSON array as its bytes arrive.
+
+    Only the element being parsed and the unparsed rest of the last chunk are kept
+    in memory, never the whole document nor the list of its elements, so a
+    response of any size is processed in constant memory.
+
+    Args
+    -----
+    chunks : iterable of bytes
+        The document in pieces of any size, e.g. response.iter_content(65536).
+    decoder : json.JSONDecoder | None, optional
+        Decoder used for the elements.
+
+    Raises
+    ------
+    ValueError
+        If the document is not a JSON array. A null document yields nothing.
+    """
+    decoder = decoder if decoder != None else json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder("utf-8")()
+    buffer = ""
+    position = 0
+    started = False
+    finished = False
+    exhausted = False
+    chunk_iterator = iter(chunks)
+
+    while not finished:
+        # Skip whitespace and separators, then decode the next element once it is complete
+        while position < len(buffer) and buffer[position] in WHITESPACE:
+            position += 1
+
+        if position < len(buffer):
+            character = buffer[position]
+            if not started and character == "[":
+                started = True
+                position += 1
+                continue
+            if not started:
+                if buffer.startswith("null", position):
+                    return
+                # "null" may be cut by the end of the chunk
+                if exhausted or not "null".startswith(buffer[position:]):
+                    raise ValueError("Expected a JSON array")
+            elif character == "]":
+                finished = True
+                continue
+            elif character == ",":
+                position += 1
+                continue
+            else:
+                try:
+                    element, end = decoder.raw_decode(buffer, position)
+                except json.JSONDecodeError:
+                    # Most likely an element cut by the end of the chunk, unless nothing more is coming
+                    if exhausted:
+                        raise
+                else:
+                    # Elements end before a separator, otherwise the element may continue
+                    # in the next chunk, e.g. a number cut in the middle of its exponent
+                    if exhausted or (end < len(buffer) and buffer[end] in SEPARATORS):
+                        yield element
+                        position = end
+                        continue
+
+        if exhausted:
+            if not started and not buffer.strip():
+                return
+            raise ValueError("Unterminated JSON array")
+
+        chunk = next(chunk_iterator, None)
+        if chunk == None:
+            exhausted = True
+            buffer = buffer[position:] + text_decoder.decode(b"", final=True)
+        else:
+            buffer = buffer[position:] + text_decoder.decode(chunk)
+        position = 0
@@ -0,0 +1,240 @@
+import bisect
+import functools
+import threading
+import time
+from contextlib import contextmanager
+
+# Seconds, from a cache hit to a long generation
+DEFAULT_BUCKETS = (
+    0.001,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1,
+    2.5,
+    5,
+    10,
+    30,
+    60,
+    120,
+    300,
+)
+
+
+def _label_key(labels: dict) -> tuple:
+    return tuple(sorted(labels.items()))
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(label_key: tuple, extra: tuple = ()) -> str:
+    pairs = label_key + extra
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Counter:
+    """Monotonically increasing value per label set"""
+
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str):
+        self.name = name
+        self.documentation = documentation
+        self.__lock = threading.Lock()
+        self.__values = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = _label_key(labels)
+        with self.__lock:
+            self.__values[key] = self.__values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        with self.__lock:
+            return self.__values.get(_label_key(labels), 0)
+
+    def samples(self) -> list:
+        with self.__lock:
+            return [(self.name, key, (), value) for key, value in self.__values.items()]
+
+
+class Gauge:
+    """Value that goes up and down, either set directly or read from a function at scrape time"""
+
+    type_name = "gauge"
+
+    def __init__(self, name: str, documentation: str, function=None):
+        self.name = name
+        self.documentation = documentation
+        self.function = function
+        self.__lock = threading.Lock()
+        self.__values = {}
+
+    def set(self, value: float, **labels):
+        with self.__lock:
+            self.__values[_label_key(labels)] = value
+
+    def samples(self) -> list:
+        if self.function != None:
+            return [(self.name, (), (), self.function())]
+        with self.__lock:
+            return [(self.name, key, (), value) for key, value in self.__values.items()]
+
+
+class Histogram:
+    """Distribution of observed values in cumulative buckets, plus their sum and count"""
+
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, buckets: tuple = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(sorted(buckets))
+        self.__lock = threading.Lock()
+        # label key -> [per bucket counts (last is +Inf), sum, count]
+        self.__values = {}
+
+    def observe(self, value: float, **labels):
+        key = _label_key(labels)
+        bucket_index = bisect.bisect_left(self.buckets, value)
+        with self.__lock:
+            state = self.__values.get(key)
+            if state == None:
+                state = [[0] * (len(self.buckets) + 1), 0.0, 0]
+                self.__values[key] = state
+            state[0][bucket_index] += 1
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observes the duration of the block in seconds"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def count(self, **labels) -> int:
+        with self.__lock:
+            state = self.__values.get(_label_key(labels))
+            return 0 if state == None else state[2]
+
+    def samples(self) -> list:
+        samples = []
+        with self.__lock:
+            for key, (bucket_counts, total, count) in self.__values.items():
+                cumulative = 0
+                for bound, bucket_count in zip(
+                    self.buckets + (float("inf"),), bucket_counts
+                ):
+                    cumulative += bucket_count
+                    samples.append(
+                        (
+                            f"{self.name}_bucket",
+                            key,
+                            (("le", _format_value(bound)),),
+                            cumulative,
+                        )
+                    )
+                samples.append((f"{self.name}_sum", key, (), total))
+                samples.append((f"{self.name}_count", key, (), count))
+        return samples
+
+
+class MetricsRegistry:
+    """
+    Collection of counters, gauges and histograms rendered in the Prometheus text format.
+
+    Metrics are created on first use and shared by name, so modules can declare
+    the metrics they update at import time. Updates take a per metric lock and no
+    allocation beyond the first use of a label set.
+    """
+
+    def __init__(self):
+        self.__lock = threading.Lock()
+        self.__metrics = {}
+
+    def __get_or_create(self, metric_class, name: str, *args):
+        with self.__lock:
+            metric = self.__metrics.get(name)
+            if metric == None:
+                metric = metric_class(name, *args)
+                self.__metrics[name] = metric
+            elif not isinstance(metric, metric_class):
+                raise ValueError(f"Metric {name} is already a {metric.type_name}")
+            return metric
+
+    def counter(self, name: str, documentation: str) -> Counter:
+        return self.__get_or_create(Counter, name, documentation)
+
+    def gauge(self, name: str, documentation: str, function=None) -> Gauge:
+        gauge = self.__get_or_create(Gauge, name, documentation)
+        if function != None:
+            gauge.function = function
+        return gauge
+
+    def histogram(
+        self, name: str, documentation: str, buckets: tuple = DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self.__get_or_create(Histogram, name, documentation, buckets)
+
+    def render(self) -> str:
+        """Returns every metric in the Prometheus text exposition format"""
+        with self.__lock:
+            metrics = sorted(self.__metrics.values(), key=lambda metric: metric.name)
+
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type_name}")
+            for sample_name, label_key, extra_labels, value in metric.samples():
+                lines.append(
+                    f"{sample_name}{_format_labels(label_key, extra_labels)} {_format_value(value)}"
+                )
+        return "\n".join(lines) + "\n"
+
+
+# Registry shared by the whole application, exported by the /metrics route
+REGISTRY = MetricsRegistry()
+
+# Shared by several modules, so they are declared once here
+STAGE_SECONDS = REGISTRY.histogram(
+    "frcsp_stage_seconds", "Duration of the stages of a team rating or prediction"
+)
+DATA_SOURCE_SECONDS = REGISTRY.histogram(
+    "frcsp_data_source_call_seconds",
+    "Duration of data source connector calls, cache lookups included",
+)
+
+
+def timed(histogram: Histogram, **labels):
+    """Decorator observing the duration of every call of the function"""
+
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - started, **labels)
+
+        return wrapper
+
+    return decorator
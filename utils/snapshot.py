@@ -0,0 +1,172 @@
+import json
+import os
+import threading
+import zipfile
+from urllib.parse import urlsplit
+
+from utils.http_cache import CachedResponse
+from utils.http_client import HttpClient
+
+
+class SnapshotArchive:
+    """
+    Compressed archive of HTTP responses, stored as a zip file.
+
+    Every response body is a separate deflated member named after its URL
+    (host, path and query), so a single team's or event's data is read without
+    decompressing the rest of the archive. Status codes and headers are kept in
+    an index member.
+    """
+
+    INDEX_NAME = "index.json"
+
+    def __init__(self, archive_path: str = "snapshots/snapshot.zip"):
+        """
+        Args
+        -----
+        archive_path : str, optional
+            Path of the zip file. It is created by save if it doesn't exist.
+        """
+        self.archive_path = archive_path
+        self.__lock = threading.Lock()
+        self.__index = {}
+        self.__pending = {}
+        self.__bodies = {}
+        self.__zip_file = None
+        if os.path.exists(archive_path):
+            self.__zip_file = zipfile.ZipFile(archive_path, "r")
+            self.__index = json.loads(self.__zip_file.read(self.INDEX_NAME))
+
+    @staticmethod
+    def entry_name(url: str) -> str:
+        """Archive member name of a URL, e.g. www.thebluealliance.com/api/v3/event/2025incmp/matches"""
+        parts = urlsplit(url)
+        name = f"{parts.netloc}{parts.path}"
+        if parts.query:
+            name += f"?{parts.query}"
+        return name
+
+    def get(self, url: str) -> CachedResponse | None:
+        """Returns the archived response of a URL, None if it was not recorded"""
+        name = self.entry_name(url)
+        with self.__lock:
+            metadata = self.__index.get(name)
+            if metadata == None:
+                return None
+            body = self.__bodies.get(name)
+            if body == None:
+                body = self.__pending.get(name)
+            if body == None:
+                # Decompressed once, later reads are served from memory
+                body = self.__zip_file.read(name)
+                self.__bodies[name] = body
+        return CachedResponse(
+            metadata["status_code"], body, metadata["headers"], from_cache=True
+        )
+
+    def put(self, url: str, status_code: int, content: bytes, headers: dict | None):
+        """Adds a response, it is written to disk by save"""
+        name = self.entry_name(url)
+        with self.__lock:
+            self.__index[name] = {
+                "url": url,
+                "status_code": status_code,
+                "headers": dict(headers or {}),
+            }
+            self.__pending[name] = content
+            self.__bodies.pop(name, None)
+
+    def urls(self) -> list:
+        """URLs of every archived response"""
+        with self.__lock:
+            return [metadata["url"] for metadata in self.__index.values()]
+
+    def save(self):
+        """Writes the archive, keeping the responses of the existing file that were not replaced"""
+        with self.__lock:
+            directory = os.path.dirname(self.archive_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+            # Written next to the archive and swapped in, readers never see a partial file
+            temporary_path = f"{self.archive_path}.tmp"
+            with zipfile.ZipFile(
+                temporary_path, "w", compression=zipfile.ZIP_DEFLATED
+            ) as new_zip_file:
+                for name in self.__index:
+                    body = self.__pending.get(name)
+                    if body == None:
+                        body = self.__zip_file.read(name)
+                    new_zip_file.writestr(name, body)
+                new_zip_file.writestr(self.INDEX_NAME, json.dumps(self.__index))
+
+            if self.__zip_file != None:
+                self.__zip_file.close()
+            os.replace(temporary_path, self.archive_path)
+            self.__zip_file = zipfile.ZipFile(self.archive_path, "r")
+            self.__bodies.update(self.__pending)
+            self.__pending.clear()
+
+    def close(self):
+        with self.__lock:
+            if self.__zip_file != None:
+                self.__zip_file.close()
+                self.__zip_file = None
+
+
+class SnapshotHttpClient:
+    """
+    Drop-in replacement of HttpClient that records to or replays from a SnapshotArchive.
+
+    When recording, requests go to the network through the wrapped client and every
+    GET response is added to the archive. When replaying, GETs are answered from
+    the archive only and never touch the network.
+    """
+
+    def __init__(
+        self,
+        archive: SnapshotArchive,
+        record: bool = False,
+        http_client: HttpClient | None = None,
+    ):
+        """
+        Args
+        -----
+        archive : SnapshotArchive
+            The archive responses are recorded to or replayed from.
+        record : bool, optional
+            Record live responses instead of replaying archived ones.
+        http_client : HttpClient | None, optional
+            Transport used when recording. A private one is created if not provided.
+        """
+        self.archive = archive
+        self.record = record
+        self.__http = http_client if http_client != None else HttpClient()
+
+    def get(self, url: str, **kwargs):
+        """Sends a GET request, accepts the same keyword arguments as requests.get"""
+        if not self.record:
+            response = self.archive.get(url)
+            if response == None:
+                print(f"Not in snapshot: {url}")
+                return CachedResponse(404, b"null", {})
+            return response
+
+        response = self.__http.get(url, **kwargs)
+        # Revalidation answers have no body, only complete responses are archived
+        if response.status_code != 304:
+            self.archive.put(
+                url, response.status_code, response.content, response.headers
+            )
+        return response
+
+    def post(self, url: str, **kwargs):
+        """Sends a POST request, they are never recorded nor replayed"""
+        return self.__http.post(url, **kwargs)
+
+    def close(self):
+        """Saves a recording and closes the archive"""
+        if self.record:
+            self.archive.save()
+        self.archive.close()
+        self.__http.close()